@@ -1,112 +1,632 @@
 import os
+import sys
+import json
+import re
+import threading
+import time
+from pathlib import Path
 from typing import TypedDict
-from langchain_community.document_loaders import PyPDFLoader
 import pprint
-from groq import Groq
 
 # LangChain imports
 from langchain_core.documents import Document
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_community.tools.tavily_search import TavilySearchResults
 
+# Repo root holds the shared metrics and llm_gateway modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-parser = JsonOutputParser()
+import metrics
+from llm_gateway import get_gateway, to_messages
+from singleflight import SingleFlight
+import pdf_extract
+from cache import TieredCache, content_hash
+from skills import SKILL_TAXONOMY, extract_skills, canonical_skill
+from analysis_result import (SCHEMAS, SchemaError, StreamingSkillParser, make_analysis, parse_json_object,
+                             validate)
+from skill_embeddings import DEFAULT_THRESHOLD as SKILL_MATCH_THRESHOLD, get_skill_index
+
+
+ANALYSIS_MODEL = "llama-3.1-8b-instant"
+# Bump when the analysis prompt or result shape changes so old cached answers are not reused
+ANALYSIS_PROMPT_VERSION = "6"
+# Below this many locally recognised resume skills the taxonomy probably missed
+# most of the resume, so the full resume is sent to the LLM instead
+MIN_LOCAL_RESUME_SKILLS = 5
+# Follow-up calls asking only for the fields a reply left out
+MAX_REASKS = 1
+# Who decides partial matches ("ci/cd" covered by "jenkins"): "llm" asks the model,
+# "embedding" compares skill vectors locally (skill_embeddings.py). Embedding matching
+# stays opt-in until SKILL_MATCH_THRESHOLD is fitted on all-MiniLM-L6-v2
+# (python skill_embeddings.py --labels skill_pairs.jsonl)
+SKILL_MATCHER = os.getenv("SKILL_MATCHER", "llm")
+
+pdf_text_cache = TieredCache("pdf_text", max_memory_entries=64, max_disk_entries=512)
+analysis_cache = TieredCache("cv_analysis", max_memory_entries=256, max_disk_entries=4096)
+# Course search results go stale, keep them for a day
+COURSE_CACHE_TTL = 24 * 3600
+course_cache = TieredCache("course_search", max_memory_entries=512, max_disk_entries=2048, ttl=COURSE_CACHE_TTL)
+# Identical calls already in flight (same cache key) wait for that call instead of repeating it
+analysis_flight = SingleFlight("cv_analysis")
+course_flight = SingleFlight("course_search")
 
 
 def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file"""
-    loader = PyPDFLoader(pdf_path)
-    pages = loader.load()
-    full_text = " ".join([page.page_content for page in pages])
-    return full_text
+    """Extract text from a PDF file (cached by file content)"""
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    return extract_text_from_pdf_bytes(pdf_bytes)
 
 
-def analyze_cv_gap(job_description, resume_text):
-    """
-    Analyze CV gap between resume and job description
-    Returns JSON with resume_skills_found, job_skills_required, and missing_skills
-    """
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", """
-        You are a strict Technical Recruiter. 
-        
-        TASK:
-        1. Scan the Resume and extract ALL technical skills found (normalize to lowercase).
-        2. Scan the Job Description and extract required skills (normalize to lowercase).
-        3. Compare the two lists.
-        
-        CRITICAL RULES:
-        - **Normalization:** Treat "HTML", "html", "Html5" as the SAME thing.
-        - **Partial Matches:** If JD requires "CI/CD" and Resume has "Jenkins", that is a MATCH (not missing).
-        - **Output:** JSON ONLY.
-        
-        JSON STRUCTURE (You must fill all fields):
-        {{
-            "resume_skills_found": ["list", "of", "all", "skills", "found", "in", "resume"],
-            "job_skills_required": ["list", "of", "skills", "from", "jd"],
-            "missing_skills": ["final", "list", "of", "gaps"]
-        }}
-        """),
-        ("human", """
-        JOB DESCRIPTION: {job_description}
-        RESUME: {resume_text}
-        """),
-    ])
-    
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=0,
-        model_kwargs={"response_format": {"type": "json_object"}}
-    )
+def extract_text_from_pdf_bytes(pdf_bytes):
+    """Extract text from in-memory PDF bytes (e.g. an upload), cached by content"""
+    pdf_bytes = bytes(pdf_bytes)
+    key = content_hash(pdf_extract.EXTRACTOR_VERSION, pdf_bytes)
+
+    def extract():
+        with metrics.span("pdf.extract", bytes=len(pdf_bytes)) as s:
+            text = pdf_extract.extract_text(pdf_bytes)
+            s.set(chars=len(text))
+        return text
+
+    return pdf_text_cache.get_or_compute(key, extract)
+
+
+def cache_stats():
+    """Hit / miss stats for the PDF text and analysis caches"""
+    return [pdf_text_cache.get_stats(), analysis_cache.get_stats(), course_cache.get_stats()]
+
+
+def _cache_metrics():
+    """Cache counters for the metrics export (read from the caches' own stats)"""
+    for stats in cache_stats():
+        for tier in ("memory", "disk"):
+            yield "cache_hits", {"cache": stats["name"], "tier": tier}, stats[f"{tier}_hits"], "counter"
+        yield "cache_misses", {"cache": stats["name"]}, stats["misses"], "counter"
+        yield "cache_memory_entries", {"cache": stats["name"]}, stats["memory_entries"], "gauge"
+
+
+metrics.register_collector(_cache_metrics)
+
+
+CV_GAP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You are a strict Technical Recruiter. 
     
-    rag_chain = (
-        prompt_template
-        | llm
-        | parser
-    )
+    TASK:
+    1. Scan the Resume and extract ALL technical skills found (normalize to lowercase).
+    2. Scan the Job Description and extract required skills (normalize to lowercase).
+    3. Compare the two lists.
     
-    result = rag_chain.invoke({
-        "job_description": job_description, 
+    CRITICAL RULES:
+    - **Normalization:** Treat "HTML", "html", "Html5" as the SAME thing.
+    - **Partial Matches:** If JD requires "CI/CD" and Resume has "Jenkins", that is a MATCH (not missing).
+    - **Output:** JSON ONLY.
+    
+    JSON STRUCTURE (You must fill all fields):
+    {{
+        "resume_skills_found": ["list", "of", "all", "skills", "found", "in", "resume"],
+        "job_skills_required": ["list", "of", "skills", "from", "jd"],
+        "missing_skills": ["final", "list", "of", "gaps"]
+    }}
+    """),
+    ("human", """
+    JOB DESCRIPTION: {job_description}
+    RESUME: {resume_text}
+    """),
+])
+
+JOB_SKILLS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You are a strict Technical Recruiter.
+    
+    TASK: Scan the Job Description and extract the required technical skills (normalize to lowercase).
+    Treat "HTML", "html", "Html5" as the SAME thing. Output JSON ONLY.
+    
+    JSON STRUCTURE:
+    {{
+        "job_skills_required": ["list", "of", "skills", "from", "jd"]
+    }}
+    """),
+    ("human", "JOB DESCRIPTION: {job_description}"),
+])
+
+RESUME_VS_SKILLS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You are a strict Technical Recruiter.
+    
+    TASK:
+    1. Scan the Resume and extract ALL technical skills found (normalize to lowercase).
+    2. For each REQUIRED SKILL decide whether the resume covers it.
+    
+    CRITICAL RULES:
+    - **Normalization:** Treat "HTML", "html", "Html5" as the SAME thing.
+    - **Partial Matches:** If "CI/CD" is required and Resume has "Jenkins", that is a MATCH (not missing).
+    - **missing_skills** must only contain items from REQUIRED SKILLS.
+    - **Output:** JSON ONLY.
+    
+    JSON STRUCTURE (You must fill all fields):
+    {{
+        "resume_skills_found": ["list", "of", "all", "skills", "found", "in", "resume"],
+        "missing_skills": ["required", "skills", "not", "covered"]
+    }}
+    """),
+    ("human", """
+    REQUIRED SKILLS: {required_skills}
+    RESUME: {resume_text}
+    """),
+])
+
+
+PREFILTERED_GAP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You are a strict Technical Recruiter.
+    
+    Exact skill matches were already resolved locally. You only handle what is left.
+    
+    TASK:
+    1. Scan the Job Description for required technical skills that are NOT in KNOWN REQUIRED SKILLS
+       (normalize to lowercase) and list them in "additional_required_skills".
+    2. For each UNRESOLVED REQUIRED SKILL and each additional skill, decide whether the
+       RESUME SKILLS cover it. List the ones that are not covered in "missing_skills".
+    
+    CRITICAL RULES:
+    - **Partial Matches:** If "ci/cd" is required and Resume has "jenkins", that is a MATCH (not missing).
+    - **Output:** JSON ONLY.
+    
+    JSON STRUCTURE (You must fill all fields):
+    {{
+        "additional_required_skills": ["skills", "from", "jd", "not", "already", "known"],
+        "missing_skills": ["final", "list", "of", "gaps"]
+    }}
+    """),
+    ("human", """
+    JOB DESCRIPTION: {job_description}
+    KNOWN REQUIRED SKILLS: {known_required}
+    UNRESOLVED REQUIRED SKILLS: {unresolved}
+    RESUME SKILLS: {resume_skills}
+    """),
+])
+
+PROMPTS = {
+    "cv_gap": CV_GAP_PROMPT,
+    "job_skills": JOB_SKILLS_PROMPT,
+    "resume_vs_skills": RESUME_VS_SKILLS_PROMPT,
+    "prefiltered_gap": PREFILTERED_GAP_PROMPT,
+}
+
+
+def _llm_json(messages, on_delta=None):
+    """One JSON-mode call (streamed when on_delta is given); returns the reply text"""
+    gateway = get_gateway()
+    if on_delta is None:
+        response = gateway.chat(messages, model=ANALYSIS_MODEL, temperature=0,
+                                response_format={"type": "json_object"})
+    else:
+        # JSON mode can't stream on Groq; the prompts already ask for JSON only
+        response = gateway.chat_stream(messages, on_delta, model=ANALYSIS_MODEL, temperature=0)
+    return response["choices"][0]["message"]["content"]
+
+
+def _invoke_json(prompt_name, inputs, on_partial=None):
+    """
+    Run one prompt and return its validated fields ({field: skill list})
+
+    The reply is parsed and validated once against SCHEMAS[prompt_name]. If
+    fields are missing, the model is asked again for those fields only
+    (MAX_REASKS times) instead of repeating the whole call. With on_partial,
+    the reply is streamed and on_partial(fields so far) runs as skills arrive.
+    """
+    fields = SCHEMAS[prompt_name]
+    messages = to_messages(PROMPTS[prompt_name].invoke(inputs))
+    on_delta = None
+    if on_partial is not None:
+        stream = StreamingSkillParser()
+
+        def feed(text):
+            if stream.feed(text):
+                on_partial({field: list(skills) for field, skills in stream.fields.items()})
+        on_delta = feed
+
+    with metrics.span(f"llm.{prompt_name}", model=ANALYSIS_MODEL) as s:
+        reply = _llm_json(messages, on_delta)
+        result, missing = validate(parse_json_object(reply), fields)
+        reasks = 0
+        while missing and reasks < MAX_REASKS:
+            reasks += 1
+            metrics.incr("llm_reasks", prompt=prompt_name)
+            messages = messages + [
+                {"role": "assistant", "content": reply},
+                {"role": "user", "content": "Your JSON is missing " + ", ".join(missing) + ". Reply with a JSON "
+                    "object containing only these fields: " + json.dumps({f: ["..."] for f in missing})},
+            ]
+            reply = _llm_json(messages)
+            found, missing = validate(parse_json_object(reply), missing)
+            result.update(found)
+        s.set(reasks=reasks)
+    if missing:
+        raise SchemaError(f"{prompt_name}: reply is missing {', '.join(missing)}", missing)
+    return result
+
+
+def analyze_cv_gap(job_description, resume_text, prefilter=True, on_partial=None):
+    """
+    Analyze CV gap between resume and job description
+    Returns a GapAnalysis: resume_skills_found, job_skills_required and
+    missing_skills, plus matched_skills / matched_count / required_count /
+    score computed once (see analysis_result.py)
+
+    With prefilter, skills are extracted and exact matches resolved locally
+    (see skills.py). With SKILL_MATCHER=embedding the remaining partial
+    matches are decided by skill embeddings too and the LLM only lists the
+    JD's skills (cached per JD); with SKILL_MATCHER=llm it sees the JD, the
+    skill lists and the unresolved remainder instead of the full resume.
+    Either way, the resume text is only sent for JD skills outside the
+    taxonomy that are still missing (see _confirm_open_skills).
+
+    on_partial(partial result) is called while the LLM reply streams in,
+    with the same three skill lists filled so far (not on cache hits);
+    missing_skills is left out while it is still unknown.
+
+    Results are cached per (model, prompt version, JD, resume), so re-analysing
+    an identical pair does not call Groq again; concurrent identical calls
+    share one Groq call.
+    """
+    mode = "prefilter" if prefilter else "full"
+    key = content_hash(ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, mode, _matcher_key(), job_description, resume_text)
+
+    def run():
+        if prefilter:
+            result = _run_prefiltered_analysis(job_description, resume_text, on_partial)
+            if result is not None:
+                return result
+        fields = _invoke_json("cv_gap", {
+            "job_description": job_description, 
+            "resume_text": resume_text
+        }, on_partial)
+        return make_analysis(**fields)
+
+    with metrics.span("cv.analyze", mode=mode):
+        return analysis_flight.do(key, lambda: analysis_cache.get_or_compute(key, run))
+
+
+def _merge_prefiltered(required, unresolved, resume_skills, llm_fields):
+    """Local matches + the LLM's additional / missing skills -> the three analysis lists"""
+    additional = [canonical_skill(s) for s in llm_fields.get("additional_required_skills", [])]
+    # Only skills that were actually open can be missing; exact matches always win
+    candidates = set(unresolved) | set(additional)
+    return {
+        "resume_skills_found": sorted(resume_skills),
+        "job_skills_required": required + [s for s in dict.fromkeys(additional) if s not in required],
+        "missing_skills": [
+            s for s in dict.fromkeys(canonical_skill(m) for m in llm_fields.get("missing_skills", []))
+            if s in candidates and s not in resume_skills
+        ],
+    }
+
+
+def _run_prefiltered_analysis(job_description, resume_text, on_partial=None):
+    """Local skill matching + LLM for the JD / the remainder; None if the taxonomy found too little in the resume"""
+    resume_skills = extract_skills(resume_text)
+    if len(resume_skills) < MIN_LOCAL_RESUME_SKILLS:
+        return None
+
+    required = sorted(extract_skills(job_description))
+    if SKILL_MATCHER == "embedding":
+        if on_partial is not None:
+            # No missing_skills yet: an empty list would read as "nothing missing"
+            on_partial({"resume_skills_found": sorted(resume_skills), "job_skills_required": required})
+        extra = dict.fromkeys(canonical_skill(s) for s in extract_job_skills(job_description))
+        required += [s for s in extra if s not in required]
+        local = _match_locally(required, [_resume_skills(resume_text, required)])[0]
+        return _confirm_open_skills(local, resume_text)
+
+    unresolved = [s for s in required if s not in resume_skills]
+
+    stream = None
+    if on_partial is not None:
+        # The local lists are known before the LLM says anything
+        on_partial(_merge_prefiltered(required, unresolved, resume_skills, {}))
+
+        def report(llm_fields):
+            partial = _merge_prefiltered(required, unresolved, resume_skills, llm_fields)
+            # Skills outside the taxonomy are only missing once the resume was checked for them
+            partial["missing_skills"] = [s for s in partial["missing_skills"] if s in SKILL_TAXONOMY]
+            on_partial(partial)
+        stream = report
+
+    llm_fields = _invoke_json("prefiltered_gap", {
+        "job_description": job_description,
+        "known_required": ", ".join(required) or "none",
+        "unresolved": ", ".join(unresolved) or "none",
+        "resume_skills": ", ".join(sorted(resume_skills)),
+    }, stream)
+    additional = [canonical_skill(s) for s in llm_fields.get("additional_required_skills", [])]
+    resume_skills = _resume_skills(resume_text, additional)
+    local = make_analysis(**_merge_prefiltered(required, unresolved, resume_skills, llm_fields))
+    return _confirm_open_skills(local, resume_text)
+
+
+def _matcher_key():
+    """Cache key part: local matching results change with the matcher and its threshold"""
+    return SKILL_MATCHER if SKILL_MATCHER == "llm" else f"embedding@{SKILL_MATCH_THRESHOLD}"
+
+
+def _mentions(text, skill):
+    """skill appears in text as a whole phrase (both already lowercase, whitespace collapsed)"""
+    return re.search(r"(?<![a-z0-9])" + re.escape(skill) + r"(?![a-z0-9])", text) is not None
+
+
+def _resume_skills(resume_text, required_skills):
+    """
+    Taxonomy skills found in the resume, plus the required skills outside the
+    taxonomy that the resume names verbatim ("snowflake", "dbt")
+    """
+    skills = set(extract_skills(resume_text))
+    text = " ".join(resume_text.lower().split())
+    for skill in required_skills:
+        if skill not in SKILL_TAXONOMY and skill not in skills and _mentions(text, skill):
+            skills.add(skill)
+    return skills
+
+
+def _open_skills(analysis):
+    """Missing skills outside the taxonomy: the local matcher cannot rule them out"""
+    return [s for s in analysis["missing_skills"] if s not in SKILL_TAXONOMY]
+
+
+def _confirm_open_skills(analysis, resume_text, before_llm=None):
+    """
+    Let the LLM read the resume for the required skills outside the taxonomy
+    that local matching left missing (only it can see e.g. "data warehousing"
+    in a resume describing Snowflake work); no call when there are none
+    """
+    open_skills = _open_skills(analysis)
+    if not open_skills:
+        return analysis
+    if before_llm is not None:
+        before_llm()
+    llm_fields = _invoke_json("resume_vs_skills", {
+        "required_skills": ", ".join(open_skills),
         "resume_text": resume_text
     })
+    still_missing = {canonical_skill(s) for s in llm_fields["missing_skills"]}
+    found = {canonical_skill(s) for s in llm_fields["resume_skills_found"]}
+    return make_analysis(
+        sorted(set(analysis["resume_skills_found"]) | found),
+        analysis["job_skills_required"],
+        [s for s in analysis["missing_skills"] if s in SKILL_TAXONOMY or s in still_missing],
+    )
+
+
+def _match_locally(required_skills, resume_skill_sets):
+    """GapAnalysis per resume from one skill-embedding similarity matrix"""
+    matches = get_skill_index().match_many(required_skills, resume_skill_sets)
+    return [make_analysis(sorted(resume_skills), required_skills, match["missing"])
+            for resume_skills, match in zip(resume_skill_sets, matches)]
+
+
+def analyze_resumes_locally(required_skills, resume_texts):
+    """
+    Batch version of analyze_resume_against_skills without any LLM call
+
+    All resumes are matched with one similarity matrix. Returns a GapAnalysis
+    per resume, or None where a local answer isn't enough: the taxonomy
+    recognised too few skills, or required skills outside the taxonomy are
+    still missing (analyze_resume_against_skills should handle those).
+    """
+    required_skills = sorted({canonical_skill(s) for s in required_skills})
+    skill_sets = [_resume_skills(text, required_skills) for text in resume_texts]
+    local = [i for i, skills in enumerate(skill_sets) if len(skills) >= MIN_LOCAL_RESUME_SKILLS]
+    results = [None] * len(resume_texts)
+    for i, analysis in zip(local, _match_locally(required_skills, [skill_sets[i] for i in local])):
+        if not _open_skills(analysis):
+            results[i] = analysis
+    return results
+
+
+def extract_job_skills(job_description):
+    """Extract the required skills of a job description once (cached), for reuse across many resumes"""
+    key = content_hash(ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, "job_skills", job_description)
+
+    def run():
+        return _invoke_json("job_skills", {"job_description": job_description})
+
+    result = analysis_flight.do(key, lambda: analysis_cache.get_or_compute(key, run))
+    return result["job_skills_required"]
+
+
+def analyze_resume_against_skills(required_skills, resume_text, before_llm=None):
+    """
+    Analyze a resume against an already extracted list of required skills
+    Returns a GapAnalysis, like analyze_cv_gap
+
+    before_llm() runs right before a Groq request is made (e.g. a rate
+    limiter's acquire), so cache hits and local matches never wait on it.
+
+    Required skills found verbatim (after alias normalization) in the resume
+    are matched locally; with SKILL_MATCHER=embedding so are partial matches,
+    unless the taxonomy recognised too few resume skills, and the LLM only
+    checks missing skills outside the taxonomy. Otherwise the LLM is only
+    asked about the rest, and not at all when nothing is left.
+    """
+    required_skills = sorted({canonical_skill(s) for s in required_skills})
+    key = content_hash(ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, "vs_skills", _matcher_key(),
+                       ", ".join(required_skills), resume_text)
+
+    def run():
+        resume_skills = _resume_skills(resume_text, required_skills)
+        if SKILL_MATCHER == "embedding" and len(resume_skills) >= MIN_LOCAL_RESUME_SKILLS:
+            local = _match_locally(required_skills, [resume_skills])[0]
+            return _confirm_open_skills(local, resume_text, before_llm)
+        unresolved = [s for s in required_skills if s not in resume_skills]
+        result = {"resume_skills_found": sorted(resume_skills), "missing_skills": []}
+
+        if unresolved:
+            if before_llm is not None:
+                before_llm()
+            llm_fields = _invoke_json("resume_vs_skills", {
+                "required_skills": ", ".join(unresolved),
+                "resume_text": resume_text
+            })
+            found = {canonical_skill(s) for s in llm_fields["resume_skills_found"]}
+            result["resume_skills_found"] = sorted(resume_skills | found)
+            result["missing_skills"] = [
+                s for s in dict.fromkeys(canonical_skill(m) for m in llm_fields["missing_skills"])
+                if s in unresolved
+            ]
+
+        return make_analysis(job_skills_required=required_skills, **result)
+
+    return analysis_flight.do(key, lambda: analysis_cache.get_or_compute(key, run))
+
+
+def normalize_skill(skill):
+    """Lowercase and collapse whitespace so 'Docker ' and 'docker' share a cache entry"""
+    return " ".join(str(skill).lower().split())
+
+
+def _search_course(tool, skill):
+    """
+    Run one course search (cached); returns a recommendation dict or None
+
+    Another call searching the same skill with the same tool right now shares
+    its search. The result is cached before the flight ends, so a caller
+    arriving just after it finds the cache entry instead of searching again.
+    """
+    key = normalize_skill(skill)
+
+    def search():
+        cached = course_cache.get(key)
+        if cached is not None:
+            return dict(cached, skill=skill)
+        recommendation = _run_course_search(tool, skill)
+        if recommendation:
+            course_cache.set(key, recommendation)
+        return recommendation
+
+    return course_flight.do((id(tool), key), search)
+
+
+def _run_course_search(tool, skill):
+    query = f"free interactive course to learn {skill} for beginners 2024"
+    with metrics.span("tavily.search", skill=skill) as s:
+        results = tool.invoke(query)
+        s.set(results=len(results or []))
     
-    return result
+    if results and len(results) > 0:
+        top_hit = results[0]
+        return {
+            "skill": skill,
+            "course_name": top_hit.get('content', 'Course')[:100] + "...",
+            "url": top_hit.get('url', '#')
+        }
+    return None
+
+
+def _search_with_deadlines(tool, to_search, max_workers, timeout):
+    """
+    Search every skill, at most max_workers at a time, each for at most `timeout` seconds
+
+    A search's deadline starts when it starts, not when it was queued. A search
+    that overruns is given up on: its slot goes to the next queued skill and
+    its thread (a daemon) is left to finish in the background. Returns
+    {key: recommendation or None} for the searches that finished in time.
+    """
+    slots = threading.Semaphore(max_workers)
+    cond = threading.Condition()
+    started, finished, released = {}, {}, set()
+
+    def release(key):
+        # Once per search: when it finishes or when it is given up on
+        with cond:
+            if key not in released:
+                released.add(key)
+                slots.release()
+
+    def worker(key, skill):
+        slots.acquire()
+        with cond:
+            started[key] = time.monotonic()
+        try:
+            result = _search_course(tool, skill)
+        except Exception as e:
+            print(f"Search failed for {skill}: {e}")
+            result = e
+        release(key)
+        with cond:
+            finished[key] = result
+            cond.notify()
+
+    for key, skill in to_search.items():
+        threading.Thread(target=worker, args=(key, skill), daemon=True, name=f"course-search-{key}").start()
+
+    results = {}
+    pending = set(to_search)
+    with cond:
+        while pending:
+            now = time.monotonic()
+            for key in [k for k in pending if k in finished]:
+                pending.discard(key)
+                if not isinstance(finished[key], Exception):
+                    results[key] = finished[key]
+            for key in [k for k in pending if k in started and now - started[k] >= timeout]:
+                pending.discard(key)
+                print(f"Search timed out for {to_search[key]}")
+                release(key)
+            if pending:
+                deadlines = [started[k] + timeout for k in pending if k in started]
+                cond.wait(min(deadlines) - now if deadlines else timeout)
+    return results
 
 
-def find_courses_for_skills(skills, max_results=2):
+def find_courses_for_skills(skills, max_results=None, tool=None, max_workers=10, timeout=15):
     """
     Find courses to learn missing skills
     Returns list of recommendations with skill, course_name, and url
-    """
-    if "TAVILY_API_KEY" not in os.environ:
-        return []
     
-    tool = TavilySearchResults()
-    recommendations = []
+    All skills (or the first max_results) are searched concurrently, at most
+    max_workers at a time. Each search gets `timeout` seconds from when it
+    starts; searches that fail or time out are skipped, so partial results are
+    returned. Results are cached per normalized skill for COURSE_CACHE_TTL,
+    and a skill already being searched by another call is not searched twice.
+    
+    `tool` is anything with an .invoke(query) method (defaults to Tavily).
+    """
+    if tool is None:
+        if "TAVILY_API_KEY" not in os.environ:
+            return []
+        tool = TavilySearchResults()
     
+    # De-duplicate on the normalized name, keep the original order
+    unique_skills = {}
     for skill in skills[:max_results]:
-        query = f"free interactive course to learn {skill} for beginners 2024"
-        
-        try:
-            results = tool.invoke(query)
-            
-            if results and len(results) > 0:
-                top_hit = results[0]
-                recommendations.append({
-                    "skill": skill,
-                    "course_name": top_hit.get('content', 'Course')[:100] + "...",
-                    "url": top_hit.get('url', '#')
-                })
-        except Exception as e:
-            print(f"Search failed for {skill}: {e}")
+        unique_skills.setdefault(normalize_skill(skill), skill)
+    
+    found = {}
+    to_search = {}
+    for key, skill in unique_skills.items():
+        cached = course_cache.get(key)
+        if cached is not None:
+            found[key] = dict(cached, skill=skill)
+        else:
+            to_search[key] = skill
+    
+    metrics.incr("course_searches", len(unique_skills) - len(to_search), source="cache")
+    metrics.incr("course_searches", len(to_search), source="search")
+    if to_search:
+        metrics.observe("course_search_batch_size", len(to_search))
+        # Searches cache their own results (see _search_course), late ones included
+        for key, recommendation in _search_with_deadlines(tool, to_search, max_workers, timeout).items():
+            if recommendation:
+                # A shared search carries the spelling of the call that started it
+                found[key] = dict(recommendation, skill=to_search[key])
     
-    return recommendations
+    return [found[key] for key in unique_skills if key in found]
 
 
 # ============================================
@@ -0,0 +1,166 @@
+"""
+Typed result model for the CV gap analysis
+
+The LLM answers with a JSON object of skill lists. Here that answer is:
+- parsed incrementally while it streams (StreamingSkillParser), so the UI can
+  show skills as they arrive
+- parsed and validated once against the prompt's fields (validate); fields
+  that are absent or not a list are reported so only those are asked again
+- turned into a GapAnalysis with the matched skills, counts and score
+  computed once (make_analysis) and cached with it, instead of redoing the
+  set arithmetic on every Streamlit rerun
+
+GapAnalysis is a plain dict (JSON-serializable for the caches).
+"""
+import json
+from typing import TypedDict
+
+# Fields each prompt must return; every field is a list of skill names
+SCHEMAS = {
+    "cv_gap": ("resume_skills_found", "job_skills_required", "missing_skills"),
+    "job_skills": ("job_skills_required",),
+    "resume_vs_skills": ("resume_skills_found", "missing_skills"),
+    "prefiltered_gap": ("additional_required_skills", "missing_skills"),
+}
+
+
+class GapAnalysis(TypedDict):
+    resume_skills_found: list
+    job_skills_required: list
+    missing_skills: list
+    matched_skills: list
+    matched_count: int
+    required_count: int
+    score: float  # 0-100
+
+
+class SchemaError(ValueError):
+    """The LLM reply is not JSON, or still lacks fields after asking again"""
+
+    def __init__(self, message, missing=()):
+        super().__init__(message)
+        self.missing = list(missing)
+
+
+def _skill(value):
+    return " ".join(value.lower().split())
+
+
+def _skill_list(values):
+    """Strings only, lowercased, whitespace collapsed, de-duplicated in order"""
+    return list(dict.fromkeys(_skill(v) for v in values if isinstance(v, str) and v.strip()))
+
+
+def parse_json_object(text):
+    """The outermost {...} of an LLM reply (tolerates ```json fences and chatter around it)"""
+    first, last = text.find("{"), text.rfind("}")
+    if first < 0 or last < first:
+        raise SchemaError(f"no JSON object in reply: {text[:200]!r}")
+    try:
+        data = json.loads(text[first:last + 1])
+    except ValueError as e:
+        raise SchemaError(f"invalid JSON in reply: {e}")
+    if not isinstance(data, dict):
+        raise SchemaError("reply is not a JSON object")
+    return data
+
+
+def validate(data, fields):
+    """({field: clean skill list} for the valid fields, [fields that are missing or not lists])"""
+    clean, missing = {}, []
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, list):
+            clean[field] = _skill_list(value)
+        else:
+            missing.append(field)
+    return clean, missing
+
+
+def make_analysis(resume_skills_found, job_skills_required, missing_skills):
+    """
+    GapAnalysis with the derived fields filled in
+
+    A required skill is matched unless it is listed as missing, so partial
+    matches the LLM accepted (CI/CD covered by Jenkins) count as matched.
+    """
+    required = _skill_list(job_skills_required)
+    missing = _skill_list(missing_skills)
+    missing_set = set(missing)
+    matched = [s for s in required if s not in missing_set]
+    return {
+        "resume_skills_found": _skill_list(resume_skills_found),
+        "job_skills_required": required,
+        "missing_skills": missing,
+        "matched_skills": matched,
+        "matched_count": len(matched),
+        "required_count": len(required),
+        "score": round(len(matched) / len(required) * 100, 1) if required else 0.0,
+    }
+
+
+class StreamingSkillParser:
+    """
+    Incremental parser for replies shaped like {"field": ["a", "b"], ...}
+
+    feed() takes the reply a piece at a time and returns the (field, skill)
+    pairs completed by that piece; fields holds everything seen so far.
+    Text before the first "{" is skipped and values other than strings in
+    top-level arrays are ignored. Each character is looked at once.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._buffer = []
+        self._key = None
+        self._expect_key = False
+        self._array_key = None
+
+    def feed(self, text):
+        completed = []
+        for ch in text:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string(completed)
+                    continue
+                self._buffer.append(ch)
+            elif not self._started:
+                if ch == "{":
+                    self._started, self._depth, self._expect_key = True, 1, True
+            elif ch == '"':
+                self._in_string, self._buffer = True, []
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2:
+                    self._array_key = self._key
+                    self.fields.setdefault(self._key, [])
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._array_key = None
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+        return completed
+
+    def _end_string(self, completed):
+        try:
+            value = json.loads('"' + "".join(self._buffer) + '"')
+        except ValueError:
+            return
+        if self._depth == 1 and self._expect_key:
+            self._key = value
+        elif self._depth == 2 and self._array_key is not None and value.strip():
+            skill = _skill(value)
+            self.fields[self._array_key].append(skill)
+            completed.append((self._array_key, skill))
@@ -1,13 +1,13 @@
 import streamlit as st
-import tempfile
-import os
 import sys
+import time
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from agent import extract_text_from_pdf, analyze_cv_gap, find_courses_for_skills
+from agent import cache_stats
+from jobs import JobRunner
 
 # ==========================================
 # PAGE CONFIG
@@ -83,11 +83,32 @@ with st.sidebar:
     # Analyze Button
     st.markdown("---")
     analyze_button = st.button("🔍 Analyze CV Gap", use_container_width=True, type="primary")
+    
+    # Cache stats
+    with st.expander("⚡ Cache stats"):
+        for stats in cache_stats():
+            st.caption(
+                f"**{stats['name']}** - hit rate {stats['hit_rate']:.0%} "
+                f"({stats['memory_hits']} memory / {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses, {stats['evictions']} evictions)"
+            )
 
 # ==========================================
 # MAIN CONTENT
 # ==========================================
 
+@st.cache_resource
+def get_job_runner():
+    """One background runner shared by every session and rerun"""
+    return JobRunner()
+
+
+runner = get_job_runner()
+
+# Reattach to in-flight work after a page reload (?job=<id>)
+if "job_id" not in st.session_state and "job" in st.query_params:
+    st.session_state.job_id = st.query_params["job"]
+
 if analyze_button:
     # Validation
     if not pdf_file:
@@ -95,21 +116,48 @@ if analyze_button:
     elif not job_description.strip():
         st.error("❌ Please paste a job description")
     else:
-        # Process Resume
-        with st.spinner("📖 Reading your resume..."):
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(pdf_file.getbuffer())
-                tmp_path = tmp_file.name
-            
-            try:
-                resume_text = extract_text_from_pdf(tmp_path)
-            finally:
-                os.unlink(tmp_path)
-        
-        # Analyze CV Gap
-        with st.spinner("🤖 Analyzing your skills vs job requirements..."):
-            analysis = analyze_cv_gap(job_description, resume_text)
-        
+        # Same resume + JD reattaches to the existing job instead of starting over
+        st.session_state.job_id = runner.submit(pdf_file.getvalue(), job_description)
+        st.query_params["job"] = st.session_state.job_id
+
+job = runner.get(st.session_state.job_id) if st.session_state.get("job_id") else None
+
+STAGE_LABELS = {
+    "extract": "📖 Reading your resume",
+    "analyze": "🤖 Analyzing your skills vs job requirements",
+    "courses": "🔎 Finding courses for your skill gaps",
+}
+STATUS_ICONS = {"pending": "⏳", "running": "🔄", "done": "✅", "error": "❌", "skipped": "⏭️"}
+
+if job is not None:
+    state = job.snapshot()
+    
+    # Stage progress
+    st.caption(
+        f"Job `{state['id']}` · " + " · ".join(
+            f"{STATUS_ICONS[status]} {STAGE_LABELS[stage]}"
+            + (f" ({state['timings'][stage]:.1f}s)" if stage in state['timings'] else "")
+            for stage, status in state['status'].items()
+        )
+    )
+    if state['error']:
+        st.error(f"❌ {state['error']}")
+    
+    analysis = state['results'].get('analyze')
+    
+    if analysis is None:
+        if not state['error']:
+            running = next((s for s, status in state['status'].items() if status == "running"), "extract")
+            st.info(f"{STAGE_LABELS[running]}...")
+            # Skills streamed so far by the LLM
+            partial = state['partial'].get('analyze')
+            if partial:
+                for label, field in (("Skills found in your resume", "resume_skills_found"),
+                                     ("Required by the job", "job_skills_required"),
+                                     ("Missing so far", "missing_skills")):
+                    if partial.get(field):
+                        st.write(f"**{label}:** " + ", ".join(f"`{s}`" for s in partial[field]))
+    else:
         # ==========================================
         # DISPLAY RESULTS
         # ==========================================
@@ -120,14 +168,13 @@ if analyze_button:
         with tab1:
             st.subheader("Skills Analysis")
             
-            # Overall Score
-            resume_skills = set(analysis.get('resume_skills_found', []))
-            required_skills = set(analysis.get('job_skills_required', []))
-            missing_skills = analysis.get('missing_skills', [])
+            # Overall Score (computed once with the analysis, see analysis_result.py)
+            resume_skills = analysis['resume_skills_found']
+            missing_skills = analysis['missing_skills']
             
-            matched_count = len(set(required_skills) & set(resume_skills))
-            total_required = len(required_skills)
-            match_percentage = (matched_count / total_required * 100) if total_required > 0 else 0
+            matched_count = analysis['matched_count']
+            total_required = analysis['required_count']
+            match_percentage = analysis['score']
             
             # Score Display
             col1, col2, col3 = st.columns(3)
@@ -158,7 +205,7 @@ if analyze_button:
             
             # Matched Skills
             st.subheader("✅ Your Matching Skills")
-            matched_skills = set(required_skills) & set(resume_skills)
+            matched_skills = analysis['matched_skills']
             if matched_skills:
                 for skill in sorted(matched_skills):
                     st.markdown(
@@ -183,37 +230,38 @@ if analyze_button:
         with tab2:
             st.subheader("🎓 Learning Resources")
             
-            if missing_skills:
-                with st.spinner("🔎 Finding courses for your skill gaps..."):
-                    recommendations = find_courses_for_skills(missing_skills)
+            recommendations = state['results'].get('courses')
+            
+            if not missing_skills:
+                st.success("🎉 No skill gaps to fill! You're ready to apply!")
+            elif recommendations is None:
+                if state['status']['courses'] in ("pending", "running"):
+                    st.info("🔎 Finding courses for your skill gaps...")
+            elif recommendations:
+                st.success(f"Found {len(recommendations)} learning resources!")
                 
-                if recommendations:
-                    st.success(f"Found {len(recommendations)} learning resources!")
+                for i, rec in enumerate(recommendations, 1):
+                    col1, col2 = st.columns([2, 1])
                     
-                    for i, rec in enumerate(recommendations, 1):
-                        col1, col2 = st.columns([2, 1])
-                        
-                        with col1:
-                            st.markdown(f"""
-                            <div class="course-card">
-                                <h4>📖 {rec['skill'].capitalize()}</h4>
-                                <p>{rec['course_name']}</p>
-                                <a href="{rec['url']}" target="_blank" style="color: #0066cc; text-decoration: none;">
-                                    🔗 View Course →
-                                </a>
-                            </div>
-                            """, unsafe_allow_html=True)
-                else:
-                    st.warning("⚠️ Could not find courses. Please set TAVILY_API_KEY to enable course recommendations.")
-                    st.info("You can still learn these skills through online platforms like:")
-                    st.markdown("""
-                    - **Udemy** - https://www.udemy.com
-                    - **Coursera** - https://www.coursera.org
-                    - **freeCodeCamp** - https://www.freecodecamp.org
-                    - **Codecademy** - https://www.codecademy.com
-                    """)
+                    with col1:
+                        st.markdown(f"""
+                        <div class="course-card">
+                            <h4>📖 {rec['skill'].capitalize()}</h4>
+                            <p>{rec['course_name']}</p>
+                            <a href="{rec['url']}" target="_blank" style="color: #0066cc; text-decoration: none;">
+                                🔗 View Course →
+                            </a>
+                        </div>
+                        """, unsafe_allow_html=True)
             else:
-                st.success("🎉 No skill gaps to fill! You're ready to apply!")
+                st.warning("⚠️ Could not find courses. Please set TAVILY_API_KEY to enable course recommendations.")
+                st.info("You can still learn these skills through online platforms like:")
+                st.markdown("""
+                - **Udemy** - https://www.udemy.com
+                - **Coursera** - https://www.coursera.org
+                - **freeCodeCamp** - https://www.freecodecamp.org
+                - **Codecademy** - https://www.codecademy.com
+                """)
         
         # Details Tab
         with tab3:
@@ -237,6 +285,11 @@ if analyze_button:
             
             st.write("**Raw Analysis:**")
             st.json(analysis)
+    
+    # Poll until every stage has finished, rendering whatever is ready on each pass
+    if not state['done']:
+        time.sleep(0.5)
+        st.rerun()
 
 else:
     # Welcome State
@@ -0,0 +1,206 @@
+"""
+Batch CV screening: many resumes against one job description
+
+- PDF text is extracted in a process pool
+- The JD's required skills are extracted once and reused for every resume
+- With SKILL_MATCHER=embedding resumes are matched locally, all in one
+  similarity matrix; only resumes the skill taxonomy barely covers, or that
+  miss required skills outside it, go to the LLM
+- LLM calls run concurrently, under a requests-per-minute limit
+- Results are streamed to a CSV or JSONL file as they finish, then the
+  file is rewritten ranked by match score
+
+Usage (from the Agent-CV-gap directory):
+    python batch.py resumes/ --jd job.txt --out ranking.csv
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from agent import (SKILL_MATCHER, extract_text_from_pdf, extract_job_skills, analyze_resume_against_skills,
+                   analyze_resumes_locally)
+
+FIELDS = ["rank", "file", "score", "matched", "required", "missing_skills", "resume_skills_found", "error"]
+
+
+class RateLimiter:
+    """Spaces out calls so no more than requests_per_minute start per minute (thread-safe)"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def score_analysis(analysis):
+    """Match score (0-100) plus matched / required counts, as shown in the Streamlit app (precomputed)"""
+    return analysis["score"], analysis["matched_count"], analysis["required_count"]
+
+
+class ResultWriter:
+    """Appends result rows to a .csv or .jsonl file as they arrive"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = "jsonl" if self.path.suffix == ".jsonl" else "csv"
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            self._csv.writeheader()
+
+    def write(self, row):
+        with self._lock:
+            if self.format == "jsonl":
+                self._file.write(json.dumps(row) + "\n")
+            else:
+                self._csv.writerow(self._flatten(row))
+            self._file.flush()
+
+    def finalize(self, rows):
+        """Rewrite the file with every row, ranked"""
+        self._file.close()
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            if self.format == "jsonl":
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+            else:
+                ranked = csv.DictWriter(f, fieldnames=FIELDS)
+                ranked.writeheader()
+                ranked.writerows(self._flatten(row) for row in rows)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _flatten(row):
+        return {k: "; ".join(v) if isinstance(v, list) else v for k, v in row.items()}
+
+
+def screen_resumes(resume_dir, job_description, out_path, extract_workers=None, llm_workers=4, requests_per_minute=30):
+    """
+    Screen every PDF in resume_dir against job_description
+    Returns the ranked list of result rows (also written to out_path)
+    """
+    pdf_paths = sorted(Path(resume_dir).glob("*.pdf"))
+    if not pdf_paths:
+        print(f"❌ No PDFs found in {resume_dir}")
+        return []
+
+    print("📋 Extracting required skills from the job description...")
+    required_skills = extract_job_skills(job_description)
+    print(f"   {len(required_skills)} skills: {', '.join(required_skills)}")
+
+    limiter = RateLimiter(requests_per_minute)
+    writer = ResultWriter(out_path)
+    rows = []
+
+    def analyze(path, resume_text):
+        # Only requests that actually reach Groq wait for a rate-limit slot (not cache hits)
+        return to_row(path, analyze_resume_against_skills(required_skills, resume_text, before_llm=limiter.acquire))
+
+    def to_row(path, analysis):
+        score, matched, required = score_analysis(analysis)
+        return {
+            "file": path.name,
+            "score": score,
+            "matched": matched,
+            "required": required,
+            "missing_skills": analysis["missing_skills"],
+            "resume_skills_found": analysis["resume_skills_found"],
+            "error": "",
+        }
+
+    def record(row):
+        rows.append(row)
+        writer.write(row)
+        print(f"   [{len(rows)}/{len(pdf_paths)}] {row['file']}: {row['score']}% {row['error']}")
+
+    start = time.perf_counter()
+    print(f"🤖 Screening {len(pdf_paths)} resumes...")
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+        extract_futures = {extract_pool.submit(extract_text_from_pdf, str(p)): p for p in pdf_paths}
+        llm_futures = {}
+        # Matched locally all at once (one similarity matrix) after extraction
+        local = []
+
+        # Hand each resume to the LLM pool as soon as its text is ready
+        for future in as_completed(extract_futures):
+            path = extract_futures[future]
+            try:
+                resume_text = future.result()
+            except Exception as e:
+                record({"file": path.name, "score": 0.0, "matched": 0, "required": len(required_skills),
+                        "missing_skills": [], "resume_skills_found": [], "error": f"extract failed: {e}"})
+                continue
+            if SKILL_MATCHER == "embedding":
+                local.append((path, resume_text))
+            else:
+                llm_futures[llm_pool.submit(analyze, path, resume_text)] = path
+
+        if local:
+            analyses = analyze_resumes_locally(required_skills, [text for _, text in local])
+            for (path, resume_text), analysis in zip(local, analyses):
+                if analysis is None:
+                    # Too few skills the taxonomy knows: the LLM reads the resume
+                    llm_futures[llm_pool.submit(analyze, path, resume_text)] = path
+                else:
+                    record(to_row(path, analysis))
+
+        for future in as_completed(llm_futures):
+            path = llm_futures[future]
+            try:
+                record(future.result())
+            except Exception as e:
+                record({"file": path.name, "score": 0.0, "matched": 0, "required": len(required_skills),
+                        "missing_skills": [], "resume_skills_found": [], "error": f"analysis failed: {e}"})
+
+    rows.sort(key=lambda r: (r["error"] != "", -r["score"], r["file"]))
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    writer.finalize(rows)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Screened {len(rows)} resumes in {elapsed:.1f}s -> {out_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("resume_dir", help="directory containing resume PDFs")
+    parser.add_argument("--jd", required=True, help="text file with the job description")
+    parser.add_argument("--out", default="ranking.csv", help="output file (.csv or .jsonl)")
+    parser.add_argument("--extract-workers", type=int, default=None, help="PDF extraction processes (default: CPU count)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--rpm", type=int, default=30, help="max LLM requests per minute")
+    args = parser.parse_args()
+
+    with open(args.jd, encoding="utf-8") as f:
+        job_description = f.read()
+
+    ranking = screen_resumes(
+        args.resume_dir,
+        job_description,
+        args.out,
+        extract_workers=args.extract_workers,
+        llm_workers=args.llm_workers,
+        requests_per_minute=args.rpm,
+    )
+
+    print("\n🏆 Top candidates:")
+    for row in ranking[:10]:
+        print(f"   {row['rank']:>3}. {row['file']:<40} {row['score']:>5}%  missing: {', '.join(row['missing_skills'])}")
@@ -0,0 +1,65 @@
+"""
+Benchmark find_courses_for_skills against a local stub search tool
+
+Compares sequential search (1 worker) with the concurrent pool.
+Run from the Agent-CV-gap directory:
+    python bench_courses.py --skills 10 --latency 0.5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Keep benchmark entries out of the real course cache
+os.environ.setdefault("CV_GAP_CACHE_DIR", tempfile.mkdtemp(prefix="cv_gap_bench_"))
+
+from agent import find_courses_for_skills, course_cache
+
+
+class StubSearchTool:
+    """Stands in for TavilySearchResults: sleeps, then returns a fake hit (or fails)"""
+
+    def __init__(self, latency=0.5, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("stub search failure")
+        return [{"content": f"Stub course for: {query}", "url": "https://example.com/course"}]
+
+
+def run(label, skills, tool, **kwargs):
+    course_cache.clear()
+    start = time.perf_counter()
+    recommendations = find_courses_for_skills(skills, tool=tool, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:6.2f}s  {len(recommendations)}/{len(skills)} results  {tool.calls} calls")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skills", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub search")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=10)
+    args = parser.parse_args()
+
+    skills = [f"skill-{i}" for i in range(args.skills)]
+    print(f"🔎 {args.skills} skills, {args.latency}s per search\n")
+
+    sequential = run("sequential", skills, StubSearchTool(args.latency, args.failure_rate), max_workers=1, timeout=60)
+    concurrent = run("concurrent", skills, StubSearchTool(args.latency, args.failure_rate), max_workers=args.workers)
+
+    # Second concurrent run without clearing the cache: served locally
+    tool = StubSearchTool(args.latency, args.failure_rate)
+    start = time.perf_counter()
+    find_courses_for_skills(skills, tool=tool, max_workers=args.workers)
+    print(f"{'cached':<12} {time.perf_counter() - start:6.2f}s  {tool.calls} calls")
+
+    print(f"\n⚡ Speed-up: {sequential / concurrent:.1f}x")
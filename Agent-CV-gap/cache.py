@@ -0,0 +1,172 @@
+"""
+Content-hash keyed caches for the CV gap agent
+
+Two tiers:
+- memory: LRU dict, bounded by number of entries
+- disk:   one JSON file per key, bounded by number of files (oldest evicted)
+
+Entries can expire after a TTL. Hit / miss counts are kept per tier.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = os.getenv("CV_GAP_CACHE_DIR", str(Path(__file__).parent / ".cache"))
+
+
+def content_hash(*parts) -> str:
+    """SHA-256 of the given str/bytes parts (length-prefixed so parts can't run together)"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class TieredCache:
+    """Memory + disk cache for JSON-serializable values"""
+
+    def __init__(self, name, max_memory_entries=128, max_disk_entries=1024, ttl=None, cache_dir=DEFAULT_CACHE_DIR):
+        self.name = name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.disk_dir = Path(cache_dir) / name if cache_dir and max_disk_entries else None
+
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # ------------------------------------------
+    # Public API
+    # ------------------------------------------
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._put_memory(key, entry)
+                return entry[1]
+            self.stats["misses"] += 1
+        return default
+
+    def set(self, key, value):
+        """Store value in both tiers"""
+        entry = (time.time(), value)
+        with self._lock:
+            self._put_memory(key, entry)
+        self._write_disk(key, entry)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value, or call compute() and cache its result"""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(self.hit_rate(), 3),
+        }
+
+    # ------------------------------------------
+    # Internals
+    # ------------------------------------------
+
+    def _expired(self, stored_at) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _put_memory(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _path(self, key) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self._expired(payload["stored_at"]):
+            path.unlink(missing_ok=True)
+            return None
+        return payload["stored_at"], payload["value"]
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": entry[0], "value": entry[1]}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Cache write failed for {self.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = list(self.disk_dir.glob("*.json"))
+        overflow = len(files) - self.max_disk_entries
+        if overflow <= 0:
+            return
+        def mtime(path):
+            try:
+                return path.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        files.sort(key=mtime)
+        for path in files[:overflow]:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.stats["evictions"] += 1
@@ -0,0 +1,132 @@
+"""
+Background job runner for the CV gap pipeline
+
+A job runs extract -> analyze -> course search on a worker thread and
+publishes each stage's result as soon as it is ready (and the analysis's
+skills while the LLM reply streams), so the Streamlit app can render
+progressively instead of blocking the script run.
+
+Job IDs are derived from the inputs: submitting the same resume + JD again
+(duplicate click, rerun, page reload) reattaches to the job already in
+flight or finished instead of starting over.
+"""
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import extract_text_from_pdf_bytes, analyze_cv_gap, find_courses_for_skills
+from cache import content_hash
+
+STAGES = ("extract", "analyze", "courses")
+
+
+class Job:
+    """State of one pipeline run; read from the UI thread, written by the worker"""
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.created_at = time.time()
+        self.status = {stage: "pending" for stage in STAGES}
+        self.results = {}
+        self.partial = {}  # stage -> result so far, while it is still running
+        self.timings = {}
+        self.error = None
+        self._lock = threading.Lock()
+
+    def start(self, stage):
+        with self._lock:
+            self.status[stage] = "running"
+            self.timings[stage] = time.perf_counter()
+
+    def update(self, stage, partial):
+        with self._lock:
+            self.partial[stage] = partial
+
+    def finish(self, stage, result):
+        with self._lock:
+            self.partial.pop(stage, None)
+            self.results[stage] = result
+            self.status[stage] = "done"
+            self.timings[stage] = time.perf_counter() - self.timings[stage]
+
+    def fail(self, stage, error):
+        with self._lock:
+            self.status[stage] = "error"
+            self.error = f"{stage} failed: {error}"
+            # Later stages can't run without this one
+            for later in STAGES[STAGES.index(stage) + 1:]:
+                self.status[later] = "skipped"
+
+    @property
+    def done(self) -> bool:
+        return all(s in ("done", "error", "skipped") for s in self.status.values())
+
+    def snapshot(self) -> dict:
+        """Consistent copy of the job state for rendering"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": dict(self.status),
+                "results": dict(self.results),
+                "partial": dict(self.partial),
+                "timings": {k: v for k, v in self.timings.items() if self.status[k] == "done"},
+                "error": self.error,
+                "done": self.done,
+            }
+
+
+class JobRunner:
+    """Runs CV gap jobs on a thread pool and keeps the most recent ones"""
+
+    def __init__(self, max_workers=4, max_jobs=100):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cv-gap-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_bytes, job_description) -> str:
+        """Start a job (or reattach to an identical one) and return its ID"""
+        pdf_bytes = bytes(pdf_bytes)
+        job_id = content_hash(pdf_bytes, job_description)[:12]
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.error is None:
+                self._jobs.move_to_end(job_id)
+                return job_id
+
+            job = Job(job_id)
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+        self._executor.submit(self._run, job, pdf_bytes, job_description)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, pdf_bytes, job_description):
+        stage = "extract"
+        try:
+            job.start(stage)
+            resume_text = extract_text_from_pdf_bytes(pdf_bytes)
+            job.finish(stage, resume_text)
+
+            stage = "analyze"
+            job.start(stage)
+            # Skills show up in the UI as the LLM reply streams in
+            analysis = analyze_cv_gap(job_description, resume_text,
+                                      on_partial=lambda partial: job.update("analyze", partial))
+            job.finish(stage, analysis)
+
+            # Starts as soon as missing_skills is known, not when the tab renders
+            stage = "courses"
+            job.start(stage)
+            missing_skills = analysis["missing_skills"]
+            job.finish(stage, find_courses_for_skills(missing_skills) if missing_skills else [])
+        except Exception as e:
+            traceback.print_exc()
+            job.fail(stage, e)
@@ -1,19 +1,22 @@
-from typing import TypedDict
-from langgraph.graph import StateGraph, END
-from agent import extract_text_from_pdf, analyze_cv_gap, find_courses_for_skills
+import argparse
+import operator
+import sqlite3
+import time
+from typing import Annotated, TypedDict
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+
+from agent import extract_text_from_pdf, extract_job_skills, analyze_resume_against_skills, find_courses_for_skills
+from cache import content_hash
+from skills import extract_skills
 
 import pprint
 
-class AgentState(TypedDict):
-    resume_text: str
-    job_description: str
-    missing_skills: list
-    courses: list
+CHECKPOINT_DB = "langgraph_checkpoints.sqlite"
 
-pdf_text = extract_text_from_pdf("sample.pdf")
-state = AgentState()
-state['resume_text'] = pdf_text
-state['job_description'] = """
+DEFAULT_JOB_DESCRIPTION = """
 
     JOB TITLE: Senior Frontend Engineer
     COMPANY: NexusStream Analytics
@@ -45,43 +48,125 @@ state['job_description'] = """
     - Strong problem-solving attitude and leadership qualities.
     """
 
+
+def merge_dicts(left, right):
+    return {**(left or {}), **(right or {})}
+
+
+class AgentState(TypedDict, total=False):
+    pdf_path: str
+    resume_text: str
+    resume_skills: list
+    job_description: str
+    job_skills: list
+    missing_skills: list
+    # Written by parallel branches, so updates are merged instead of overwritten
+    courses: Annotated[list, operator.add]
+    timings: Annotated[dict, merge_dicts]
+
+
+def timed(name, node, label=None):
+    """Wrap a node so its wall time is printed and recorded in state['timings']"""
+    def wrapper(state):
+        key = label(state) if label else name
+        start = time.perf_counter()
+        update = node(state)
+        elapsed = time.perf_counter() - start
+        print(f"   ⏱️  {key}: {elapsed:.2f}s")
+        return {**update, "timings": {key: round(elapsed, 3)}}
+    return wrapper
+
+
+# ==========================================
+# NODES
+# ==========================================
+
+def resume_node(state: AgentState):
+    # Runs in parallel with jd_node
+    resume_text = extract_text_from_pdf(state['pdf_path'])
+    return {"resume_text": resume_text, "resume_skills": sorted(extract_skills(resume_text))}
+
+def jd_node(state: AgentState):
+    return {"job_skills": extract_job_skills(state['job_description'])}
+
 def scanner_node(state: AgentState):
-    # 1. READ from the folder
-    resume = state['resume_text'] 
-    
-    # 2. DO work (Your LLM logic)
-    found_gaps = analyze_cv_gap(state['job_description'], resume) # e.g., ['docker', 'react']
-    
-    # 3. WRITE back to the folder (Update)
-    # We only return the key we want to update.
-    return {"missing_skills": found_gaps['missing_skills']} 
-
-def searcher_node(state: AgentState):
-    missing_skills = state['missing_skills']
-    
-    recommendations = find_courses_for_skills(missing_skills)
-    
-    return {"courses": recommendations}
-
-# 2. Define the Graph
-workflow = StateGraph(AgentState)
-workflow.add_node("scanner", scanner_node)
-workflow.add_node("searcher", searcher_node)
-
-workflow.add_conditional_edges(
-    "scanner",
-    lambda state: "searcher" if state['missing_skills'] else END
-)
-
-workflow.set_entry_point("scanner")
-workflow.add_edge("searcher", END)
-
-# 5. Compile
-app = workflow.compile()
-
-print("🚀 Starting LangGraph Workflow...")
-result = app.invoke(state)
-
-print("\n✅ FINAL RESULT:")
-
-pprint.pprint(result['courses'])
\ No newline at end of file
+    # Join point: needs both the resume text and the JD skills
+    analysis = analyze_resume_against_skills(state['job_skills'], state['resume_text'])
+    return {"missing_skills": analysis['missing_skills']}
+
+def searcher_node(state: dict):
+    # One branch per missing skill (see fan_out_searches)
+    skill = state['skill']
+    return {"courses": find_courses_for_skills([skill])}
+
+def fan_out_searches(state: AgentState):
+    if not state['missing_skills']:
+        return END
+    return [Send("searcher", {"skill": skill}) for skill in state['missing_skills']]
+
+
+def build_workflow(checkpointer=None):
+    workflow = StateGraph(AgentState)
+    workflow.add_node("resume", timed("resume", resume_node))
+    workflow.add_node("jd", timed("jd", jd_node))
+    workflow.add_node("scanner", timed("scanner", scanner_node))
+    workflow.add_node("searcher", timed("searcher", searcher_node, label=lambda s: f"searcher:{s['skill']}"))
+
+    # resume and jd fan out from START and join at scanner
+    workflow.add_edge(START, "resume")
+    workflow.add_edge(START, "jd")
+    workflow.add_edge(["resume", "jd"], "scanner")
+    workflow.add_conditional_edges("scanner", fan_out_searches, ["searcher", END])
+    workflow.add_edge("searcher", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def run(app, pdf_path, job_description):
+    """
+    Run (or resume) the workflow for one resume
+
+    The thread id is derived from the inputs, so re-running after a crash
+    picks up from the last completed node instead of starting over.
+    """
+    with open(pdf_path, "rb") as f:
+        thread_id = content_hash(f.read(), job_description)[:16]
+    config = {"configurable": {"thread_id": thread_id}}
+
+    snapshot = app.get_state(config)
+    start = time.perf_counter()
+    if snapshot.next:
+        print(f"♻️  Resuming {pdf_path} (thread {thread_id}) at: {', '.join(snapshot.next)}")
+        result = app.invoke(None, config)
+    elif snapshot.values:
+        print(f"✅ {pdf_path} already completed (thread {thread_id})")
+        result = snapshot.values
+    else:
+        print(f"🚀 Starting {pdf_path} (thread {thread_id})")
+        result = app.invoke({"pdf_path": pdf_path, "job_description": job_description}, config)
+    print(f"   ⏱️  total: {time.perf_counter() - start:.2f}s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV gap LangGraph workflow with SQLite checkpointing")
+    parser.add_argument("pdfs", nargs="*", default=["sample.pdf"], help="resume PDFs")
+    parser.add_argument("--jd", help="text file with the job description (default: built-in example)")
+    parser.add_argument("--db", default=CHECKPOINT_DB, help="SQLite checkpoint database")
+    args = parser.parse_args()
+
+    job_description = DEFAULT_JOB_DESCRIPTION
+    if args.jd:
+        with open(args.jd, encoding="utf-8") as f:
+            job_description = f.read()
+
+    conn = sqlite3.connect(args.db, check_same_thread=False)
+    app = build_workflow(checkpointer=SqliteSaver(conn))
+
+    print("🚀 Starting LangGraph Workflow...")
+    for pdf_path in args.pdfs:
+        result = run(app, pdf_path, job_description)
+
+        print("\n✅ FINAL RESULT:")
+        pprint.pprint(result.get('courses', []))
+        pprint.pprint(result.get('timings', {}))
@@ -0,0 +1,107 @@
+"""
+Streaming, page-parallel PDF text extraction (pypdf)
+
+- iter_pages() yields one page at a time instead of loading the whole document
+- extract_text() splits long documents into page ranges parsed in worker processes
+- Pages without fonts, directly or in Form XObjects (scans / image-only), are skipped
+  without running the text extractor
+- Sources can be a path, raw bytes or a binary file object, so uploads never touch disk
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+# Bump when extraction output changes so text cached from older versions is not reused
+EXTRACTOR_VERSION = "2"
+# Documents shorter than this are parsed in-process (worker start-up costs more than it saves)
+PARALLEL_MIN_PAGES = 24
+PAGES_PER_TASK = 8
+
+
+def _open_reader(source):
+    """PdfReader over a path, bytes/bytearray/memoryview or a binary file object"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return PdfReader(io.BytesIO(bytes(source)))
+    return PdfReader(source)
+
+
+def _has_fonts(resources, seen) -> bool:
+    """Fonts in these resources or in any Form XObject they draw (nested forms included)"""
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    fonts = resources.get("/Font")
+    if fonts is not None and len(fonts.get_object()) > 0:
+        return True
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return False
+    for ref in xobjects.get_object().values():
+        key = getattr(ref, "idnum", None)
+        if key is not None:
+            if key in seen:
+                continue  # forms can reference each other
+            seen.add(key)
+        xobject = ref.get_object()
+        if xobject.get("/Subtype") == "/Form" and _has_fonts(xobject.get("/Resources"), seen):
+            return True
+    return False
+
+
+def _has_text_layer(page) -> bool:
+    """Cheap check: a page with no fonts in its resources (or its forms') cannot contain extractable text"""
+    return _has_fonts(page.get("/Resources"), set())
+
+
+def iter_pages(source, start=0, stop=None, skip_image_only=True):
+    """Yield (page_number, text) lazily for pages [start, stop)"""
+    reader = _open_reader(source)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for page_number in range(start, stop):
+        page = reader.pages[page_number]
+        if skip_image_only and not _has_text_layer(page):
+            continue
+        yield page_number, page.extract_text() or ""
+
+
+def _extract_range(pdf_bytes, start, stop, skip_image_only):
+    """Worker: text of pages [start, stop) as a list of (page_number, text)"""
+    return list(iter_pages(pdf_bytes, start, stop, skip_image_only))
+
+
+def count_pages(source) -> int:
+    return len(_open_reader(source).pages)
+
+
+def extract_text(source, workers=None, skip_image_only=True):
+    """
+    Extract the text of a whole PDF, pages joined with spaces
+
+    Long documents are split into PAGES_PER_TASK page ranges and parsed in
+    a process pool; short ones stream through iter_pages in-process. Inside
+    a worker process (e.g. batch.py's extraction pool) pages are always
+    parsed in-process rather than starting a pool per worker.
+    """
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        if hasattr(source, "read"):
+            source = source.read()
+        else:
+            with open(source, "rb") as f:
+                source = f.read()
+    pdf_bytes = bytes(source)
+
+    n_pages = count_pages(pdf_bytes)
+    if multiprocessing.parent_process() is not None:
+        workers = 1
+    workers = workers or os.cpu_count() or 1
+    if n_pages < PARALLEL_MIN_PAGES or workers < 2:
+        return " ".join(text for _, text in iter_pages(pdf_bytes, skip_image_only=skip_image_only))
+
+    ranges = [(start, min(start + PAGES_PER_TASK, n_pages)) for start in range(0, n_pages, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_extract_range, pdf_bytes, start, stop, skip_image_only) for start, stop in ranges]
+        # Futures are consumed in submission order, so pages stay in document order
+        return " ".join(text for future in futures for _, text in future.result())
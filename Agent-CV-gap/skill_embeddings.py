@@ -0,0 +1,263 @@
+"""
+Embedding-based skill matching
+
+Instead of asking the LLM whether "jenkins" covers "ci/cd", every skill is
+embedded with all-MiniLM-L6-v2 and a required skill counts as covered when
+its cosine similarity to one of the resume's skills reaches a threshold.
+
+- Each canonical skill in SKILL_TAXONOMY is represented by the centroid of
+  its name and aliases ("ci/cd", "continuous integration", "cicd", ...).
+  The vectors are computed once and cached on disk (keyed by model and
+  taxonomy), so building the index afterwards is a file read.
+- Skills outside the vocabulary (e.g. extra ones the LLM found in a JD) are
+  embedded on first use and memoized.
+- match_many() scores a JD's required skills against every resume of a batch
+  with one matrix product (required x all distinct skills), then takes each
+  resume's best match per required skill with one gather + max.
+
+Results are deterministic for a given model, taxonomy and threshold.
+
+Tune the threshold (SKILL_MATCH_THRESHOLD) on labelled pairs, benchmark a batch
+(from the Agent-CV-gap directory):
+    python skill_embeddings.py --labels skill_pairs.jsonl
+    python skill_embeddings.py --pairs "ci/cd:jenkins,docker:kubernetes"
+    python skill_embeddings.py --batch 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cache import DEFAULT_CACHE_DIR, content_hash
+from skills import SAMPLE_JD, SKILL_TAXONOMY, canonical_skill, extract_skills, synthetic_resume
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+# Minimum cosine similarity for a resume skill to cover a required one
+DEFAULT_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.7"))
+
+
+def sentence_transformer_embedder(model_name=DEFAULT_MODEL):
+    """list of texts -> unit-length float32 rows"""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def embed(texts):
+        return np.asarray(model.encode(list(texts), batch_size=256, normalize_embeddings=True), dtype=np.float32)
+    return embed
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class SkillEmbeddingIndex:
+    """Skill vocabulary vectors + thresholded cosine matching (see module docstring)"""
+
+    def __init__(self, embed_fn=None, taxonomy=SKILL_TAXONOMY, threshold=DEFAULT_THRESHOLD,
+                 model_name=DEFAULT_MODEL, cache_dir=DEFAULT_CACHE_DIR):
+        self.embed_fn = embed_fn or sentence_transformer_embedder(model_name)
+        self.threshold = threshold
+        self.skills = list(taxonomy)
+        self._rows = {skill: i for i, skill in enumerate(self.skills)}
+        self._extra = {}  # out-of-vocabulary skill -> row in self._extra_vectors
+        self._extra_vectors = np.empty((0, 0), dtype=np.float32)
+        # Guards _extra/_extra_vectors: batch and app threads share one index
+        self._lock = threading.RLock()
+
+        cache_path = None
+        if cache_dir and embed_fn is None:
+            key = content_hash(model_name, json.dumps(taxonomy, sort_keys=True))[:16]
+            cache_path = Path(cache_dir) / f"skill_vectors-{key}.npy"
+        if cache_path is not None and cache_path.exists():
+            self.vectors = np.load(cache_path)
+        else:
+            self.vectors = self._embed_groups(taxonomy)
+            if cache_path is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                np.save(cache_path, self.vectors)
+
+    def _embed_groups(self, taxonomy):
+        """Centroid of each skill's name + aliases, all phrases embedded in one call"""
+        phrases, owners = [], []
+        for i, (skill, aliases) in enumerate(taxonomy.items()):
+            for phrase in (skill, *aliases):
+                phrases.append(phrase)
+                owners.append(i)
+        phrase_vectors = _normalize(self.embed_fn(phrases))
+        sums = np.zeros((len(taxonomy), phrase_vectors.shape[1]), dtype=np.float32)
+        np.add.at(sums, np.asarray(owners), phrase_vectors)
+        return _normalize(sums)
+
+    # ------------------------------------------
+    # Vectors
+    # ------------------------------------------
+
+    def _add_extra(self, skills):
+        """Embed (in one call) the skills not in the vocabulary or seen before (caller holds _lock)"""
+        new = [s for s in dict.fromkeys(skills) if s not in self._rows and s not in self._extra]
+        if not new:
+            return
+        vectors = _normalize(self.embed_fn(new))
+        start = len(self._extra)
+        self._extra_vectors = vectors if start == 0 else np.vstack([self._extra_vectors, vectors])
+        for offset, skill in enumerate(new):
+            self._extra[skill] = start + offset
+
+    def vectors_for(self, skills):
+        """Unit vectors for canonical skill names (vocabulary rows or memoized extras)"""
+        skills = [canonical_skill(s) for s in skills]
+        dim = self.vectors.shape[1]
+        with self._lock:
+            self._add_extra(skills)
+            return np.stack([self.vectors[self._rows[s]] if s in self._rows else self._extra_vectors[self._extra[s]]
+                             for s in skills]) if skills else np.empty((0, dim), dtype=np.float32)
+
+    def similarity(self, a, b):
+        """Cosine similarity matrix between two skill lists"""
+        return self.vectors_for(a) @ self.vectors_for(b).T
+
+    # ------------------------------------------
+    # Matching
+    # ------------------------------------------
+
+    def match(self, required, resume_skills, threshold=None):
+        return self.match_many(required, [resume_skills], threshold)[0]
+
+    def match_many(self, required, resume_skill_lists, threshold=None):
+        """
+        Match required skills against each resume's skills
+
+        Returns one dict per resume: {'matched': {required: [resume skill, score]},
+        'missing': [required skills below the threshold]}. Identical canonical
+        names always match.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        required = list(dict.fromkeys(canonical_skill(s) for s in required))
+        lists = [list(dict.fromkeys(canonical_skill(s) for s in skills)) for skills in resume_skill_lists]
+        if not required:
+            return [{"matched": {}, "missing": []} for _ in lists]
+
+        # Every distinct skill across the batch becomes one column
+        columns = list(dict.fromkeys(s for skills in lists for s in skills))
+        column_of = {skill: j for j, skill in enumerate(columns)}
+        scores = self.vectors_for(required) @ self.vectors_for(columns).T if columns else \
+            np.empty((len(required), 0), dtype=np.float32)
+        for i, skill in enumerate(required):
+            if skill in column_of:
+                scores[i, column_of[skill]] = 1.0  # float rounding must not split identical skills
+
+        # Resumes x padded skill slots; the padding column scores -inf
+        width = max((len(skills) for skills in lists), default=0)
+        padded = np.hstack([scores, np.full((len(required), 1), -np.inf, dtype=np.float32)])
+        slots = np.full((len(lists), max(width, 1)), len(columns), dtype=np.int64)
+        for n, skills in enumerate(lists):
+            slots[n, :len(skills)] = [column_of[s] for s in skills]
+        gathered = padded[:, slots]  # required x resumes x slots
+        best_slot = gathered.argmax(axis=2)
+        best_score = np.take_along_axis(gathered, best_slot[..., None], axis=2)[..., 0]
+
+        results = []
+        for n, skills in enumerate(lists):
+            matched, missing = {}, []
+            for i, skill in enumerate(required):
+                score = float(best_score[i, n])
+                if score >= threshold:
+                    matched[skill] = [skills[best_slot[i, n]], round(score, 3)]
+                else:
+                    missing.append(skill)
+            results.append({"matched": matched, "missing": missing})
+        return results
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_skill_index():
+    """Shared index on all-MiniLM-L6-v2 (vectors loaded or computed on first use)"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = SkillEmbeddingIndex()
+    return _default_index
+
+
+# ============================================
+# CLI
+# ============================================
+
+def _calibrate(index, labels_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from similarity import calibrate_threshold
+
+    with open(labels_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    scores = [float(index.similarity([r["required"]], [r["candidate"]])[0, 0]) for r in records]
+    for record, score in sorted(zip(records, scores), key=lambda p: -p[1]):
+        mark = "✓" if record["relevant"] else "✗"
+        print(f"   {mark} {record['required']:>20} ~ {record['candidate']:<24} {score:.3f}")
+    fit = calibrate_threshold(zip(scores, (r["relevant"] for r in records)))
+    if fit is None:
+        print("❌ No relevant pairs to calibrate on")
+        return
+    print(f"\n🎯 Best F1 threshold: {fit['threshold']:.3f} "
+          f"(precision {fit['precision']:.2f}, recall {fit['recall']:.2f}, F1 {fit['f1']:.2f})")
+    print(f"   export SKILL_MATCH_THRESHOLD={fit['threshold']:.3f}")
+
+
+def _bench(index, n_resumes, threshold):
+    rng = random.Random(42)
+    required = sorted(extract_skills(SAMPLE_JD))
+    resumes = [sorted(extract_skills(synthetic_resume(rng))) for _ in range(n_resumes)]
+
+    start = time.perf_counter()
+    batched = index.match_many(required, resumes, threshold)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    looped = [index.match(required, skills, threshold) for skills in resumes]
+    loop_s = time.perf_counter() - start
+    assert batched == looped
+
+    covered = sum(len(r["matched"]) for r in batched) / max(len(batched), 1)
+    print(f"📚 {n_resumes} resumes x {len(required)} required skills (threshold {threshold})")
+    print(f"   one matrix: {batch_s * 1000:.1f} ms ({n_resumes / batch_s:.0f} resumes/s)")
+    print(f"   per resume: {loop_s * 1000:.1f} ms ({n_resumes / loop_s:.0f} resumes/s)")
+    print(f"   {covered:.1f}/{len(required)} required skills covered on average")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--labels", help="JSONL of {required, candidate, relevant} pairs to fit the threshold on")
+    parser.add_argument("--pairs", help='comma-separated "required:candidate" pairs to score')
+    parser.add_argument("--batch", type=int, default=1000, help="synthetic resumes for the batch benchmark")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SkillEmbeddingIndex(model_name=args.model, threshold=args.threshold)
+    print(f"🧱 {len(index.skills)} skills indexed in {time.perf_counter() - start:.2f}s")
+
+    if args.labels:
+        _calibrate(index, args.labels)
+    elif args.pairs:
+        for pair in args.pairs.split(","):
+            required, candidate = pair.split(":")
+            score = float(index.similarity([required], [candidate])[0, 0])
+            print(f"   {required} ~ {candidate}: {score:.3f} {'✓' if score >= args.threshold else '✗'}")
+    else:
+        _bench(index, args.batch, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
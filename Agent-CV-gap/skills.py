@@ -0,0 +1,317 @@
+"""
+Local, deterministic skill extraction
+
+A small skill taxonomy (canonical name -> aliases) compiled into an
+Aho-Corasick automaton. One pass over the text finds every alias, checks
+word boundaries and maps it to its canonical name, so "HTML", "html5" and
+"Html" all come out as "html".
+
+Used by agent.py to resolve exact matches locally and only ask the LLM
+about the ambiguous remainder (e.g. "ci/cd" vs "jenkins").
+
+Benchmark (from the Agent-CV-gap directory):
+    python skills.py --batch 1000
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+SKILL_TAXONOMY = {
+    # Languages
+    "python": ["python3", "py"],
+    "javascript": ["js", "ecmascript", "es6", "es2015"],
+    "typescript": ["ts"],
+    "java": ["java8", "java 8", "java 11", "java 17"],
+    "c++": ["cpp", "c plus plus"],
+    "c#": ["csharp", "c sharp"],
+    "go": ["golang"],
+    "rust": [],
+    "kotlin": [],
+    "swift": [],
+    "php": [],
+    "ruby": [],
+    "scala": [],
+    "r": ["r language", "rstats"],
+    "sql": ["t-sql", "pl/sql", "plsql"],
+    "bash": ["shell scripting", "shell script", "sh"],
+    # Frontend
+    "html": ["html5", "html 5"],
+    "css": ["css3", "css 3"],
+    "sass": ["scss"],
+    "tailwind css": ["tailwind", "tailwindcss"],
+    "react": ["react.js", "reactjs", "react js"],
+    "react native": [],
+    "next.js": ["nextjs", "next js"],
+    "vue.js": ["vue", "vuejs", "vue js"],
+    "angular": ["angularjs", "angular.js"],
+    "svelte": [],
+    "redux": ["redux toolkit", "rtk"],
+    "zustand": [],
+    "webpack": [],
+    "vite": [],
+    "jquery": [],
+    # Testing
+    "jest": [],
+    "react testing library": ["testing library", "rtl"],
+    "cypress": [],
+    "playwright": [],
+    "selenium": [],
+    "pytest": [],
+    "junit": [],
+    "unit testing": ["unit tests", "unit test"],
+    # Backend
+    "node.js": ["nodejs", "node js", "node"],
+    "express": ["express.js", "expressjs"],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "spring": ["spring boot", "springboot"],
+    ".net": ["dotnet", "asp.net", ".net core"],
+    "graphql": ["graph ql", "apollo"],
+    "rest api": ["rest", "restful", "restful api", "rest apis"],
+    "grpc": [],
+    "microservices": ["microservice"],
+    # Data / ML
+    "pandas": [],
+    "numpy": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "tensorflow": [],
+    "pytorch": ["torch"],
+    "machine learning": ["ml"],
+    "deep learning": [],
+    "nlp": ["natural language processing"],
+    "llm": ["large language models", "llms"],
+    "langchain": [],
+    "spark": ["apache spark", "pyspark"],
+    "airflow": ["apache airflow"],
+    "kafka": ["apache kafka"],
+    # Databases
+    "postgresql": ["postgres", "psql"],
+    "mysql": [],
+    "mongodb": ["mongo"],
+    "redis": [],
+    "elasticsearch": ["elastic search", "elk"],
+    "sqlite": [],
+    # Cloud / DevOps
+    "aws": ["amazon web services"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "docker": ["docker compose", "docker-compose"],
+    "kubernetes": ["k8s"],
+    "terraform": [],
+    "ansible": [],
+    "ci/cd": ["cicd", "ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "github actions": [],
+    "gitlab ci": [],
+    "jenkins": [],
+    "git": [],
+    "linux": [],
+    # Practices
+    "agile": ["scrum", "kanban"],
+    "tdd": ["test driven development", "test-driven development"],
+    "oop": ["object oriented programming", "object-oriented programming"],
+    "figma": [],
+}
+# Related but not equivalent terms (containerization -> docker, github -> git,
+# ubuntu -> linux) are deliberately not aliases: an alias is an exact match no
+# one checks again, while these are partial matches for the matcher / LLM.
+
+# Aliases too ambiguous to match in free English text
+AMBIGUOUS_ALIASES = {"go", "r", "py", "sh", "ts", "rest", "node", "ml", "rtl", "rtk", "apollo", "spring", "express", "torch"}
+
+
+def _is_word_char(ch):
+    return ch.isalnum()
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over lowercase skill aliases"""
+
+    def __init__(self, taxonomy=SKILL_TAXONOMY, skip_aliases=AMBIGUOUS_ALIASES):
+        self.canonical = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # state -> list of (alias length, canonical)
+
+        for canonical, aliases in taxonomy.items():
+            canonical = canonical.lower()
+            self.canonical[canonical] = canonical
+            for alias in {canonical, *(a.lower() for a in aliases)}:
+                self.canonical[alias] = canonical
+                if alias not in skip_aliases:
+                    self._add(alias, canonical)
+        self._build()
+
+    def _add(self, alias, canonical):
+        state = 0
+        for ch in alias:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((len(alias), canonical))
+
+    def _build(self):
+        """Breadth-first pass that fills failure links and merges outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Return (start, end, canonical) for every whole-word alias hit, leftmost-longest, non-overlapping"""
+        text = text.lower()
+        hits = []
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        n = len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, canonical in output[state]:
+                start = i - length + 1
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                    continue
+                if i + 1 < n and _is_word_char(text[i + 1]) and _is_word_char(ch):
+                    continue
+                hits.append((start, i + 1, canonical))
+
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        selected = []
+        last_end = -1
+        for start, end, canonical in hits:
+            if start >= last_end:
+                selected.append((start, end, canonical))
+                last_end = end
+        return selected
+
+    def extract(self, text):
+        """Set of canonical skills mentioned in text"""
+        return {canonical for _, _, canonical in self.find_all(text)}
+
+    def normalize(self, skill):
+        """Canonical name for a known alias, otherwise the lowercased, whitespace-collapsed input"""
+        key = " ".join(str(skill).lower().split())
+        return self.canonical.get(key, key)
+
+
+_default_matcher = None
+
+
+def get_matcher():
+    """Shared matcher built from SKILL_TAXONOMY (built on first use)"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = SkillMatcher()
+    return _default_matcher
+
+
+def extract_skills(text):
+    """Canonical skills found in text"""
+    return get_matcher().extract(text)
+
+
+def canonical_skill(skill):
+    """Map an alias ("Html5", "ReactJS") to its canonical skill name"""
+    return get_matcher().normalize(skill)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+FILLER = (
+    "responsible for delivering features with a cross functional team and mentoring "
+    "engineers while improving performance of our web platform used by enterprise clients"
+).split()
+
+
+def synthetic_resume(rng, n_words=400, n_skills=15):
+    """Random filler text with aliases from the taxonomy sprinkled in"""
+    aliases = [alias for canonical, alts in SKILL_TAXONOMY.items() for alias in (canonical, *alts)]
+    words = [rng.choice(FILLER) for _ in range(n_words)]
+    for _ in range(n_skills):
+        words.insert(rng.randrange(len(words)), rng.choice(aliases).upper() if rng.random() < 0.3 else rng.choice(aliases))
+    return " ".join(words)
+
+
+SAMPLE_JD = """
+REQUIRED TECHNICAL SKILLS:
+- Proficient in Html is a MUST.
+- Strong experience with TypeScript and static typing.
+- State management experience using Redux Toolkit or Zustand.
+- Experience writing unit tests with Jest and React Testing Library.
+- Understanding of CI/CD pipelines (GitHub Actions).
+- Basic knowledge of Docker for containerization.
+"""
+
+
+def prompt_sizes(matcher, job_description, resume_text):
+    """
+    Characters of variable prompt input: full (JD + resume) vs prefiltered (JD + skill lists)
+
+    The prefiltered count leaves out the follow-up resume check, which only
+    runs when JD skills outside the taxonomy are still missing.
+    """
+    resume_skills = matcher.extract(resume_text)
+    required = matcher.extract(job_description)
+    unresolved = required - resume_skills
+    full = len(job_description) + len(resume_text)
+    prefiltered = len(job_description) + sum(len(s) + 2 for s in (*required, *unresolved, *resume_skills))
+    return full, prefiltered
+
+
+def _time_per_doc(matcher, docs, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            matcher.extract(doc)
+        best = min(best, time.perf_counter() - start)
+    return best / len(docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the local skill extractor")
+    parser.add_argument("--pdf", default="sample.pdf")
+    parser.add_argument("--batch", type=int, default=1000, help="number of synthetic resumes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matcher = SkillMatcher()
+    print(f"🧱 Built matcher: {len(matcher._goto)} states in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    try:
+        from pypdf import PdfReader
+
+        pdf_text = " ".join(page.extract_text() or "" for page in PdfReader(args.pdf).pages)
+        per_doc = _time_per_doc(matcher, [pdf_text], repeat=20)
+        print(f"\n📄 {args.pdf}: {len(pdf_text)} chars in {per_doc * 1e6:.0f} µs")
+        print(f"   skills: {', '.join(sorted(matcher.extract(pdf_text)))}")
+        full, prefiltered = prompt_sizes(matcher, SAMPLE_JD, pdf_text)
+        print(f"   prompt input: {full} -> {prefiltered} chars ({1 - prefiltered / full:.0%} smaller)")
+    except (ImportError, OSError) as e:
+        print(f"\n⚠️  Skipping {args.pdf}: {e}")
+
+    rng = random.Random(42)
+    docs = [synthetic_resume(rng) for _ in range(args.batch)]
+    per_doc = _time_per_doc(matcher, docs)
+    total_chars = sum(len(d) for d in docs)
+    print(f"\n📚 Synthetic batch: {args.batch} resumes, {total_chars / args.batch:.0f} chars avg")
+    print(f"   {per_doc * 1e6:.0f} µs per resume, {1 / per_doc:.0f} resumes/s")
+    sizes = [prompt_sizes(matcher, SAMPLE_JD, doc) for doc in docs]
+    full = sum(f for f, _ in sizes)
+    prefiltered = sum(p for _, p in sizes)
+    print(f"   prompt input: {full / len(docs):.0f} -> {prefiltered / len(docs):.0f} chars avg ({1 - prefiltered / full:.0%} smaller)")
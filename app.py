@@ -1,11 +1,21 @@
 import pprint
+import hashlib
+import json
 from youtube_transcript_api import YouTubeTranscriptApi
-import chromadb
+from youtube_transcript_api.proxies import GenericProxyConfig
 from chromadb.utils import embedding_functions
 import os
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+import metrics
+from chunking import chunk_transcript
+from segmentation import segment_transcript
+from hierarchical_index import HierarchicalIndex
+from proxy_pool import ProxyPool, NoHealthyProxy, is_blocked_error
+from similarity import get_distance_space, distance_to_similarity, iter_scored_results, match_label
+from collection_manager import CollectionManager
+from transcript_store import TranscriptStore
 
 
 def format_timestamp( seconds: float) -> str:
@@ -19,29 +29,37 @@ def format_timestamp( seconds: float) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
+# Proxies from PROXY_POOL (defaults to the Docker proxy on 127.0.0.1:8888)
+proxy_pool = ProxyPool.from_env()
+
+
 # Try to fetch transcript with Docker proxy support
-def fetch_transcript_with_proxy(video_id):
+def fetch_transcript_with_proxy(video_id, pool=None):
     """
-    Fetch transcript using Docker-based Squid proxy to bypass YouTube IP blocking
+    Fetch transcript through the proxy pool to bypass YouTube IP blocking
     
-    Make sure to run: docker-compose up -d proxy
-    The proxy automatically uses environment variables set before import
+    Make sure to run: docker-compose up -d proxy (or set PROXY_POOL)
+    Each attempt picks a healthy proxy and reuses that proxy's pooled session;
+    a blocked proxy is quarantined and the next one is tried.
     """
+    pool = pool or proxy_pool
+
+    def fetch(proxy):
+        print(f"Using proxy: {proxy.url}")
+        ytt_api = YouTubeTranscriptApi(
+            proxy_config=GenericProxyConfig(http_url=proxy.url, https_url=proxy.url),
+            http_client=pool.session(proxy),
+        )
+        return ytt_api.fetch(video_id)
+
     try:
         print(f"Fetching transcript for video: {video_id}")
-        print(f"Using proxy: http://127.0.0.1:8888")
-        
-        # Create API instance
-        ytt_api = YouTubeTranscriptApi()
-        
-        # Fetch the transcript
-        fetched_transcript = ytt_api.fetch(video_id)
-        
+        with metrics.span("transcript.fetch", video_id=video_id):
+            fetched_transcript = pool.call(fetch)
         print("✅ Successfully fetched transcript!")
         return fetched_transcript
     except Exception as e:
-        error_str = str(e)
-        if "RequestBlocked" in str(type(e)) or "blocking" in error_str.lower():
+        if is_blocked_error(e) or isinstance(e, NoHealthyProxy):
             print(f"\n❌ YouTube blocked the request")
             print("\n💡 Make sure Docker proxy is running:")
             print("   docker-compose up -d proxy")
@@ -50,12 +68,23 @@ def fetch_transcript_with_proxy(video_id):
             print(f"\n❌ Error: {e}")
         raise
 
+# Transcripts fetched once are kept on disk (TRANSCRIPT_STORE, default .transcripts/)
+transcript_store = TranscriptStore(os.getenv("TRANSCRIPT_STORE", ".transcripts"))
+video_id = "POf5mCs5YgI"
+source = video_id
+
 # Try to fetch real transcript, fallback to demo data if blocked
 try:
-    fetched_transcript = fetch_transcript_with_proxy("POf5mCs5YgI")
-    raw_data = fetched_transcript.to_raw_data()
+    if video_id in transcript_store:
+        print(f"📦 Transcript for {video_id} loaded from {transcript_store.path}")
+        raw_data = transcript_store.segments(video_id)
+    else:
+        fetched_transcript = fetch_transcript_with_proxy(video_id)
+        raw_data = fetched_transcript.to_raw_data()
+        transcript_store.add_video(video_id, raw_data)
 except Exception as e:
     print("\n⚠️  Using demo data instead (real YouTube blocked from cloud)")
+    source = "demo"
     # Demo data for testing the RAG pipeline
     raw_data = [
         {"text": "Welcome to the Ubuntu installation tutorial", "start": 0.0, "duration": 5.0},
@@ -74,51 +103,64 @@ for seg in raw_data:
 
 print(input_text) """
 
-chunks = []
+""" tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+embedding_fn = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+ """
+embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name="all-MiniLM-L6-v2"
+        ) 
+
+# CHUNKER=semantic merges segments on pauses / topic shifts (see segmentation.py)
+chunker = os.getenv("CHUNKER", "fixed")
 chunk_size: int = 3
 overlap  = 1
-step = chunk_size - overlap
     
-for i in range(0, len(raw_data), step):
-    group = raw_data[i:i + chunk_size]
-    if len(group) < 2:  # Skip very small final chunks
-        continue
-            
-    chunks.append({
-        'text': ' '.join([t['text'] for t in group]),
-        'start': group[0]['start'],
-        'end': group[-1]['start'] + group[-1]['duration'],
-        'duration': (group[-1]['start'] + group[-1]['duration']) - group[0]['start'],
-        'segment_indices': list(range(i, i + len(group)))
-        })
+with metrics.span("chunking", segments=len(raw_data), chunker=chunker) as chunk_span:
+    if chunker == "fixed":
+        chunks = chunk_transcript(raw_data, chunk_size=chunk_size, overlap=overlap)
+    else:
+        # Merge segments on pauses / topic shifts into ~80-token chunks
+        chunks = segment_transcript(raw_data, embedding_fn=embedding_fn)
+    chunk_span.set(chunks=len(chunks))
     
 documents=[c['text'] for c in chunks]
 
 pprint.pprint(documents)
 
-client = chromadb.Client()  # Use PersistentClient for persistence
-
-""" tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
-embedding_fn = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
- """
-embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        ) 
+# One persisted collection per tenant / video / chunker / chunk contents (COLLECTIONS_DIR,
+# COLLECTIONS_RAM_BUDGET_MB): a changed transcript or chunk setting gets a fresh collection,
+# so no chunk_{i} from an older run is left behind
+# Cosine space + HNSW parameters from vector_index (VECTOR_INDEX_PARAMS to override)
+tenant = os.getenv("TENANT", "default")
+chunks_hash = hashlib.sha256(json.dumps(
+    ["all-MiniLM-L6-v2", chunks], sort_keys=True, default=str).encode()).hexdigest()[:12]
+collection_base = f"{chunker}-{source}"  # video ids may start with "-" or "_"
+collections = CollectionManager(embedding_function=embedding_fn)
+for t, name in collections.collections(tenant):
+    base, _, digest = name.rpartition("-")
+    if base == collection_base and digest != chunks_hash:
+        collections.drop(t, name)
+collection = collections.collection(tenant, f"{collection_base}-{chunks_hash}")
 
-collection = client.create_collection(
-            name='youtube',
-            embedding_function=embedding_fn
-        )
+if collection.count() == len(chunks):
+    print(f"📦 {len(chunks)} chunks already indexed in {collection.key[0]}/{collection.key[1]}")
+else:
+    # Embed up front so embedding and Chroma insert time are measured separately
+    metrics.observe("embedding_batch_size", len(documents), model="all-MiniLM-L6-v2")
+    with metrics.span("embedding", batch_size=len(documents)):
+        embeddings = embedding_fn(documents)
 
-collection.add(
-            documents=[c['text'] for c in chunks],
-            metadatas=[{
-                'start': c['start'],
-                'end': c['end'],
-                'duration': c['duration']
-            } for c in chunks],
-            ids=[f"chunk_{i}" for i in range(len(chunks))]
-        )
+    with metrics.span("chroma.add", batch_size=len(chunks)):
+        collection.upsert(
+                    documents=documents,
+                    embeddings=embeddings,
+                    metadatas=[{
+                        'start': c['start'],
+                        'end': c['end'],
+                        'duration': c['duration']
+                    } for c in chunks],
+                    ids=[f"chunk_{i}" for i in range(len(chunks))]
+                )
 n_results = 2
 test_queries = [
     "How to setup environment?",      # Your original query
@@ -133,15 +175,19 @@ test_queries = [
 print("\n\n🔍 QUERY COMPARISON:")
 print("=" * 60)
 
+distance_space = get_distance_space(collection)
+
 for query in test_queries:
-    results = collection.query(query_texts=[query], n_results=1)
+    with metrics.span("chroma.query", n_results=1):
+        results = collection.query(query_texts=[query], n_results=1)
     
     distance = results['distances'][0][0]
+    score = distance_to_similarity(distance, distance_space)
     meta = results['metadatas'][0][0]
     text = results['documents'][0][0][:100]
     
     print(f"\n❓ Query: '{query}'")
-    print(f"   📏 Distance: {distance:.4f} {'✅' if distance < 0.5 else '⚠️' if distance < 0.7 else '❌'}")
+    print(f"   📏 Distance: {distance:.4f} ({distance_space}) | Score: {score:.2f} {match_label(score)}")
     print(f"   ⏱️  Timestamp: {format_timestamp(meta['start'])}")
     print(f"   📝 Match: {text}...")
 
@@ -165,10 +211,11 @@ print(    intro_text[:200]) """
 
 n_results = 4
 query = "How to install Ubuntu?"
-results = collection.query(
-    query_texts=[query],
-    n_results=n_results
-)
+with metrics.span("chroma.query", n_results=n_results):
+    results = collection.query(
+        query_texts=[query],
+        n_results=n_results
+    )
 
 # Debug: See the actual structure
 print("\n📦 Raw results structure:")
@@ -181,14 +228,37 @@ pprint.pprint(results)
 print(f"\n🔍 Search Results for: '{query}'")
 print("-" * 50)
 
-# Method 1: Using range
-for i in range(len(results['documents'][0])):
-    doc = results['documents'][0][i]
-    meta = results['metadatas'][0][i]
-    distance = results['distances'][0][i] if results.get('distances') else None
+# Hits come back sorted, so iteration stops at the first one under min_score
+min_score = 0.0
+for hit in iter_scored_results(results, space=distance_space, min_score=min_score):
+    doc = hit['document']
+    meta = hit['metadata']
     
-    print(f"\nResult {i + 1}:")
+    print(f"\nResult {hit['rank'] + 1}:")
     print(f"  ⏱️  Timestamp: {format_timestamp(meta['start'])}")
     print(f"  📝 Text: {doc}...")  # First 100 chars
-    print(f"  📏 Distance: {distance}")
+    print(f"  📏 Distance: {hit['distance']} | Score: {hit['score']:.2f}")
     print(f"  🔗 Video URL: youtube.com/watch?v=POf5mCs5YgI&t={int(meta['start'])}s")
+
+# ============================================
+# COARSE-TO-FINE SEARCH (chapters -> windows -> segments)
+# ============================================
+with metrics.span("hierarchy.build", segments=len(raw_data)):
+    hierarchy = HierarchicalIndex.build(raw_data, embedding_fn)
+print(f"\n🧭 Hierarchical index: {hierarchy.stats()}")
+
+with metrics.span("hierarchy.search"):
+    hits = hierarchy.search(query, n_results=2)
+for rank, hit in enumerate(hits, 1):
+    # start is the best-matching segment inside the window: the link lands on the exact line
+    print(f"\nResult {rank} (chapter {hit['chapter'] + 1}):")
+    print(f"  ⏱️  Timestamp: {format_timestamp(hit['start'])} (window {format_timestamp(hit['window_start'])}"
+          f" - {format_timestamp(hit['window_end'])})")
+    print(f"  📝 Text: {hit['text'][:100]}...")
+    print(f"  📏 Score: {hit['score']:.2f} {match_label(hit['score'])}")
+    print(f"  🔗 Video URL: youtube.com/watch?v=POf5mCs5YgI&t={int(hit['start'])}s")
+
+# Timings per stage (PIPELINE_METRICS=1); trace / Prometheus files are written at exit
+if metrics.is_enabled():
+    print("\n📈 Pipeline timings:")
+    pprint.pprint(metrics.summary())
@@ -2,7 +2,11 @@ import pprint
 import chromadb
 from chromadb.utils import embedding_functions
 import os
-from groq import Groq
+from llm_gateway import get_gateway
+from chunking import chunk_transcript
+from similarity import get_distance_space, distance_to_similarity, match_label
+from vector_index import create_collection
+from context_expansion import ContextExpander
 
 
 
@@ -17,9 +21,12 @@ def format_timestamp(seconds: float) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
-def analyze_with_groq(query, search_results):
+def analyze_with_groq(query, search_results, expander=None, context_seconds=0):
     """
     Use Groq to analyze search results and provide a comprehensible step-by-step breakdown
+
+    With an expander and context_seconds > 0, every hit is widened to ±context_seconds
+    of transcript (overlapping hits merged) so the model sees the surrounding steps.
     """
     api_key = os.getenv("GROQ_API_KEY")
     
@@ -28,13 +35,21 @@ def analyze_with_groq(query, search_results):
         print("   Set it with: export GROQ_API_KEY=your_api_key")
         return None
     
-    client = Groq(api_key=api_key)
+    # Shared pooled client: keep-alive, rate budgets and retries on 429 / 5xx
+    gateway = get_gateway()
     
     # Prepare the context from search results
-    context = "\n".join([
-        f"Result {i+1}:\n{doc}"
-        for i, doc in enumerate(search_results['documents'][0])
-    ])
+    if expander is not None and context_seconds > 0:
+        windows = expander.expand_results(search_results, seconds=context_seconds)
+        context = "\n".join([
+            f"Excerpt {i+1} ({format_timestamp(w['start'])} - {format_timestamp(w['end'])}):\n{w['text']}"
+            for i, w in enumerate(windows)
+        ])
+    else:
+        context = "\n".join([
+            f"Result {i+1}:\n{doc}"
+            for i, doc in enumerate(search_results['documents'][0])
+        ])
     
     # Create a prompt to analyze the results
     prompt = f"""Based on the following search results related to the query "{query}", 
@@ -50,17 +65,7 @@ Please format your response as:
 4. Keep the explanation concise and easy to understand"""
     
     try:
-        # 1. Change 'messages.create' to 'chat.completions.create'
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        # 2. Change how you access the text
-        return completion.choices[0].message.content
+        return gateway.complete(prompt, model="llama-3.1-8b-instant", max_tokens=1024)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -243,23 +248,9 @@ raw_data = [
 
 print("✅ Using demo data for testing RAG pipeline\n")
 
-chunks = []
 chunk_size: int = 3
 overlap = 1
-step = chunk_size - overlap
-    
-for i in range(0, len(raw_data), step):
-    group = raw_data[i:i + chunk_size]
-    if len(group) < 2:  # Skip very small final chunks
-        continue
-            
-    chunks.append({
-        'text': ' '.join([t['text'] for t in group]),
-        'start': group[0]['start'],
-        'end': group[-1]['start'] + group[-1]['duration'],
-        'duration': (group[-1]['start'] + group[-1]['duration']) - group[0]['start'],
-        'segment_indices': list(range(i, i + len(group)))
-    })
+chunks = chunk_transcript(raw_data, chunk_size=chunk_size, overlap=overlap)
     
 documents = [c['text'] for c in chunks]
 
@@ -271,10 +262,8 @@ embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
     model_name="all-MiniLM-L6-v2"
 )
 
-collection = client.create_collection(
-    name='youtube',
-    embedding_function=embedding_fn
-)
+# Cosine space + HNSW parameters from vector_index (VECTOR_INDEX_PARAMS to override)
+collection = create_collection(client, 'youtube', embedding_function=embedding_fn)
 
 collection.add(
     documents=[c['text'] for c in chunks],
@@ -300,15 +289,18 @@ test_queries = [
 print("\n\n🔍 QUERY COMPARISON:")
 print("=" * 60)
 
+distance_space = get_distance_space(collection)
+
 for query in test_queries:
     results = collection.query(query_texts=[query], n_results=1)
     
     distance = results['distances'][0][0]
+    score = distance_to_similarity(distance, distance_space)
     meta = results['metadatas'][0][0]
     text = results['documents'][0][0][:100]
     
     print(f"\n❓ Query: '{query}'")
-    print(f"   📏 Distance: {distance:.4f} {'✅' if distance < 0.5 else '⚠️' if distance < 0.7 else '❌'}")
+    print(f"   📏 Distance: {distance:.4f} ({distance_space}) | Score: {score:.2f} {match_label(score)}")
     print(f"   ⏱️  Timestamp: {format_timestamp(meta['start'])}")
     print(f"   📝 Match: {text}...")
 
@@ -355,7 +347,10 @@ print("\n" + "=" * 60)
 print("🤖 AI-Powered Analysis (using Groq)")
 print("=" * 60)
 
-analysis = analyze_with_groq(query, results)
+# Widen each hit to ±CONTEXT_SECONDS of transcript (0 = matched chunks only)
+context_seconds = float(os.getenv("CONTEXT_SECONDS", "20"))
+expander = ContextExpander.from_segments(raw_data)
+analysis = analyze_with_groq(query, results, expander=expander, context_seconds=context_seconds)
 
 if analysis:
     print("\n📋 Step-by-Step Breakdown:\n")
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Asyncio HTTP/HTTPS proxy to bypass YouTube IP blocking
+
+Drop-in replacement for simple_proxy.py that does not serialize clients:
+- every client connection is its own task, bounded by --max-connections
+- CONNECT tunnels pipe both directions concurrently with 256 KiB buffers
+- plain HTTP keeps client connections alive and reuses upstream connections
+  from a per-host pool
+
+Run this in the background: python async_proxy.py --port 8888
+"""
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlsplit
+
+BUFFER_SIZE = 256 * 1024
+
+# Headers that only apply to one hop and must not be forwarded.
+# Transfer-Encoding is left alone: bodies are relayed with their original framing.
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-connection", "proxy-authenticate",
+    "proxy-authorization", "te", "trailer", "upgrade",
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+# ==========================================
+# HTTP helpers
+# ==========================================
+
+async def read_head(reader, timeout=None):
+    """Read a request/response head up to the blank line; None on clean EOF"""
+    try:
+        data = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise BadRequest("truncated head")
+    except asyncio.LimitOverrunError:
+        raise BadRequest("head too large")
+
+    lines = data.decode("latin-1").split("\r\n")
+    start_line = lines[0]
+    headers = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise BadRequest(f"bad header line: {line!r}")
+        headers.append((name.strip(), value.strip()))
+    return start_line, headers
+
+
+def get_header(headers, name, default=None):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return default
+
+
+def connection_tokens(headers):
+    """Lowercased tokens of the Connection / Proxy-Connection headers"""
+    tokens = set()
+    for key, value in headers:
+        if key.lower() in ("connection", "proxy-connection"):
+            tokens.update(t.strip().lower() for t in value.split(","))
+    return tokens
+
+
+def end_to_end_headers(headers):
+    """Drop hop-by-hop headers, including the ones named in Connection"""
+    drop = HOP_BY_HOP | connection_tokens(headers)
+    return [(k, v) for k, v in headers if k.lower() not in drop]
+
+
+def build_head(start_line, headers):
+    lines = [start_line] + [f"{k}: {v}" for k, v in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def copy_exact(reader, writer, length):
+    """Relay exactly `length` body bytes"""
+    remaining = length
+    while remaining:
+        chunk = await reader.read(min(BUFFER_SIZE, remaining))
+        if not chunk:
+            raise asyncio.IncompleteReadError(b"", remaining)
+        writer.write(chunk)
+        remaining -= len(chunk)
+        await writer.drain()
+
+
+async def copy_chunked(reader, writer):
+    """Relay a chunked body as-is (sizes, data and trailers)"""
+    while True:
+        size_line = await reader.readline()
+        if not size_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        writer.write(size_line)
+        size = int(size_line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # Trailers, terminated by an empty line
+            while True:
+                line = await reader.readline()
+                writer.write(line)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            await writer.drain()
+            return
+        await copy_exact(reader, writer, size + 2)  # data + CRLF
+
+
+async def copy_until_eof(reader, writer):
+    while True:
+        chunk = await reader.read(BUFFER_SIZE)
+        if not chunk:
+            return
+        writer.write(chunk)
+        await writer.drain()
+
+
+async def copy_body(reader, writer, headers):
+    """Relay a message body; returns False if the body was delimited by EOF"""
+    if "chunked" in (get_header(headers, "transfer-encoding") or "").lower():
+        await copy_chunked(reader, writer)
+        return True
+    length = get_header(headers, "content-length")
+    if length is not None:
+        await copy_exact(reader, writer, int(length))
+        return True
+    await copy_until_eof(reader, writer)
+    return False
+
+
+def close_writer(writer):
+    try:
+        writer.close()
+    except Exception:
+        pass
+
+
+# ==========================================
+# Upstream connection pool (plain HTTP)
+# ==========================================
+
+class UpstreamPool:
+    """Idle keep-alive connections per (host, port)"""
+
+    def __init__(self, max_idle_per_host=8, idle_timeout=30.0, connect_timeout=10.0):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self._idle = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def acquire(self, host, port):
+        """Return (reader, writer, reused)"""
+        idle = self._idle.get((host, port), [])
+        now = time.monotonic()
+        while idle:
+            reader, writer, released_at = idle.pop()
+            if now - released_at < self.idle_timeout and not reader.at_eof() and not writer.is_closing():
+                self.hits += 1
+                return reader, writer, True
+            close_writer(writer)
+
+        self.misses += 1
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, limit=BUFFER_SIZE), self.connect_timeout
+        )
+        return reader, writer, False
+
+    def release(self, host, port, reader, writer):
+        idle = self._idle.setdefault((host, port), [])
+        if len(idle) < self.max_idle_per_host and not writer.is_closing():
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            close_writer(writer)
+
+    def close(self):
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                close_writer(writer)
+        self._idle.clear()
+
+
+# ==========================================
+# Proxy server
+# ==========================================
+
+class AsyncProxy:
+    def __init__(self, host="0.0.0.0", port=8888, max_connections=1024, max_idle_per_host=8,
+                 connect_timeout=10.0, idle_timeout=60.0, verbose=False):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.verbose = verbose
+        self.max_connections = max_connections
+        self.pool = UpstreamPool(max_idle_per_host, connect_timeout=connect_timeout)
+        self.stats = {"connections": 0, "active": 0, "requests": 0, "tunnels": 0, "errors": 0}
+        self.server = None
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=BUFFER_SIZE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.pool.close()
+
+    def log(self, message):
+        if self.verbose:
+            print(f"[PROXY] {message}")
+
+    async def handle_client(self, reader, writer):
+        self.stats["connections"] += 1
+        async with self._slots:
+            self.stats["active"] += 1
+            try:
+                keep_alive = True
+                while keep_alive:
+                    head = await read_head(reader, self.idle_timeout)
+                    if head is None:
+                        break
+                    request_line, headers = head
+                    method, target, version = request_line.split(" ", 2)
+
+                    if method.upper() == "CONNECT":
+                        await self.tunnel(target, reader, writer)
+                        break
+                    keep_alive = await self.forward(method, target, version, headers, reader, writer)
+            except BadRequest as e:
+                self.stats["errors"] += 1
+                await self.send_error(writer, 400, f"Bad Request: {e}")
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                self.stats["errors"] += 1
+                self.log(f"client error: {e!r}")
+            except asyncio.CancelledError:
+                # Server shutting down; the connection is closed below
+                pass
+            finally:
+                self.stats["active"] -= 1
+                close_writer(writer)
+
+    async def send_error(self, writer, status, message):
+        body = message.encode()
+        try:
+            writer.write(build_head(f"HTTP/1.1 {status} {message}", [
+                ("Content-Type", "text/plain"), ("Content-Length", str(len(body))), ("Connection", "close"),
+            ]) + body)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+    async def tunnel(self, target, client_reader, client_writer):
+        """HTTPS CONNECT: pipe bytes both ways at the same time until either side closes"""
+        host, _, port = target.rpartition(":")
+        try:
+            up_reader, up_writer = await asyncio.wait_for(
+                asyncio.open_connection(host.strip("[]"), int(port), limit=BUFFER_SIZE), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            await self.send_error(client_writer, 502, f"Bad Gateway: {e}")
+            return
+
+        self.stats["tunnels"] += 1
+        self.log(f"CONNECT {target}")
+        client_writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        await client_writer.drain()
+
+        async def pipe(reader, writer):
+            try:
+                while True:
+                    data = await reader.read(BUFFER_SIZE)
+                    if not data:
+                        break
+                    writer.write(data)
+                    await writer.drain()
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                # Half-close so the other direction can finish sending
+                if writer.can_write_eof() and not writer.is_closing():
+                    try:
+                        writer.write_eof()
+                    except (ConnectionError, OSError):
+                        pass
+
+        try:
+            await asyncio.gather(pipe(client_reader, up_writer), pipe(up_reader, client_writer))
+        finally:
+            close_writer(up_writer)
+
+    async def forward(self, method, target, version, headers, client_reader, client_writer):
+        """Plain HTTP request through a pooled upstream connection; returns whether to keep the client alive"""
+        url = urlsplit(target)
+        if url.scheme != "http" or not url.hostname:
+            raise BadRequest(f"expected absolute http:// URL, got {target!r}")
+        host, port = url.hostname, url.port or 80
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+
+        client_tokens = connection_tokens(headers)
+        client_keep_alive = "close" not in client_tokens and (version == "HTTP/1.1" or "keep-alive" in client_tokens)
+
+        upstream_headers = end_to_end_headers(headers)
+        if get_header(upstream_headers, "host") is None:
+            upstream_headers.append(("Host", url.netloc))
+        upstream_headers.append(("Connection", "keep-alive"))
+        request_head = build_head(f"{method} {path} HTTP/1.1", upstream_headers)
+        has_body = get_header(headers, "content-length") not in (None, "0") or get_header(headers, "transfer-encoding")
+
+        self.stats["requests"] += 1
+        self.log(f"{method} {target}")
+
+        # A pooled connection may have been closed by the server meanwhile: retry once on a fresh one
+        for attempt in range(2):
+            try:
+                up_reader, up_writer, reused = await self.pool.acquire(host, port)
+            except (OSError, asyncio.TimeoutError) as e:
+                await self.send_error(client_writer, 502, f"Bad Gateway: {e}")
+                return False
+            try:
+                up_writer.write(request_head)
+                if has_body:
+                    await copy_body(client_reader, up_writer, headers)
+                await up_writer.drain()
+                response = await read_head(up_reader, self.connect_timeout * 3)
+                if response is None:
+                    raise ConnectionResetError("upstream closed the connection")
+                break
+            except (ConnectionError, OSError, BadRequest, asyncio.IncompleteReadError) as e:
+                close_writer(up_writer)
+                if reused and not has_body and attempt == 0:
+                    continue
+                await self.send_error(client_writer, 502, f"Bad Gateway: {e}")
+                return False
+            except asyncio.TimeoutError:
+                close_writer(up_writer)
+                await self.send_error(client_writer, 504, "Gateway Timeout")
+                return False
+
+        status_line, response_headers = response
+        status = int(status_line.split(" ", 2)[1])
+        # Interim heads (100 Continue, 103 Early Hints) come before the final response on the
+        # same connection: relay them (HTTP/1.0 clients don't understand 1xx) and keep reading
+        while 100 <= status < 200 and status != 101:
+            if version == "HTTP/1.1":
+                client_writer.write(build_head(status_line, end_to_end_headers(response_headers)))
+            try:
+                response = await read_head(up_reader, self.connect_timeout * 3)
+                if response is None:
+                    raise ConnectionResetError("upstream closed the connection")
+            except (ConnectionError, OSError, BadRequest) as e:
+                close_writer(up_writer)
+                await self.send_error(client_writer, 502, f"Bad Gateway: {e}")
+                return False
+            except asyncio.TimeoutError:
+                close_writer(up_writer)
+                await self.send_error(client_writer, 504, "Gateway Timeout")
+                return False
+            status_line, response_headers = response
+            status = int(status_line.split(" ", 2)[1])
+
+        # 101 hands the connection to another protocol, which this proxy doesn't relay
+        switched = status == 101
+        no_body = method.upper() == "HEAD" or status in (204, 304) or 100 <= status < 200
+        upstream_keep_alive = "close" not in connection_tokens(response_headers) and not switched
+
+        # EOF-delimited bodies can't be followed by another response on the client connection
+        eof_body = not no_body and get_header(response_headers, "content-length") is None \
+            and "chunked" not in (get_header(response_headers, "transfer-encoding") or "").lower()
+        keep_client = client_keep_alive and not eof_body and not switched
+
+        client_writer.write(build_head(status_line, end_to_end_headers(response_headers) + [
+            ("Connection", "keep-alive" if keep_client else "close"),
+        ]))
+        try:
+            if not no_body:
+                await copy_body(up_reader, client_writer, response_headers)
+            await client_writer.drain()
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            close_writer(up_writer)
+            raise
+
+        if upstream_keep_alive and not eof_body:
+            self.pool.release(host, port, up_reader, up_writer)
+        else:
+            close_writer(up_writer)
+        return keep_client
+
+
+async def main(args):
+    proxy = await AsyncProxy(
+        host=args.host,
+        port=args.port,
+        max_connections=args.max_connections,
+        max_idle_per_host=args.max_idle_per_host,
+        connect_timeout=args.connect_timeout,
+        idle_timeout=args.idle_timeout,
+        verbose=args.verbose,
+    ).start()
+
+    print(f"✅ Async proxy running on http://{args.host}:{proxy.port}")
+    print(f"   HTTP_PROXY=http://127.0.0.1:{proxy.port}")
+    print(f"   HTTPS_PROXY=http://127.0.0.1:{proxy.port}")
+    print(f"   max connections: {args.max_connections}, idle upstream conns per host: {args.max_idle_per_host}")
+    await proxy.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Asyncio HTTP/HTTPS proxy")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--max-connections", type=int, default=1024, help="concurrent client connections")
+    parser.add_argument("--max-idle-per-host", type=int, default=8, help="pooled upstream connections per host")
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument("--idle-timeout", type=float, default=60.0, help="close idle client connections after N seconds")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\n✋ Proxy stopped")
+        sys.exit(0)
@@ -0,0 +1,521 @@
+"""
+Pipeline benchmark: chunking, embedding, Chroma add/query, sharded and hierarchical
+indexes, movies index build, LLM calls
+
+Drives the real code paths (chunking.chunk_transcript, the Chroma /
+sentence-transformers embedding function, movies_index, the Groq SDK) with
+synthetic data. Every case runs in a fresh process, so the reported peak RSS
+belongs to that case alone. Cases whose dependencies are missing are skipped.
+
+Reports per case: throughput, latency percentiles (where there are
+per-operation timings) and peak RSS, plus the git commit, so two runs can be
+compared:
+
+Run from the repo root:
+    python benchmarks/bench_pipeline.py --json bench-$(git rev-parse --short HEAD).json
+    python benchmarks/bench_pipeline.py --suites chroma --chroma-sizes 1000,100000,1000000
+    python benchmarks/bench_pipeline.py --suites sharded --sharded-sizes 100000 --shards 1,4,16
+    python benchmarks/bench_pipeline.py --quick
+    python benchmarks/bench_pipeline.py --compare bench-old.json bench-new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "movies"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SUITES = ("chunking", "embedding", "chroma", "sharded", "hierarchy", "movies", "llm")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+WORDS = (
+    "ubuntu install download bootable usb pen drive rufus iso image boot menu press f12 key select "
+    "language keyboard layout continue partition disk region password restart login settings software "
+    "store applications click option laptop dell website browser version desktop process completed "
+    "so now then and you can see this is the my your will how to simply open type start"
+).split()
+
+
+# ==========================================
+# Measurement helpers
+# ==========================================
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def latency_summary(latencies):
+    """Per-operation latencies in seconds -> ms percentiles"""
+    if not latencies:
+        return None
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+
+
+def result(items, elapsed, unit, latencies=None, **extra):
+    return {
+        "items": items,
+        "unit": unit,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(items / elapsed, 1) if elapsed else None,
+        "latency": latency_summary(latencies),
+        **extra,
+    }
+
+
+def synthetic_segments(n, seed=0):
+    """Transcript-like segments: 6-30 words, 2-14 seconds each"""
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    for _ in range(n):
+        duration = float(rng.randint(2, 14))
+        segments.append({
+            "text": " ".join(rng.choices(WORDS, k=rng.randint(6, 30))),
+            "start": t,
+            "duration": duration,
+        })
+        t += duration
+    return segments
+
+
+def random_unit_vectors(n, dim, seed=0):
+    import numpy as np
+    vectors = np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+# ==========================================
+# Cases (each runs in its own process)
+# ==========================================
+
+def case_chunking(n_segments, chunk_size, overlap, repeats=5):
+    from chunking import chunk_transcript
+
+    segments = synthetic_segments(n_segments)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = chunk_transcript(segments, chunk_size=chunk_size, overlap=overlap)
+        latencies.append(time.perf_counter() - start)
+    return result(n_segments * repeats, sum(latencies), "segments", latencies, chunks=len(chunks))
+
+
+def case_segmentation(n_segments, repeats=3):
+    import numpy as np
+    from segmentation import segment_transcript
+
+    segments = synthetic_segments(n_segments)
+    rng = np.random.default_rng(0)
+
+    # Random vectors stand in for the model: this times the segmentation pass itself
+    def embedding_fn(texts):
+        return rng.standard_normal((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = segment_transcript(segments, embedding_fn=embedding_fn)
+        latencies.append(time.perf_counter() - start)
+    audio_s = segments[-1]["start"] + segments[-1]["duration"]
+    return result(n_segments * repeats, sum(latencies), "segments", latencies, chunks=len(chunks),
+                  realtime_factor=round(audio_s / (sum(latencies) / repeats)))
+
+
+def case_embedding(n_texts, batch_size):
+    import sentence_transformers  # noqa: F401 - Chroma only reports it missing with a ValueError
+    from chromadb.utils import embedding_functions
+
+    embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+    texts = [c["text"] for c in synthetic_segments(n_texts, seed=1)]
+    embedding_fn(texts[:batch_size])  # load + warm up the model outside the timing
+
+    latencies = []
+    for i in range(0, n_texts, batch_size):
+        start = time.perf_counter()
+        embedding_fn(texts[i:i + batch_size])
+        latencies.append(time.perf_counter() - start)
+    return result(n_texts, sum(latencies), "texts", latencies, batches=len(latencies))
+
+
+def case_chroma(n_chunks, n_queries, n_results):
+    import chromadb
+
+    client = chromadb.Client()
+    collection = client.create_collection(name=f"bench_{n_chunks}")
+    vectors = random_unit_vectors(n_chunks, EMBEDDING_DIM)
+    max_batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+
+    # Precomputed vectors: this measures Chroma, not the embedding model
+    start = time.perf_counter()
+    for i in range(0, n_chunks, max_batch):
+        batch = vectors[i:i + max_batch]
+        collection.add(
+            ids=[f"chunk_{j}" for j in range(i, i + len(batch))],
+            embeddings=batch,
+            documents=[f"synthetic chunk {j}" for j in range(i, i + len(batch))],
+            metadatas=[{"start": float(j * 5)} for j in range(i, i + len(batch))],
+        )
+    add_elapsed = time.perf_counter() - start
+
+    queries = random_unit_vectors(n_queries, EMBEDDING_DIM, seed=1)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[query], n_results=n_results)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "add": result(n_chunks, add_elapsed, "chunks", batch_size=max_batch),
+        "query": result(n_queries, sum(latencies), "queries", latencies, n_results=n_results),
+    }
+
+
+def case_sharded(n_chunks, n_shards, n_queries, n_results, chunks_per_video=200):
+    from sharded_index import ShardedIndex
+
+    index = ShardedIndex(f"bench_{n_chunks}", n_shards=n_shards)
+    vectors = random_unit_vectors(n_chunks, EMBEDDING_DIM)
+    batch_size = 5000
+
+    start = time.perf_counter()
+    for i in range(0, n_chunks, batch_size):
+        rows = range(i, min(i + batch_size, n_chunks))
+        index.add(
+            ids=[f"chunk_{j}" for j in rows],
+            embeddings=vectors[i:i + len(rows)],
+            documents=[f"synthetic chunk {j}" for j in rows],
+            metadatas=[{"video_id": f"video_{j // chunks_per_video}", "start": float(j * 5)} for j in rows],
+        )
+    add_elapsed = time.perf_counter() - start
+
+    queries = random_unit_vectors(n_queries, EMBEDDING_DIM, seed=1)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.query(query_embeddings=[query], n_results=n_results)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    moved = index.add_shard()
+    rebalance_elapsed = time.perf_counter() - start
+    index.close()
+
+    return {
+        "add": result(n_chunks, add_elapsed, "chunks", shards=n_shards),
+        "query": result(n_queries, sum(latencies), "queries", latencies, n_results=n_results),
+        "add_shard": result(moved, rebalance_elapsed, "chunks moved", total=n_chunks),
+    }
+
+
+def case_hierarchy(n_segments, n_queries, n_results):
+    import numpy as np
+    from hierarchical_index import HierarchicalIndex
+
+    segments = synthetic_segments(n_segments)
+    rng = np.random.default_rng(0)
+
+    # Random vectors stand in for the model: this times the index, not embedding
+    def embedding_fn(texts):
+        return rng.standard_normal((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+    start = time.perf_counter()
+    index = HierarchicalIndex.build(segments, embedding_fn)
+    build_elapsed = time.perf_counter() - start
+
+    queries = random_unit_vectors(n_queries, EMBEDDING_DIM, seed=1)
+    flat, coarse, scored = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        scores = index.window_vectors @ query
+        np.argpartition(-scores, n_results)[:n_results]
+        flat.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        hits = index.search(query_vector=query, n_results=n_results)
+        coarse.append(time.perf_counter() - start)
+        scored += hits[0]["scored"]
+
+    return {
+        "add": result(n_segments, build_elapsed, "segments", **index.stats()),
+        "flat_query": result(n_queries, sum(flat), "queries", flat, scored=len(index.windows)),
+        "query": result(n_queries, sum(coarse), "queries", coarse, scored=round(scored / n_queries)),
+    }
+
+
+def case_movies():
+    import sentence_transformers  # noqa: F401 - see case_embedding
+    import chromadb
+    from movies_index import load_movies, build_movies_collection
+
+    start = time.perf_counter()
+    raw_data = load_movies()
+    collection = build_movies_collection(raw_data, client=chromadb.Client())
+    elapsed = time.perf_counter() - start
+    return result(len(raw_data), elapsed, "movies", count=collection.count())
+
+
+def case_llm(n_requests, concurrency, latency, tokens_per_s, client="sdk"):
+    from fake_llm import start_fake_llm
+
+    url, shutdown = start_fake_llm(latency=latency, tokens_per_s=tokens_per_s)
+    prompt = " ".join(c["text"] for c in synthetic_segments(12, seed=2))
+
+    gateway = None
+    if client in ("gateway", "coalesced"):
+        from llm_gateway import LLMGateway
+        from singleflight import SingleFlight
+
+        # No rate budgets: this measures the client, not the limiter
+        gateway = LLMGateway(api_key="fake", base_url=url, rpm=0, tpm=0, max_concurrency=concurrency)
+        # coalesced: every request is the same prompt, as with a double-clicked button.
+        # All callers are released together (one thread each), so they all overlap the first
+        # call; a pool of `concurrency` threads would run in waves, one upstream call per wave
+        flight = SingleFlight("bench")
+        start_barrier = threading.Barrier(n_requests)
+
+        def chat():
+            return gateway.chat([{"role": "user", "content": prompt}], model="llama-3.1-8b-instant")
+
+        def call(i):
+            if client == "coalesced" and i is not None:
+                start_barrier.wait()
+            start = time.perf_counter()
+            response = flight.do(prompt, chat) if client == "coalesced" else chat()
+            return time.perf_counter() - start, response["usage"]["completion_tokens"]
+    else:
+        from groq import Groq
+
+        sdk = Groq(api_key="fake", base_url=url, max_retries=0)
+
+        def call(_):
+            start = time.perf_counter()
+            completion = sdk.chat.completions.create(
+                model="llama-3.1-8b-instant",
+                max_tokens=1024,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            return time.perf_counter() - start, completion.usage.completion_tokens
+
+    call(None)  # client / connection / event loop setup outside the timing
+    upstream_before = gateway.stats["requests"] if gateway else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_requests if client == "coalesced" else concurrency) as pool:
+        calls = list(pool.map(call, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    shutdown()
+
+    latencies = [c[0] for c in calls]
+    tokens_out = sum(c[1] for c in calls)
+    extra = {"upstream_calls": gateway.stats["requests"] - upstream_before} if gateway else {}
+    return result(n_requests, elapsed, "requests", latencies,
+                  tokens_out_per_s=round(tokens_out / elapsed, 1) if elapsed else None, **extra)
+
+
+# ==========================================
+# Runner
+# ==========================================
+
+def _run_case(fn, kwargs):
+    """Child process entry point"""
+    baseline = peak_rss_mb()
+    try:
+        outcome = fn(**kwargs)
+    except ImportError as e:
+        return {"skipped": f"missing dependency: {e.name or e}"}
+    return {**outcome, "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline}
+
+
+def run_isolated(fn, kwargs):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_case, fn, kwargs).result()
+
+
+def plan(args):
+    """(suite, case name, fn, kwargs) for every case selected on the command line"""
+    cases = []
+    if "chunking" in args.suites:
+        for n in args.chunk_segments:
+            for chunk_size, overlap in ((3, 1), (5, 2), (10, 3)):
+                cases.append(("chunking", f"{n} segments, size {chunk_size}/overlap {overlap}", case_chunking,
+                              {"n_segments": n, "chunk_size": chunk_size, "overlap": overlap}))
+            cases.append(("chunking", f"{n} segments, semantic", case_segmentation, {"n_segments": n}))
+    if "embedding" in args.suites:
+        for batch_size in args.batch_sizes:
+            cases.append(("embedding", f"{args.embed_texts} texts, batch {batch_size}", case_embedding,
+                          {"n_texts": args.embed_texts, "batch_size": batch_size}))
+    if "chroma" in args.suites:
+        for n in args.chroma_sizes:
+            cases.append(("chroma", f"{n} chunks", case_chroma,
+                          {"n_chunks": n, "n_queries": args.queries, "n_results": 10}))
+    if "sharded" in args.suites:
+        for n in args.sharded_sizes:
+            for n_shards in args.shards:
+                cases.append(("sharded", f"{n} chunks, {n_shards} shards", case_sharded,
+                              {"n_chunks": n, "n_shards": n_shards, "n_queries": args.queries, "n_results": 10}))
+    if "hierarchy" in args.suites:
+        for n in args.hierarchy_segments:
+            cases.append(("hierarchy", f"{n} segments", case_hierarchy,
+                          {"n_segments": n, "n_queries": args.queries, "n_results": 3}))
+    if "movies" in args.suites:
+        cases.append(("movies", "movies-1000 index build", case_movies, {}))
+    if "llm" in args.suites:
+        for client in ("sdk", "gateway", "coalesced"):
+            for concurrency in args.llm_concurrency:
+                cases.append(("llm", f"{client}, {args.llm_requests} requests, concurrency {concurrency}", case_llm,
+                              {"n_requests": args.llm_requests, "concurrency": concurrency, "client": client,
+                               "latency": args.llm_latency, "tokens_per_s": args.llm_tokens_per_s}))
+    return cases
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _rows(outcome):
+    """Flatten a case outcome into (label, metrics) rows; chroma / sharded report add and query separately"""
+    if "add" in outcome:
+        return [(label, row) for label, row in outcome.items() if isinstance(row, dict) and "unit" in row]
+    return [("", outcome)]
+
+
+def print_outcome(suite, name, outcome):
+    if "skipped" in outcome:
+        print(f"   ⏭️  {suite:<9} {name}: skipped ({outcome['skipped']})")
+        return
+    for label, row in _rows(outcome):
+        latency = row.get("latency") or {}
+        p50 = f", p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms" if latency else ""
+        title = f"{name} [{label}]" if label else name
+        upstream = f", {row['upstream_calls']} upstream calls" if "upstream_calls" in row else ""
+        print(f"   {suite:<9} {title}: {row['throughput_per_s']} {row['unit']}/s{p50}{upstream}, "
+              f"peak RSS {outcome['peak_rss_mb']} MB")
+
+
+def compare(old_path, new_path):
+    """Print throughput and p50 changes for cases present in both files"""
+    def index(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        rows = {}
+        for case in data["cases"]:
+            if "skipped" in case["result"]:
+                continue
+            for label, row in _rows(case["result"]):
+                rows[(case["suite"], case["case"], label)] = row
+        return data["environment"], rows
+
+    old_env, old_rows = index(old_path)
+    new_env, new_rows = index(new_path)
+    print(f"📊 {old_env.get('commit')} -> {new_env.get('commit')}")
+    for key, new in new_rows.items():
+        old = old_rows.get(key)
+        if old is None or not old["throughput_per_s"]:
+            continue
+        change = (new["throughput_per_s"] / old["throughput_per_s"] - 1) * 100
+        line = f"   {key[0]:<9} {key[1]}{' [' + key[2] + ']' if key[2] else ''}: throughput {change:+.1f}%"
+        if old.get("latency") and new.get("latency"):
+            p50_change = (new["latency"]["p50_ms"] / old["latency"]["p50_ms"] - 1) * 100
+            line += f", p50 {p50_change:+.1f}%"
+        print(line)
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"comma-separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--chunk-segments", type=_ints, default=[10_000, 100_000])
+    parser.add_argument("--embed-texts", type=int, default=2048)
+    parser.add_argument("--batch-sizes", type=_ints, default=[1, 8, 32, 128, 512])
+    parser.add_argument("--chroma-sizes", type=_ints, default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200, help="Chroma queries per size")
+    parser.add_argument("--sharded-sizes", type=_ints, default=[1_000_000])
+    parser.add_argument("--hierarchy-segments", type=_ints, default=[1_000, 10_000, 100_000],
+                        help="transcript lengths for the hierarchy suite (~10 h = 10,000 segments)")
+    parser.add_argument("--shards", type=_ints, default=[1, 4, 16], help="shard counts for the sharded suite")
+    parser.add_argument("--llm-requests", type=int, default=64)
+    parser.add_argument("--llm-concurrency", type=_ints, default=[1, 8, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM seconds per request")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=0, help="fake LLM generation speed (0 = instant)")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    parser.add_argument("--json", metavar="PATH", help="write machine-readable results here")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two --json result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    args.suites = [s for s in args.suites.split(",") if s]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Unknown suite(s): {', '.join(sorted(unknown))}")
+    if args.quick:
+        args.chunk_segments = [10_000]
+        args.embed_texts = 256
+        args.batch_sizes = [8, 64]
+        args.chroma_sizes = [1_000, 10_000]
+        args.sharded_sizes = [10_000]
+        args.hierarchy_segments = [1_000, 10_000]
+        args.queries = 50
+        args.llm_requests = 16
+        args.llm_concurrency = [1, 8]
+        args.llm_latency = min(args.llm_latency, 0.05)
+
+    report = {"environment": environment(), "config": {k: v for k, v in vars(args).items() if k != "compare"},
+              "cases": []}
+    print(f"🏁 Benchmarking {', '.join(args.suites)} at {report['environment']['commit']}")
+    for suite, name, fn, kwargs in plan(args):
+        outcome = run_isolated(fn, kwargs)
+        report["cases"].append({"suite": suite, "case": name, "params": kwargs, "result": outcome})
+        print_outcome(suite, name, outcome)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Proxy benchmark: many parallel transcript fetches through simple_proxy.py vs async_proxy.py
+
+Everything runs locally:
+- an HTTP origin that serves a fake transcript page (with optional latency)
+- a TCP echo server standing in for a TLS endpoint behind CONNECT
+- the proxy under test, on an ephemeral port
+
+Run from the repo root:
+    python benchmarks/bench_proxy.py --requests 400 --concurrency 32
+    python benchmarks/bench_proxy.py --json > proxy.json
+"""
+import argparse
+import asyncio
+import http.server
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import simple_proxy
+from async_proxy import AsyncProxy
+
+# The proxies themselves must not chain through whatever proxy the shell has configured
+for var in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
+    os.environ.pop(var, None)
+
+
+# ==========================================
+# Local stand-ins
+# ==========================================
+
+def run_loop_in_thread():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def stop_loop(loop):
+    """Cancel whatever is still running on the background loop (lingering tunnels) and stop it"""
+    async def cancel_all():
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(cancel_all(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+async def start_origin(body_size, latency):
+    """HTTP/1.1 keep-alive origin returning body_size bytes after `latency` seconds"""
+    body = (b'{"text": "this is my Ubuntu ISO image", "start": 46.0, "duration": 9.0},' * (body_size // 72 + 1))[:body_size]
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                if latency:
+                    await asyncio.sleep(latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server.sockets[0].getsockname()[1]
+
+
+async def start_echo():
+    """Echoes whatever it receives; stands in for a TLS server behind CONNECT"""
+    async def handle(reader, writer):
+        try:
+            while data := await reader.read(256 * 1024):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server.sockets[0].getsockname()[1]
+
+
+def start_simple_proxy():
+    class QuietHandler(simple_proxy.ProxyHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], server.shutdown
+
+
+def start_async_proxy(loop, max_connections):
+    proxy = asyncio.run_coroutine_threadsafe(
+        AsyncProxy(host="127.0.0.1", port=0, max_connections=max_connections).start(), loop
+    ).result()
+    return proxy.port, lambda: asyncio.run_coroutine_threadsafe(proxy.close(), loop).result()
+
+
+# ==========================================
+# Workloads
+# ==========================================
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(latencies, failures, elapsed):
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def bench_http(proxy_port, origin_port, n_requests, concurrency, timeout):
+    """Parallel transcript fetches; one requests.Session per worker (like youtube-transcript-api)"""
+    proxies = {"http": f"http://127.0.0.1:{proxy_port}"}
+    local = threading.local()
+
+    def fetch(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.get(f"http://127.0.0.1:{origin_port}/api/timedtext?v=POf5mCs5YgI&i={i}",
+                                   proxies=proxies, timeout=timeout)
+            response.raise_for_status()
+            return time.perf_counter() - start
+        except requests.RequestException:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [r for r in results if r is not None]
+    return summarize(latencies, len(results) - len(latencies), elapsed)
+
+
+def bench_tunnel(proxy_port, echo_port, n_tunnels, concurrency, payload_size, timeout):
+    """CONNECT tunnels sending and receiving payload_size bytes at the same time (full duplex)"""
+    payload = os.urandom(payload_size)
+
+    def roundtrip(_):
+        start = time.perf_counter()
+        try:
+            with socket.create_connection(("127.0.0.1", proxy_port), timeout=timeout) as sock:
+                sock.sendall(f"CONNECT 127.0.0.1:{echo_port} HTTP/1.1\r\nHost: 127.0.0.1:{echo_port}\r\n\r\n".encode())
+                head = b""
+                while b"\r\n\r\n" not in head:
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        return None
+                    head += chunk
+                if b" 200 " not in head.split(b"\r\n", 1)[0]:
+                    return None
+                received = len(head.split(b"\r\n\r\n", 1)[1])
+
+                sender = threading.Thread(target=sock.sendall, args=(payload,), daemon=True)
+                sender.start()
+                while received < payload_size:
+                    chunk = sock.recv(256 * 1024)
+                    if not chunk:
+                        return None
+                    received += len(chunk)
+                sender.join(timeout)
+                return time.perf_counter() - start
+        except OSError:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(roundtrip, range(n_tunnels)))
+    elapsed = time.perf_counter() - start
+    latencies = [r for r in results if r is not None]
+    summary = summarize(latencies, len(results) - len(latencies), elapsed)
+    summary["throughput_mb_s"] = round(len(latencies) * payload_size * 2 / elapsed / 1e6, 1) if elapsed else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="HTTP fetches per proxy")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--body-size", type=int, default=64 * 1024, help="bytes per transcript page")
+    parser.add_argument("--latency", type=float, default=0.02, help="origin latency in seconds")
+    parser.add_argument("--tunnels", type=int, default=64)
+    parser.add_argument("--payload-size", type=int, default=1024 * 1024, help="bytes each way per tunnel")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--proxies", default="simple,async", help="comma-separated: simple, async")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results only")
+    args = parser.parse_args()
+
+    loop = run_loop_in_thread()
+    origin_port = asyncio.run_coroutine_threadsafe(start_origin(args.body_size, args.latency), loop).result()
+    echo_port = asyncio.run_coroutine_threadsafe(start_echo(), loop).result()
+
+    results = {"config": vars(args), "proxies": {}}
+    for name in args.proxies.split(","):
+        if name == "simple":
+            port, stop = start_simple_proxy()
+        elif name == "async":
+            port, stop = start_async_proxy(loop, max_connections=max(1024, args.concurrency))
+        else:
+            raise SystemExit(f"Unknown proxy: {name}")
+
+        if not args.json:
+            print(f"\n🔁 {name} proxy (port {port})")
+        http_result = bench_http(port, origin_port, args.requests, args.concurrency, args.timeout)
+        tunnel_result = bench_tunnel(port, echo_port, args.tunnels, args.concurrency, args.payload_size, args.timeout)
+        results["proxies"][name] = {"http": http_result, "tunnel": tunnel_result}
+        stop()
+
+        if not args.json:
+            print(f"   HTTP:   {http_result['ok']} ok / {http_result['failed']} failed, "
+                  f"{http_result['throughput_rps']} req/s, p50 {http_result['p50_ms']} ms, p95 {http_result['p95_ms']} ms")
+            print(f"   Tunnel: {tunnel_result['ok']} ok / {tunnel_result['failed']} failed, "
+                  f"{tunnel_result['throughput_mb_s']} MB/s, p50 {tunnel_result['p50_ms']} ms")
+
+    stop_loop(loop)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Proxy pool benchmark: bulk fetches across local stand-in proxies, some of which block
+
+Stand-ins (plain HTTP forward proxies answering for the origin themselves):
+- healthy:    200 after --latency seconds
+- slow:       200 after 5x --latency
+- blocked:    always 429, like YouTube's RequestBlocked
+- recovering: 429 for the first --recover-after seconds, then healthy
+
+Each strategy runs against a fresh pool with a short cooldown so quarantine,
+trial requests and recovery all happen within the run.
+
+Run from the repo root:
+    python benchmarks/bench_proxy_pool.py --requests 400 --concurrency 16
+    python benchmarks/bench_proxy_pool.py --json > proxy_pool.json
+"""
+import argparse
+import http.server
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from proxy_pool import ProxyPool
+
+BODY = b'{"text": "this is my Ubuntu ISO image", "start": 46.0, "duration": 9.0}' * 64
+
+
+# ==========================================
+# Local stand-ins
+# ==========================================
+
+def start_stand_in(kind, latency, recover_after):
+    started = time.monotonic()
+
+    class StandInProxy(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            blocking = kind == "blocked" or (kind == "recovering" and time.monotonic() - started < recover_after)
+            if blocking:
+                status, body = 429, b"Too Many Requests"
+            else:
+                time.sleep(latency * (5 if kind == "slow" else 1))
+                status, body = 200, BODY
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInProxy)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server.shutdown
+
+
+# ==========================================
+# Workload
+# ==========================================
+
+def run(pool, n_requests, concurrency, timeout):
+    def fetch(i):
+        def get(proxy):
+            response = pool.session(proxy).get(f"http://youtube.test/api/timedtext?v=POf5mCs5YgI&i={i}", timeout=timeout)
+            response.raise_for_status()
+            return response.content
+
+        try:
+            pool.call(get, wait=True)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    ok = sum(results)
+    return {
+        "ok": ok,
+        "failed": len(results) - ok,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 1) if elapsed else None,
+        "proxies": pool.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01, help="healthy proxy latency in seconds")
+    parser.add_argument("--recover-after", type=float, default=1.0, help="seconds the recovering proxy blocks for")
+    parser.add_argument("--cooldown", type=float, default=0.2, help="base quarantine cooldown in seconds")
+    parser.add_argument("--kinds", default="healthy,healthy,slow,blocked,recovering")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results only")
+    args = parser.parse_args()
+
+    results = {"config": vars(args), "strategies": {}}
+    for strategy in ("round_robin", "least_load"):
+        stand_ins = [start_stand_in(kind, args.latency, args.recover_after) for kind in args.kinds.split(",")]
+        pool = ProxyPool([url for url, _ in stand_ins], strategy=strategy,
+                         base_cooldown=args.cooldown, max_cooldown=args.cooldown * 16, verbose=False)
+        result = run(pool, args.requests, args.concurrency, args.timeout)
+        results["strategies"][strategy] = result
+
+        if not args.json:
+            print(f"\n🔁 {strategy}: {result['ok']} ok / {result['failed']} failed, {result['throughput_rps']} req/s")
+            for kind, stats in zip(args.kinds.split(","), result["proxies"]):
+                rate = f"{stats['success_rate']:.0%}" if stats["success_rate"] is not None else "-"
+                print(f"   {kind:<10} {stats['requests']:>4} requests, {rate:>4} ok, "
+                      f"{stats['blocks']} blocked, p50 {stats['p50_ms']} ms")
+
+        pool.close()
+        for _, stop in stand_ins:
+            stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
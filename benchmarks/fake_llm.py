@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Groq chat completions API (OpenAI-compatible)
+
+Answers POST /openai/v1/chat/completions after a configurable delay:
+    latency + completion_tokens / tokens_per_s
+and reports token usage like the real API; "stream": true requests get
+server-sent events, one word per chunk. A fraction of requests can be
+answered with 429 to exercise retry paths.
+
+Point the Groq SDK (and anything built on it) at it:
+    python benchmarks/fake_llm.py --port 8090 --latency 0.2
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=fake python app_demo.py
+"""
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+
+DEFAULT_COMPLETION = (
+    "1. Download the Ubuntu ISO image from the official website.\n"
+    "2. Create a bootable USB drive with Rufus.\n"
+    "3. Boot from the USB drive (F12 on Dell laptops) and choose Install Ubuntu.\n"
+    "4. Pick your keyboard layout, region and user details, then restart."
+)
+
+
+def _count_tokens(text):
+    # Rough: ~4 characters per token, good enough for a stand-in
+    return max(1, len(text) // 4)
+
+
+def make_handler(latency, tokens_per_s, error_rate, completion):
+    completion_tokens = _count_tokens(completion)
+
+    class FakeLLMHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                self._send(400, {"error": {"message": "invalid JSON"}})
+                return
+
+            if error_rate and random.random() < error_rate:
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                           headers={"Retry-After": "0"})
+                return
+
+            prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) for m in request.get("messages", []))
+            if request.get("stream"):
+                self._stream(request.get("model", "fake"), prompt_tokens)
+                return
+            time.sleep(latency + (completion_tokens / tokens_per_s if tokens_per_s else 0))
+            self._send(200, {
+                "id": f"chatcmpl-{random.getrandbits(48):x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": completion},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+        def _stream(self, model, prompt_tokens):
+            """Server-sent events, one chunk per word, usage on the last chunk (as Groq does)"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(latency)
+            words = completion.split(" ")
+            per_word = completion_tokens / tokens_per_s / len(words) if tokens_per_s else 0
+            for i, word in enumerate(words):
+                time.sleep(per_word)
+                self._event({"model": model, "choices": [{"index": 0, "delta": {
+                    "content": word if i == 0 else " " + word}, "finish_reason": None}]})
+            self._event({"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                         "x_groq": {"usage": {"prompt_tokens": prompt_tokens,
+                                              "completion_tokens": completion_tokens,
+                                              "total_tokens": prompt_tokens + completion_tokens}}})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _event(self, payload):
+            self._chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+        def _chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeLLMHandler
+
+
+class FakeLLMServer(http.server.ThreadingHTTPServer):
+    # The default listen backlog (5) makes a burst of new connections wait for SYN retries
+    request_queue_size = 128
+
+
+def start_fake_llm(latency=0.2, tokens_per_s=0, error_rate=0.0, completion=DEFAULT_COMPLETION,
+                   host="127.0.0.1", port=0):
+    """Serve on a background thread; returns (base_url, shutdown)"""
+    server = FakeLLMServer((host, port), make_handler(latency, tokens_per_s, error_rate, completion))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}", server.shutdown
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=0, help="generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    url, _ = start_fake_llm(args.latency, args.tokens_per_s, args.error_rate, port=args.port)
+    print(f"✅ Fake LLM running on {url}")
+    print(f"   GROQ_BASE_URL={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n✋ Fake LLM stopped")
@@ -0,0 +1,34 @@
+"""
+Transcript chunking shared by app.py, app_demo.py, lang-chain.py and the benchmarks
+
+Groups consecutive transcript segments into overlapping windows:
+chunk_size=3, overlap=1 -> segments [0,1,2], [2,3,4], [4,5,6], ...
+"""
+
+
+def chunk_transcript(segments, chunk_size=3, overlap=1, min_segments=2):
+    """
+    Turn [{'text', 'start', 'duration'}, ...] into chunks with
+    text, start, end, duration and segment_indices
+
+    Windows shorter than min_segments (the tail) are skipped.
+    """
+    if overlap >= chunk_size:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+    step = chunk_size - overlap
+
+    chunks = []
+    for i in range(0, len(segments), step):
+        group = segments[i:i + chunk_size]
+        if len(group) < min_segments:  # Skip very small final chunks
+            continue
+
+        end = group[-1]['start'] + group[-1]['duration']
+        chunks.append({
+            'text': ' '.join([t['text'] for t in group]),
+            'start': group[0]['start'],
+            'end': end,
+            'duration': end - group[0]['start'],
+            'segment_indices': list(range(i, i + len(group)))
+        })
+    return chunks
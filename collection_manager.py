@@ -0,0 +1,471 @@
+"""
+Multi-tenant Chroma collections under a RAM budget
+
+The scripts each create fixed names ('youtube', 'movies') on an in-memory
+client: a second create in the same process fails and every vector stays in
+RAM. CollectionManager instead hosts many namespaced collections in one
+process:
+
+- namespaces: (tenant, name) -> <root>/<tenant>/<name>, one PersistentClient
+  directory per collection, so tenants / channels never collide
+- lazy loading: collection() returns a handle; the index is opened (and its
+  HNSW graph loaded) on first use
+- LRU eviction: loaded collections are tracked by last use and their
+  estimated index size (vector_index.estimate_index_bytes); when the total
+  passes the budget the coldest ones are closed and their memory released.
+  Data stays on disk and is reloaded on next use. Collections in the middle
+  of a call are never evicted.
+- stats per collection: vectors, dimension, estimated RAM, size on disk,
+  loaded or not, loads / evictions, last access and queries per minute
+
+Usage:
+    manager = CollectionManager(".collections", ram_budget_mb=512)
+    collection = manager.collection("channel_a", "youtube", embedding_function=embedding_fn)
+    collection.add(ids=..., documents=..., metadatas=...)
+    results = collection.query(query_texts=["How to install Ubuntu?"], n_results=3)
+
+    python collection_manager.py stats .collections
+    python collection_manager.py bench --tenants 12 --vectors 20000 --budget-mb 150
+
+The bench builds the collections once under --root (reused by later runs) and
+queries them in a child process, so its RSS reflects only the query phase.
+"""
+import argparse
+import ctypes
+import gc
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import chromadb
+
+from vector_index import create_collection, estimate_index_bytes, index_params
+
+DEFAULT_ROOT = os.getenv("COLLECTIONS_DIR", ".collections")
+DEFAULT_RAM_BUDGET_MB = float(os.getenv("COLLECTIONS_RAM_BUDGET_MB", "512"))
+DEFAULT_TENANT = "default"
+QUERY_RATE_WINDOW = 60.0  # seconds of query timestamps kept for queries_per_min
+MANIFEST = "manifest.json"
+
+# Tenants are directory names; collection names follow Chroma's rule (3-512 chars from
+# [A-Za-z0-9._-], alphanumeric at both ends)
+_TENANT = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,62}$")
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{1,510}[A-Za-z0-9]$")
+
+
+def _check_tenant(value):
+    if not _TENANT.match(value):
+        raise ValueError(f"Invalid tenant {value!r}: use letters, digits, '_' and '-' (max 63)")
+    return value
+
+
+def _check_name(value):
+    if not _NAME.match(value):
+        raise ValueError(f"Invalid collection name {value!r}: use 3-512 letters, digits, '.', '_' and '-', "
+                         "starting and ending with a letter or digit")
+    return value
+
+
+def _release_client(client, path):
+    """Stop the Chroma system behind a PersistentClient so its segments leave memory"""
+    # Chroma keeps one system per persist directory for the whole process. Client.close()
+    # (chromadb 1.5 has it) stops it once its last client closes; older releases only
+    # have the private per-directory registry, and if neither exists memory is left to gc.
+    if hasattr(client, "close"):
+        client.close()
+    else:
+        from chromadb.api.shared_system_client import SharedSystemClient
+
+        registry = getattr(SharedSystemClient, "_identifier_to_system", None)
+        system = registry.pop(str(path), None) if isinstance(registry, dict) else None
+        if system is not None:
+            system.stop()
+    gc.collect()
+    _malloc_trim()
+
+
+def _malloc_trim():
+    """Hand freed heap pages back to the OS (glibc keeps them otherwise)"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # not glibc
+
+
+def _dir_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file()) if Path(path).exists() else 0
+
+
+class _Entry:
+    """Bookkeeping for one (tenant, name) collection"""
+
+    def __init__(self, tenant, name, path, embedding_function=None):
+        self.tenant = tenant
+        self.name = name
+        self.path = path
+        self.embedding_function = embedding_function
+        self.client = None
+        self.collection = None
+        self.in_use = 0
+        self.vectors = 0
+        self.dim = None
+        self.loads = 0
+        self.evictions = 0
+        self.last_access = None
+        self.queries = deque()
+
+    @property
+    def loaded(self):
+        return self.collection is not None
+
+
+class ManagedCollection:
+    """
+    Handle to a managed collection with the usual Chroma methods; each call
+    loads the collection if needed and marks it as recently used
+    """
+
+    def __init__(self, manager, key):
+        self._manager = manager
+        self.key = key
+
+    def _call(self, method, *args, **kwargs):
+        with self._manager._use(self.key, method) as collection:
+            return getattr(collection, method)(*args, **kwargs)
+
+    def add(self, **kwargs):
+        self._call("add", **kwargs)
+        self._manager._written(self.key, kwargs)
+
+    def upsert(self, **kwargs):
+        self._call("upsert", **kwargs)
+        self._manager._written(self.key, kwargs)
+
+    def update(self, **kwargs):
+        self._call("update", **kwargs)
+        self._manager._written(self.key, kwargs)
+
+    def delete(self, **kwargs):
+        self._call("delete", **kwargs)
+        self._manager._written(self.key, {})
+
+    def modify(self, name=None, **kwargs):
+        # The manager finds a collection by its name: renaming it in Chroma would orphan the data
+        if name is not None and name != self.key[1]:
+            raise ValueError("Managed collections can't be renamed: drop it and create a new one")
+        self._call("modify", **kwargs)
+        self._manager._written(self.key, {})
+
+    def query(self, **kwargs):
+        return self._call("query", **kwargs)
+
+    def get(self, **kwargs):
+        return self._call("get", **kwargs)
+
+    def count(self):
+        return self._call("count")
+
+    def __getattr__(self, attr):
+        # Anything else (metadata, configuration, peek, ...) from the loaded collection.
+        # Methods are wrapped so each call loads the collection again if it was evicted.
+        with self._manager._use(self.key) as collection:
+            value = getattr(collection, attr)
+        if callable(value):
+            return lambda *args, **kwargs: self._call(attr, *args, **kwargs)
+        return value
+
+
+class CollectionManager:
+    """Namespaced, lazily loaded, LRU-evicted collections (see module docstring)"""
+
+    def __init__(self, root=DEFAULT_ROOT, ram_budget_mb=DEFAULT_RAM_BUDGET_MB, embedding_function=None,
+                 **params):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ram_budget = int(ram_budget_mb * 1024 * 1024)
+        self.embedding_function = embedding_function
+        self.params = params
+        self._M = index_params(**params)["M"]
+        self._entries = {}
+        self._lru = OrderedDict()  # loaded keys, coldest first
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)  # notified when a collection's last call ends
+        self._manifest = {}
+        if (self.root / MANIFEST).exists():
+            with open(self.root / MANIFEST, encoding="utf-8") as f:
+                self._manifest = json.load(f)
+
+    # ------------------------------------------
+    # Namespaces
+    # ------------------------------------------
+
+    def collection(self, tenant, name, embedding_function=None):
+        """Handle to <tenant>/<name>; nothing is loaded until it is used"""
+        key = (_check_tenant(tenant), _check_name(name))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(tenant, name, self.root / tenant / name,
+                                                    embedding_function or self.embedding_function)
+                known = self._manifest.get(f"{tenant}/{name}", {})
+                entry.vectors, entry.dim = known.get("vectors", 0), known.get("dim")
+            elif embedding_function is not None:
+                entry.embedding_function = embedding_function
+        return ManagedCollection(self, key)
+
+    def tenants(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def collections(self, tenant=None):
+        """(tenant, name) of every collection on disk"""
+        tenants = [tenant] if tenant else self.tenants()
+        return [(t, p.name) for t in tenants if (self.root / t).is_dir()
+                for p in sorted((self.root / t).iterdir()) if p.is_dir()]
+
+    def drop(self, tenant, name):
+        """Delete a collection and its files, after the calls already running on it finish"""
+        key = (_check_tenant(tenant), _check_name(name))
+        with self._lock:
+            # Unregistered first, so no new call starts on it while we wait
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._idle.wait_for(lambda: not entry.in_use)
+                if entry.loaded:
+                    self._evict(key, entry)
+            self._manifest.pop(f"{tenant}/{name}", None)
+            self._save_manifest()
+        shutil.rmtree(self.root / tenant / name, ignore_errors=True)
+
+    # ------------------------------------------
+    # Loading and eviction
+    # ------------------------------------------
+
+    def _estimate(self, entry):
+        return estimate_index_bytes(entry.vectors, entry.dim or 0, self._M) if entry.dim else 0
+
+    def resident_bytes(self):
+        """Estimated index memory of the loaded collections"""
+        with self._lock:
+            return sum(self._estimate(self._entries[key]) for key in self._lru)
+
+    @contextmanager
+    def _use(self, key, method=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise ValueError(f"Collection {key[0]}/{key[1]} was dropped")
+            if not entry.loaded:
+                self._load(entry)
+            entry.in_use += 1
+            entry.last_access = time.time()
+            self._lru[key] = True
+            self._lru.move_to_end(key)
+            if method == "query":
+                entry.queries.append(entry.last_access)
+            self._enforce_budget()
+        try:
+            yield entry.collection
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                if not entry.in_use:
+                    self._idle.notify_all()
+
+    def _load(self, entry):
+        client = entry.client = chromadb.PersistentClient(path=str(entry.path))
+        entry.collection = create_collection(client, entry.name, embedding_function=entry.embedding_function,
+                                             get_or_create=True, **self.params)
+        entry.vectors = entry.collection.count()
+        if entry.vectors and entry.dim is None:
+            sample = entry.collection.get(limit=1, include=["embeddings"])["embeddings"]
+            entry.dim = len(sample[0])
+        entry.loads += 1
+
+    def _evict(self, key, entry):
+        client, entry.client, entry.collection = entry.client, None, None
+        _release_client(client, entry.path)
+        self._lru.pop(key, None)
+        entry.evictions += 1
+        self._manifest[f"{entry.tenant}/{entry.name}"] = {"vectors": entry.vectors, "dim": entry.dim}
+
+    def _enforce_budget(self):
+        """Evict the least recently used idle collections until the estimate fits"""
+        resident = self.resident_bytes()
+        evicted = False
+        for key in list(self._lru):
+            if resident <= self.ram_budget:
+                break
+            entry = self._entries[key]
+            if entry.in_use or key == next(reversed(self._lru)):
+                continue  # busy, or the one being used right now
+            resident -= self._estimate(entry)
+            self._evict(key, entry)
+            evicted = True
+        if evicted:
+            self._save_manifest()
+
+    def _written(self, key, kwargs):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return  # dropped meanwhile
+            if entry.dim is None and kwargs.get("embeddings") is not None and len(kwargs["embeddings"]):
+                entry.dim = len(kwargs["embeddings"][0])
+            if entry.loaded:
+                entry.vectors = entry.collection.count()
+                if entry.dim is None and entry.vectors:
+                    sample = entry.collection.get(limit=1, include=["embeddings"])["embeddings"]
+                    entry.dim = len(sample[0])
+            self._enforce_budget()
+
+    def evict(self, tenant, name):
+        with self._lock:
+            entry = self._entries.get((tenant, name))
+            if entry is not None and entry.loaded and not entry.in_use:
+                self._evict((tenant, name), entry)
+                self._save_manifest()
+
+    def close(self):
+        """Release every loaded collection (data stays on disk)"""
+        with self._lock:
+            for key in list(self._lru):
+                self._evict(key, self._entries[key])
+            self._save_manifest()
+
+    def _save_manifest(self):
+        tmp = self.root / (MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp, self.root / MANIFEST)
+
+    # ------------------------------------------
+    # Stats
+    # ------------------------------------------
+
+    def stats(self):
+        """One row per collection known to this manager or on disk"""
+        now = time.time()
+        with self._lock:
+            for tenant, name in self.collections():
+                self.collection(tenant, name)
+            rows = []
+            for (tenant, name), entry in sorted(self._entries.items()):
+                while entry.queries and now - entry.queries[0] > QUERY_RATE_WINDOW:
+                    entry.queries.popleft()
+                rows.append({
+                    "tenant": tenant,
+                    "name": name,
+                    "loaded": entry.loaded,
+                    "vectors": entry.vectors,
+                    "dim": entry.dim,
+                    "ram_estimate_mb": round(self._estimate(entry) / 2**20, 1),
+                    "disk_mb": round(_dir_bytes(entry.path) / 2**20, 1),
+                    "loads": entry.loads,
+                    "evictions": entry.evictions,
+                    "last_access": entry.last_access,
+                    "queries_per_min": round(len(entry.queries) * 60.0 / QUERY_RATE_WINDOW, 1),
+                })
+        return rows
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def print_stats(manager):
+    print(f"📚 {manager.root}: budget {manager.ram_budget / 2**20:.0f} MB, "
+          f"resident estimate {manager.resident_bytes() / 2**20:.1f} MB")
+    for row in manager.stats():
+        state = "🟢" if row["loaded"] else "💤"
+        print(f"   {state} {row['tenant']}/{row['name']}: {row['vectors']} vectors, "
+              f"~{row['ram_estimate_mb']} MB RAM, {row['disk_mb']} MB disk, "
+              f"{row['loads']} loads / {row['evictions']} evictions, {row['queries_per_min']} queries/min")
+
+
+def build_bench(root, n_tenants, n_vectors, dim=384):
+    """n_tenants collections of random vectors under root (skipped when already built)"""
+    import numpy as np
+
+    manager = CollectionManager(root, ram_budget_mb=0)  # keep at most the collection being written
+    if len(manager.collections()) >= n_tenants:
+        return
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for t in range(n_tenants):
+        collection = manager.collection(f"channel_{t:02d}", "youtube")
+        vectors = rng.standard_normal((n_vectors, dim)).astype(np.float32)
+        for i in range(0, n_vectors, 5000):
+            collection.upsert(ids=[f"{t}_{j}" for j in range(i, min(i + 5000, n_vectors))],
+                              embeddings=vectors[i:i + 5000])
+    manager.close()
+    print(f"🏗️  {n_tenants} tenants x {n_vectors} vectors built in {time.perf_counter() - start:.1f}s")
+
+
+def bench(root, n_tenants, budget_mb, rounds, dim=384):
+    """Round-robin queries over every tenant; RSS is measured in this (fresh) process"""
+    import numpy as np
+
+    rng = np.random.default_rng(1)
+    manager = CollectionManager(root, ram_budget_mb=budget_mb)
+    baseline = peak = _rss_mb()
+    latencies = []
+    for _ in range(rounds):
+        for t in range(n_tenants):
+            query = rng.standard_normal((1, dim)).astype(np.float32)
+            start = time.perf_counter()
+            manager.collection(f"channel_{t:02d}", "youtube").query(query_embeddings=query, n_results=5)
+            latencies.append(time.perf_counter() - start)
+            peak = max(peak, _rss_mb())
+
+    latencies.sort()
+    total = sum(row["ram_estimate_mb"] for row in manager.stats())
+    print(f"🔎 {len(latencies)} queries over {n_tenants} tenants (~{total:.0f} MB of indexes, budget {budget_mb:.0f} MB)")
+    print(f"   p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms "
+          f"(cold loads included)")
+    print(f"   RSS: {baseline:.0f} MB at start, peak {peak:.0f} MB")
+    print_stats(manager)
+    manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="collections, sizes and state under a root")
+    stats.add_argument("root", nargs="?", default=DEFAULT_ROOT)
+    bench_parser = commands.add_parser("bench", help="round-robin queries over more tenants than fit the budget")
+    bench_parser.add_argument("--root", default=".collections-bench")
+    bench_parser.add_argument("--tenants", type=int, default=12)
+    bench_parser.add_argument("--vectors", type=int, default=20000, help="vectors per tenant")
+    bench_parser.add_argument("--budget-mb", type=float, default=150)
+    bench_parser.add_argument("--rounds", type=int, default=3)
+    bench_parser.add_argument("--query-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print_stats(CollectionManager(args.root, ram_budget_mb=DEFAULT_RAM_BUDGET_MB))
+    elif args.query_only:
+        bench(args.root, args.tenants, args.budget_mb, args.rounds)
+    else:
+        build_bench(args.root, args.tenants, args.vectors)
+        # Query in a child process so building's heap does not count towards the measured RSS
+        subprocess.run([sys.executable, __file__, *sys.argv[1:], "--query-only"], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Expand retrieved chunks to ±N seconds of surrounding transcript
+
+A matched chunk often starts mid-explanation (the boot menu step before the
+install screen is in the previous chunk). Before prompting, each hit is
+widened to [start - N, end + N] using the video's own segments, and hits
+whose widened spans overlap are merged so the prompt never repeats text.
+
+The lookup is O(1) per hit: a per-video table maps every second to the first
+segment still running at that time and to the last segment started by then,
+so no search (vector or binary) happens at query time.
+
+Works on a list of segments (to_raw_data() form) or on a video in a
+transcript_store.TranscriptStore (zero-copy columns):
+    expander = ContextExpander.from_segments(raw_data)
+    windows = expander.expand_results(results, seconds=20)   # Chroma query results
+"""
+import math
+
+import numpy as np
+
+DEFAULT_CONTEXT_SECONDS = 20
+
+
+class ContextExpander:
+    """Second -> segment offset tables for one video"""
+
+    def __init__(self, starts, durations, text_fn, resolution=1.0):
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = starts + np.asarray(durations, dtype=np.float64)
+        self.starts = starts
+        self.ends = ends
+        self.text_fn = text_fn  # (first, end) -> joined text of segments [first, end)
+        self.resolution = resolution
+
+        n_buckets = int(math.ceil((ends.max() if len(ends) else 0) / resolution)) + 2
+        bucket_times = np.arange(n_buckets) * resolution
+        # Captions can overlap, so search a running max of the ends (it is sorted)
+        running_end = np.maximum.accumulate(ends) if len(ends) else ends
+        # First segment still running at time t (its end is after t)
+        self.first_at = np.searchsorted(running_end, bucket_times, side="right").astype(np.int32)
+        # One past the last segment that has started by time t
+        self.end_at = np.searchsorted(starts, bucket_times, side="right").astype(np.int32)
+
+    @classmethod
+    def from_segments(cls, segments, resolution=1.0):
+        def text_fn(first, end):
+            return " ".join(s["text"] for s in segments[first:end])
+        return cls([s["start"] for s in segments], [s["duration"] for s in segments], text_fn, resolution)
+
+    @classmethod
+    def from_store(cls, store, video_id, resolution=1.0):
+        first, end = store.video_range(video_id)
+
+        def text_fn(a, b):
+            return store.joined_text(first + a, first + b)
+        return cls(store.starts[first:end], store.durations[first:end], text_fn, resolution)
+
+    def segment_range(self, start, end):
+        """(first, end) segment indices covering [start, end], rounded out to the table resolution"""
+        last_bucket = len(self.first_at) - 1
+        lo = min(max(int(math.floor(start / self.resolution)), 0), last_bucket)
+        hi = min(max(int(math.ceil(end / self.resolution)), 0), last_bucket)
+        first, stop = int(self.first_at[lo]), int(self.end_at[hi])
+        return first, max(stop, first)
+
+    def expand(self, hits, seconds=DEFAULT_CONTEXT_SECONDS):
+        """
+        Widen [{'start', 'end', ...}, ...] hits by ±seconds and merge overlaps
+
+        Returns windows in video order: {'start', 'end', 'text', 'segment_range',
+        'hits'} where hits lists the indices of the input hits each window covers.
+        """
+        spans = []
+        for rank, hit in enumerate(hits):
+            first, stop = self.segment_range(hit["start"] - seconds, hit["end"] + seconds)
+            if stop > first:
+                spans.append((first, stop, rank))
+        spans.sort()
+
+        merged = []
+        for first, stop, rank in spans:
+            if merged and first <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], stop)
+                merged[-1][2].append(rank)
+            else:
+                merged.append([first, stop, [rank]])
+
+        return [{
+            "start": float(self.starts[first]),
+            "end": float(self.ends[stop - 1]),
+            "text": self.text_fn(first, stop),
+            "segment_range": (first, stop),
+            "hits": sorted(ranks),
+        } for first, stop, ranks in merged]
+
+    def expand_results(self, results, seconds=DEFAULT_CONTEXT_SECONDS, query_index=0):
+        """expand() for a Chroma query result whose metadatas carry start / end"""
+        return self.expand(results["metadatas"][query_index], seconds)
@@ -0,0 +1,330 @@
+"""
+Retrieval quality + latency evaluation
+
+Runs labelled query sets (eval_sets/*.json) against every combination of
+chunker (fixed windows or semantic segmentation), chunk size, overlap,
+embedding model and index backend, and reports:
+- recall@k, MRR and nDCG@k
+- per-query latency, split into query embedding and index search (p50 / p95)
+- index build time
+
+Label formats:
+- transcript sets: a retrieved chunk is relevant when its [start, end] overlaps
+  one of the query's expected time ranges (seconds)
+- document sets: a result is relevant when its id field (e.g. title) is expected
+
+A target (range or title) is credited once, at the first rank that hits it.
+
+Usage:
+    python evaluation.py eval_sets/ubuntu_tutorial.json --chunk-sizes 2,3,5 --overlaps 0,1
+    python evaluation.py eval_sets/ubuntu_tutorial.json --chunkers fixed,semantic
+    python evaluation.py eval_sets/movies.json --backends chroma,exact,exact-int8 --json movies-eval.json
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from chunking import chunk_transcript
+from segmentation import segment_transcript
+from vector_index import create_collection
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_KS = (1, 3, 5)
+
+
+# ==========================================
+# Index backends
+# ==========================================
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """Class decorator: make an index backend selectable with --backends name"""
+    def decorator(cls):
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+@register_backend("chroma")
+class ChromaBackend:
+    """In-memory Chroma collection (HNSW) with the apps' index parameters (vector_index.py)"""
+    space = None
+
+    def build(self, embeddings):
+        import chromadb
+        client = chromadb.Client()
+        self.collection = create_collection(client, f"eval_{uuid.uuid4().hex[:12]}", space=self.space)
+        max_batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+        for i in range(0, len(embeddings), max_batch):
+            batch = embeddings[i:i + max_batch]
+            self.collection.add(ids=[str(j) for j in range(i, i + len(batch))], embeddings=batch)
+
+    def search(self, vector, k):
+        results = self.collection.query(query_embeddings=[vector], n_results=k, include=[])
+        return [int(i) for i in results["ids"][0]]
+
+
+@register_backend("chroma-l2")
+class ChromaL2Backend(ChromaBackend):
+    space = "l2"
+
+
+@register_backend("exact")
+class ExactBackend:
+    """Brute-force cosine similarity in numpy: the recall ceiling for ANN backends"""
+
+    def build(self, embeddings):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        self.matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    def search(self, vector, k):
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self.matrix @ (vector / np.linalg.norm(vector))
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+@register_backend("exact-int8")
+class Int8Backend(ExactBackend):
+    """Exact search over int8-quantized vectors (4x smaller), to measure the recall cost"""
+
+    def build(self, embeddings):
+        super().build(embeddings)
+        self.matrix = np.round(self.matrix * 127).astype(np.int8)
+
+    def search(self, vector, k):
+        vector = np.asarray(vector, dtype=np.float32)
+        query = np.round(vector / np.linalg.norm(vector) * 127).astype(np.int32)
+        scores = self.matrix.astype(np.int32) @ query
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+# ==========================================
+# Datasets
+# ==========================================
+
+def load_dataset(path):
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        dataset = json.load(f)
+    if dataset["kind"] == "documents":
+        with open(path.parent / dataset["csv"], encoding="utf-8", newline="") as f:
+            dataset["documents"] = [
+                {"id": row[dataset["id_field"]], "text": row[dataset["text_field"]] or ""}
+                for row in csv.DictReader(f)
+            ]
+    elif dataset["kind"] != "transcript":
+        raise ValueError(f"Unknown dataset kind: {dataset['kind']}")
+    return dataset
+
+
+def build_items(dataset, chunk_size, overlap, chunker="fixed", embedding_fn=None):
+    """Texts to index plus a judge(item_index, query) -> set of satisfied targets"""
+    if dataset["kind"] == "documents":
+        items = dataset["documents"]
+
+        def judge(index, query):
+            return {items[index]["id"]} & set(query["expected"])
+        return [d["text"] for d in items], judge
+
+    if chunker == "semantic":
+        items = segment_transcript(dataset["transcript"], embedding_fn=embedding_fn)
+    else:
+        items = chunk_transcript(dataset["transcript"], chunk_size=chunk_size, overlap=overlap)
+
+    def judge(index, query):
+        chunk = items[index]
+        return {
+            j for j, (start, end) in enumerate(query["expected"])
+            if chunk["start"] < end and start < chunk["end"]
+        }
+    return [c["text"] for c in items], judge
+
+
+# ==========================================
+# Metrics
+# ==========================================
+
+def score_ranking(ranked, judge, query, ks):
+    """recall@k, reciprocal rank and nDCG@k for one query"""
+    n_targets = len(query["expected"])
+    seen = set()
+    gains = []
+    first_hit = None
+    for rank, index in enumerate(ranked):
+        satisfied = judge(index, query)
+        new = satisfied - seen
+        gains.append(1.0 if new else 0.0)
+        seen |= satisfied
+        if satisfied and first_hit is None:
+            first_hit = rank + 1
+
+    scores = {"rr": 1.0 / first_hit if first_hit else 0.0, "first_hit": first_hit}
+    for k in ks:
+        covered = set()
+        for index in ranked[:k]:
+            covered |= judge(index, query)
+        scores[f"recall@{k}"] = len(covered) / n_targets
+        dcg = sum(g / math.log2(i + 2) for i, g in enumerate(gains[:k]))
+        ideal = sum(1 / math.log2(i + 2) for i in range(min(k, n_targets)))
+        scores[f"ndcg@{k}"] = dcg / ideal
+    return scores
+
+
+def percentile_ms(values, pct):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] * 1000, 3)
+
+
+# ==========================================
+# Runner
+# ==========================================
+
+_embedding_fns = {}
+
+
+def get_embedding_fn(model_name):
+    """Same embedding function the apps hand to Chroma, loaded once per model"""
+    if model_name not in _embedding_fns:
+        from chromadb.utils import embedding_functions
+        _embedding_fns[model_name] = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+    return _embedding_fns[model_name]
+
+
+def evaluate(dataset, chunk_size, overlap, model_name, backend_name, ks=DEFAULT_KS, chunker="fixed"):
+    """One combination: build the index, run every query, aggregate metrics"""
+    embedding_fn = get_embedding_fn(model_name)
+    texts, judge = build_items(dataset, chunk_size, overlap, chunker=chunker, embedding_fn=embedding_fn)
+    embeddings = np.asarray(embedding_fn(texts), dtype=np.float32)
+
+    backend = BACKENDS[backend_name]()
+    start = time.perf_counter()
+    backend.build(embeddings)
+    build_s = time.perf_counter() - start
+
+    k = min(max(ks), len(texts))
+    per_query, embed_times, search_times = [], [], []
+    for query in dataset["queries"]:
+        start = time.perf_counter()
+        vector = np.asarray(embedding_fn([query["query"]])[0], dtype=np.float32)
+        embed_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ranked = backend.search(vector, k)
+        search_times.append(time.perf_counter() - start)
+
+        # Unanswerable queries are timed but have nothing to recall
+        if query["expected"]:
+            per_query.append({"query": query["query"], **score_ranking(ranked, judge, query, ks)})
+
+    row = {
+        "dataset": dataset["name"],
+        "chunker": chunker if dataset["kind"] == "transcript" else None,
+        "chunk_size": chunk_size if dataset["kind"] == "transcript" else None,
+        "overlap": overlap if dataset["kind"] == "transcript" else None,
+        "model": model_name,
+        "backend": backend_name,
+        "items": len(texts),
+        # Chunks of different sizes are only comparable at a similar length
+        "avg_words": round(sum(len(t.split()) for t in texts) / len(texts), 1) if texts else 0,
+        "queries": len(per_query),
+        "mrr": round(sum(q["rr"] for q in per_query) / len(per_query), 4) if per_query else None,
+    }
+    for k in ks:
+        for metric in (f"recall@{k}", f"ndcg@{k}"):
+            row[metric] = round(sum(q[metric] for q in per_query) / len(per_query), 4) if per_query else None
+    row.update({
+        "embed_p50_ms": percentile_ms(embed_times, 50),
+        "embed_p95_ms": percentile_ms(embed_times, 95),
+        "search_p50_ms": percentile_ms(search_times, 50),
+        "search_p95_ms": percentile_ms(search_times, 95),
+        "build_s": round(build_s, 4),
+        "per_query": per_query,
+    })
+    return row
+
+
+def combinations(dataset, chunkers, chunk_sizes, overlaps, models, backends):
+    """(chunker, chunk_size, overlap, model, backend) to evaluate on this dataset"""
+    if dataset["kind"] == "documents":
+        # Documents are indexed whole; chunking does not apply
+        chunkers = [None]
+    for chunker in chunkers:
+        # Window size and overlap only apply to fixed windows
+        sizes = itertools.product(chunk_sizes, overlaps) if chunker == "fixed" else [(None, None)]
+        for (chunk_size, overlap), model, backend in itertools.product(sizes, models, backends):
+            if chunk_size is not None and overlap >= chunk_size:
+                continue
+            yield chunker, chunk_size, overlap, model, backend
+
+
+def print_row(row, ks):
+    if row["chunk_size"] is not None:
+        config = f"size {row['chunk_size']}/overlap {row['overlap']}, "
+    else:
+        config = f"{row['chunker']}, " if row["chunker"] else ""
+    config += f"{row['items']} items of ~{row['avg_words']:.0f} words, " if row["chunker"] else ""
+    quality = ", ".join(f"R@{k} {row[f'recall@{k}']:.2f}" for k in ks)
+    print(f"   {config}{row['model']}, {row['backend']}: {quality}, MRR {row['mrr']:.2f}, "
+          f"nDCG@{max(ks)} {row[f'ndcg@{max(ks)}']:.2f} | search p50 {row['search_p50_ms']} ms, "
+          f"embed p50 {row['embed_p50_ms']} ms")
+
+
+def _csv_list(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("datasets", nargs="+", help="labelled query sets (eval_sets/*.json)")
+    parser.add_argument("--chunkers", type=_csv_list(str), default=["fixed"], help="fixed and/or semantic")
+    parser.add_argument("--chunk-sizes", type=_csv_list(int), default=[3])
+    parser.add_argument("--overlaps", type=_csv_list(int), default=[1])
+    parser.add_argument("--models", type=_csv_list(str), default=[DEFAULT_MODEL])
+    parser.add_argument("--backends", type=_csv_list(str), default=["chroma", "exact"],
+                        help=f"any of: {', '.join(BACKENDS)}")
+    parser.add_argument("--k", type=_csv_list(int), default=list(DEFAULT_KS), help="cutoffs for recall / nDCG")
+    parser.add_argument("--per-query", action="store_true", help="print the first relevant rank of every query")
+    parser.add_argument("--json", metavar="PATH", help="write all rows (with per-query scores) here")
+    args = parser.parse_args()
+
+    unknown = set(args.backends) - set(BACKENDS)
+    if unknown:
+        raise SystemExit(f"Unknown backend(s): {', '.join(sorted(unknown))}")
+    unknown = set(args.chunkers) - {"fixed", "semantic"}
+    if unknown:
+        raise SystemExit(f"Unknown chunker(s): {', '.join(sorted(unknown))}")
+
+    rows = []
+    for path in args.datasets:
+        dataset = load_dataset(path)
+        print(f"\n📊 {dataset['name']} ({len(dataset['queries'])} queries)")
+        for chunker, chunk_size, overlap, model, backend in combinations(dataset, args.chunkers, args.chunk_sizes,
+                                                                        args.overlaps, args.models, args.backends):
+            row = evaluate(dataset, chunk_size, overlap, model, backend, ks=args.k, chunker=chunker)
+            rows.append(row)
+            print_row(row, args.k)
+            if args.per_query:
+                for q in row["per_query"]:
+                    rank = q["first_hit"] or "miss"
+                    print(f"      {'✅' if q['first_hit'] == 1 else '⚠️ ' if q['first_hit'] else '❌'} "
+                          f"{q['query']!r}: first relevant at {rank}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Three-level transcript index: segments -> windows -> chapters, searched coarse-to-fine
+
+- segments: the raw transcript lines (exact timestamps)
+- windows:  ~80-token chunks from segmentation.py (context for the Groq prompt)
+- chapters: runs of windows cut on topic boundaries, represented by the
+            centroid of their windows, or by an embedded summary when a
+            summarize_fn is given (e.g. a Groq call)
+
+Each level links to the one below by contiguous index ranges. A search scores
+every chapter, then only the windows of the best chapters, then only the
+segments of the best windows. Chapters hold ~sqrt(#windows) windows, so a
+query scores O(sqrt(n)) vectors instead of n, and every hit still carries the
+exact start of its best-matching segment for format_timestamp links.
+
+Usage:
+    index = HierarchicalIndex.build(raw_data, embedding_fn)
+    for hit in index.search("How to install Ubuntu?", n_results=3):
+        print(format_timestamp(hit["start"]), hit["text"])
+"""
+import math
+
+import numpy as np
+
+from segmentation import count_tokens, segment_transcript
+
+DEFAULT_CHAPTER_TOKENS = 600
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def _top(scores, k):
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class HierarchicalIndex:
+    """Linked segment / window / chapter levels (see module docstring)"""
+
+    def __init__(self, segments, segment_vectors, windows, window_vectors, chapters, chapter_vectors,
+                 embedding_fn=None):
+        self.segments = segments
+        self.windows = windows
+        self.chapters = chapters
+        self.segment_vectors = _normalize(segment_vectors)
+        self.window_vectors = _normalize(window_vectors)
+        self.chapter_vectors = _normalize(chapter_vectors)
+        self.embedding_fn = embedding_fn
+
+    @classmethod
+    def build(cls, segments, embedding_fn, chapter_tokens=None, summarize_fn=None, **window_kwargs):
+        """
+        Embed segments once, segment them into windows, group windows into chapters
+
+        chapter_tokens defaults to max(600, ~sqrt(#windows) windows' worth).
+        window_kwargs go to segmentation.segment_transcript (target_tokens, ...).
+        """
+        segment_vectors = _normalize(embedding_fn([s["text"] for s in segments]))
+        windows = segment_transcript(segments, embeddings=segment_vectors, **window_kwargs)
+        window_vectors = _normalize(embedding_fn([w["text"] for w in windows]))
+
+        if chapter_tokens is None:
+            mean_tokens = sum(count_tokens(w["text"]) for w in windows) / max(len(windows), 1)
+            chapter_tokens = max(DEFAULT_CHAPTER_TOKENS, int(math.sqrt(len(windows)) * mean_tokens))
+        # Same segmenter one level up: windows play the role of segments
+        groups = segment_transcript(
+            windows, embeddings=window_vectors, target_tokens=chapter_tokens,
+            min_tokens=chapter_tokens // 2, max_tokens=chapter_tokens * 2,
+        )
+
+        chapters, chapter_vectors = [], []
+        for group in groups:
+            first, last = group["segment_indices"][0], group["segment_indices"][-1]
+            centroid = _normalize(window_vectors[first:last + 1].mean(axis=0))
+            chapter = {
+                "start": group["start"],
+                "end": group["end"],
+                "window_range": (first, last + 1),
+                # Extractive summary: the window closest to the chapter centroid
+                "summary": windows[first + int(np.argmax(window_vectors[first:last + 1] @ centroid))]["text"],
+            }
+            if summarize_fn is not None:
+                chapter["summary"] = summarize_fn(group["text"])
+                centroid = _normalize(embedding_fn([chapter["summary"]])[0])
+            chapters.append(chapter)
+            chapter_vectors.append(centroid)
+
+        for window in windows:
+            window["segment_range"] = (window["segment_indices"][0], window["segment_indices"][-1] + 1)
+        for c, chapter in enumerate(chapters):
+            for i in range(*chapter["window_range"]):
+                windows[i]["chapter"] = c
+
+        return cls(segments, segment_vectors, windows, window_vectors, chapters,
+                   np.asarray(chapter_vectors), embedding_fn=embedding_fn)
+
+    def search(self, query=None, query_vector=None, n_results=3, n_chapters=2):
+        """
+        Coarse-to-fine search; hits are sorted by window score and carry:
+        text (window), start / end (best segment), window_start / window_end,
+        chapter, chapter_summary, score, segment_score and scored (#vectors compared)
+        """
+        if query_vector is None:
+            query_vector = self.embedding_fn([query])[0]
+        q = _normalize(query_vector)
+
+        chapter_ids = _top(self.chapter_vectors @ q, n_chapters)
+        scored = len(self.chapters)
+
+        window_ids = np.concatenate([np.arange(*self.chapters[c]["window_range"]) for c in chapter_ids])
+        window_scores = self.window_vectors[window_ids] @ q
+        scored += len(window_ids)
+
+        hits = []
+        for j in _top(window_scores, n_results):
+            window = self.windows[window_ids[j]]
+            first, last = window["segment_range"]
+            segment_scores = self.segment_vectors[first:last] @ q
+            scored += last - first
+            best = first + int(np.argmax(segment_scores))
+            segment = self.segments[best]
+            chapter = self.chapters[window["chapter"]]
+            hits.append({
+                "text": window["text"],
+                "start": segment["start"],
+                "end": segment["start"] + segment["duration"],
+                "segment": best,
+                "window_start": window["start"],
+                "window_end": window["end"],
+                "chapter": window["chapter"],
+                "chapter_summary": chapter["summary"],
+                "score": float(window_scores[j]),
+                "segment_score": float(segment_scores[best - first]),
+            })
+        for hit in hits:
+            hit["scored"] = scored
+        return hits
+
+    def stats(self):
+        return {"segments": len(self.segments), "windows": len(self.windows), "chapters": len(self.chapters)}
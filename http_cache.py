@@ -0,0 +1,261 @@
+"""
+Small on-disk HTTP cache for the proxies
+
+Each entry is two files named after the SHA-256 of its request key
+(the URL, plus anything the response varies on):
+- <key>.json: status, headers, stored_at, freshness lifetime, validators
+  and the name of the body file
+- <key>.<version>.body: the response body, written while it streams to the
+  client; a new version never overwrites the one an older meta points to
+
+Both are replaced with os.replace, so a reader always sees one consistent
+meta / body pair.
+
+Honors Cache-Control (no-store, private, no-cache, max-age, s-maxage),
+Expires, ETag and Last-Modified. Total size is bounded; oldest entries go first.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+
+def parse_cache_control(value):
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': True}"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, sep, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if sep else True
+    return directives
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def freshness_lifetime(headers):
+    """Seconds the response may be served without revalidation (0 = always revalidate)"""
+    cc = parse_cache_control(_header(headers, "cache-control"))
+    if "no-cache" in cc:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in cc:
+            try:
+                return max(0, int(cc[directive]))
+            except ValueError:
+                return 0
+    expires = _header(headers, "expires")
+    if expires:
+        try:
+            return max(0, int(parsedate_to_datetime(expires).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def is_cacheable(method, status, headers, authorized=False):
+    """
+    Only complete 200 GET responses that allow shared caching and can be reused or revalidated
+
+    authorized: the request carried an Authorization header. Such responses
+    are only shared when the origin says so (public, s-maxage or
+    must-revalidate, RFC 9111 section 3.5).
+    """
+    if method != "GET" or status != 200:
+        return False
+    cc = parse_cache_control(_header(headers, "cache-control"))
+    if "no-store" in cc or "private" in cc:
+        return False
+    if authorized and not ("public" in cc or "s-maxage" in cc or "must-revalidate" in cc):
+        return False
+    return freshness_lifetime(headers) > 0 or bool(_header(headers, "etag") or _header(headers, "last-modified"))
+
+
+def _write_json(path, data):
+    """Replace path atomically: readers see the old or the new file, never half of one"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class CacheEntry:
+    """
+    A cached response. The body file is opened at lookup, so it stays
+    readable even if a newer version replaces it before it is served.
+    """
+
+    def __init__(self, meta, body_path, body_file):
+        self.meta = meta
+        self.body_path = body_path
+        self._body_file = body_file
+
+    @property
+    def headers(self):
+        return [tuple(h) for h in self.meta["headers"]]
+
+    @property
+    def status(self):
+        return self.meta["status"]
+
+    @property
+    def size(self):
+        return self.meta["size"]
+
+    def is_fresh(self):
+        return time.time() - self.meta["stored_at"] < self.meta["lifetime"]
+
+    def validators(self):
+        """Headers for a conditional request"""
+        headers = {}
+        etag = _header(self.headers, "etag")
+        if etag:
+            headers["If-None-Match"] = etag
+        last_modified = _header(self.headers, "last-modified")
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def not_modified_for(self, if_none_match, if_modified_since):
+        """True if the client's own validators match this entry, so it can be sent a 304"""
+        if if_none_match:
+            etag = _header(self.headers, "etag")
+            if not etag:
+                return False
+            tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            return "*" in tags or etag.removeprefix("W/") in tags
+        last_modified = _header(self.headers, "last-modified")
+        if if_modified_since and last_modified:
+            try:
+                return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def iter_body(self, chunk_size=64 * 1024):
+        with self._body_file as f:
+            f.seek(0)
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+
+class CacheWriter:
+    """Streams a body to a temp file; commit() makes it visible, abort() throws it away"""
+
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.size = 0
+        self._tmp = cache.dir / f"{key}.{os.getpid()}.{id(self)}.tmp"
+        self._file = open(self._tmp, "wb")
+
+    def write(self, data):
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self._file.close()
+        self.meta["size"] = self.size
+        self.meta["body"] = f"{self.key}.{time.time_ns()}.body"
+        meta_path = self.cache.dir / f"{self.key}.json"
+        previous = self.cache.body_name(meta_path)
+        os.replace(self._tmp, self.cache.dir / self.meta["body"])
+        _write_json(meta_path, self.meta)
+        if previous and previous != self.meta["body"]:
+            (self.cache.dir / previous).unlink(missing_ok=True)
+        self.cache.evict()
+
+    def abort(self):
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class HttpCache:
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, stat):
+        """Increment a stats counter (called from every handler thread)"""
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def key(request_key):
+        return hashlib.sha256(request_key.encode("utf-8")).hexdigest()
+
+    def lookup(self, request_key):
+        key = self.key(request_key)
+        try:
+            with open(self.dir / f"{key}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        body_path = self.dir / meta.get("body", f"{key}.body")
+        try:
+            body_file = open(body_path, "rb")
+        except OSError:
+            return None
+        return CacheEntry(meta, body_path, body_file)
+
+    def body_name(self, meta_path):
+        """Body file the meta at meta_path points to (None if there is no readable meta)"""
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f).get("body", meta_path.with_suffix(".body").name)
+        except (OSError, ValueError):
+            return None
+
+    def writer(self, request_key, status, headers):
+        """CacheWriter for a cacheable response"""
+        meta = {
+            "request_key": request_key,
+            "status": status,
+            "headers": [list(h) for h in headers],
+            "stored_at": time.time(),
+            "lifetime": freshness_lifetime(headers),
+        }
+        self.count("stores")
+        return CacheWriter(self, self.key(request_key), meta)
+
+    def refresh(self, entry, headers_304):
+        """Apply a 304 response: update headers that changed and restart the freshness clock"""
+        updated = {k.lower(): (k, v) for k, v in entry.headers}
+        for k, v in headers_304:
+            if k.lower() in ("cache-control", "expires", "etag", "last-modified", "date"):
+                updated[k.lower()] = (k, v)
+        entry.meta["headers"] = [list(h) for h in updated.values()]
+        entry.meta["stored_at"] = time.time()
+        entry.meta["lifetime"] = freshness_lifetime(list(updated.values()))
+        _write_json(self.dir / f"{self.key(entry.meta['request_key'])}.json", entry.meta)
+
+    def evict(self):
+        """Drop oldest bodies until the cache fits in max_bytes"""
+        bodies = []
+        for path in self.dir.glob("*.body"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            bodies.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in bodies)
+        for _, size, path in sorted(bodies):
+            if total <= self.max_bytes:
+                break
+            meta_path = self.dir / f"{path.name.split('.', 1)[0]}.json"
+            if self.body_name(meta_path) == path.name:
+                meta_path.unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+            total -= size
@@ -4,11 +4,14 @@ from chromadb.utils import embedding_functions
 import os
 from groq import Groq
 
+import metrics
+from llm_gateway import get_gateway
+from chunking import chunk_transcript
+
 # LangChain imports
 from langchain_core.documents import Document
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
@@ -253,33 +256,24 @@ raw_data = [
 
 print("✅ Processing data into LangChain Documents...")
 
-chunks = []
 chunk_size = 3
 overlap = 1
-step = chunk_size - overlap
 
 langchain_docs = []
 
-for i in range(0, len(raw_data), step):
-    group = raw_data[i:i + chunk_size]
-    if len(group) < 2: continue
-    
-    # Create the text block
-    combined_text = ' '.join([t['text'] for t in group])
-    
-    # Calculate metadata
-    start_time = group[0]['start']
-    
-    # Create a LangChain Document object
-    doc = Document(
-        page_content=combined_text,
-        metadata={
-            "start": start_time,
-            "timestamp_str": format_timestamp(start_time),
-            "source": "video_transcript"
-        }
-    )
-    langchain_docs.append(doc)
+with metrics.span("chunking", segments=len(raw_data), chunk_size=chunk_size, overlap=overlap) as chunk_span:
+    for chunk in chunk_transcript(raw_data, chunk_size=chunk_size, overlap=overlap):
+        # Create a LangChain Document object
+        doc = Document(
+            page_content=chunk['text'],
+            metadata={
+                "start": chunk['start'],
+                "timestamp_str": format_timestamp(chunk['start']),
+                "source": "video_transcript"
+            }
+        )
+        langchain_docs.append(doc)
+    chunk_span.set(chunks=len(langchain_docs))
 
 # ==========================================
 # 3. INITIALIZE LANGCHAIN COMPONENTS
@@ -290,17 +284,20 @@ embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
 # B. Vector Store (Chroma)
 # This automatically handles embedding generation and storage
-vectorstore = Chroma.from_documents(
-    documents=langchain_docs,
-    embedding=embeddings,
-    collection_name="youtube_langchain"
-)
+# Embedding happens inside from_documents, so this span covers embedding + insert
+metrics.observe("embedding_batch_size", len(langchain_docs), model="all-MiniLM-L6-v2")
+with metrics.span("chroma.add", batch_size=len(langchain_docs), includes_embedding=True):
+    vectorstore = Chroma.from_documents(
+        documents=langchain_docs,
+        embedding=embeddings,
+        collection_name="youtube_langchain"
+    )
 
 # C. Retriever
 retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
 
-# D. LLM (Groq)
-llm = ChatGroq(
+# D. LLM (Groq, through the shared gateway: pooled connections, rate budgets, retries)
+llm = get_gateway().as_runnable(
     model="llama-3.1-8b-instant", # Smart model
     temperature=0
 )
@@ -334,7 +331,9 @@ query = "How to install Ubuntu?"
 
 print(f"\n🤖 Asking Groq via LangChain: '{query}'...\n")
 
-answer = rag_chain.invoke(query)
+# The callbacks count Groq tokens in/out when metrics are enabled
+with metrics.span("rag.invoke", k=3):
+    answer = rag_chain.invoke(query, config={"callbacks": metrics.langchain_callbacks()})
 
 # ==========================================
 # 6. DISPLAY RESULTS
@@ -344,9 +343,14 @@ print("📋 ANSWER:")
 print(answer)
 
 # Get the source documents
-source_docs = retriever.invoke(query)
+with metrics.span("chroma.query", k=3):
+    source_docs = retriever.invoke(query)
 print("\n🔍 SOURCE DOCUMENTS USED:")
 for i, doc in enumerate(source_docs):
     print(f"\n--- Source {i+1} ---")
     print(f"Timestamp: {doc.metadata.get('timestamp_str', 'N/A')}")
-    print(f"Content: {doc.page_content[:100]}...")
\ No newline at end of file
+    print(f"Content: {doc.page_content[:100]}...")
+
+if metrics.is_enabled():
+    print("\n📈 Pipeline timings:")
+    pprint.pprint(metrics.summary())
@@ -0,0 +1,332 @@
+"""
+Shared Groq gateway: one pooled async HTTP client, rate budgets, retries
+
+Every Groq call in the repo (app_demo.py, lang-chain.py, the CV agent) goes
+through one LLMGateway instead of building a Groq / ChatGroq client per call:
+- one httpx.AsyncClient (keep-alive connection pool) on a background event
+  loop, shared by sync callers on any thread and by async callers
+- request-per-minute and token-per-minute token buckets; a call reserves its
+  prompt estimate + max_tokens and is refunded from the reported usage
+- at most max_concurrency requests in flight
+- retries on 429 / 5xx / connection errors with full-jitter exponential
+  backoff, honouring Retry-After
+
+Sync:   get_gateway().complete("prompt")           -> str
+        get_gateway().chat(messages, max_tokens=1024) -> response JSON
+        get_gateway().chat_stream(messages, on_delta=print) -> response JSON
+Async:  await get_gateway().acomplete("prompt")
+LangChain: prompt | get_gateway().as_runnable(temperature=0) | parser
+
+Configuration (environment):
+    GROQ_API_KEY, GROQ_BASE_URL (default https://api.groq.com; point it at
+    benchmarks/fake_llm.py for local runs), LLM_RPM / LLM_TPM (default: the
+    Groq free tier for llama-3.1-8b-instant, 0 = unlimited), LLM_MAX_CONCURRENCY
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+
+import metrics
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+DEFAULT_BASE_URL = "https://api.groq.com"
+CHAT_PATH = "/openai/v1/chat/completions"
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+
+
+class LLMError(Exception):
+    """A Groq call that failed for good (non-retryable status or retries exhausted)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def estimate_tokens(text):
+    # Rough: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 per second up to capacity. Only touched from the
+    gateway's event loop, so it needs no lock. adjust() may leave it in debt.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount):
+        """Wait until `amount` is available and take it; returns seconds waited"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+            delay = (amount - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def adjust(self, delta):
+        """Charge (delta > 0) or refund (delta < 0) after the real cost is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LLMGateway:
+    """Pooled, rate-limited, retrying chat completions client (see module docstring)"""
+
+    def __init__(self, api_key=None, base_url=None, model=DEFAULT_MODEL, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_concurrency=8, max_retries=4, timeout=60.0, backoff=0.5, max_backoff=20.0):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.base_url = (base_url or os.getenv("GROQ_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.stats = {"requests": 0, "retries": 0, "errors": 0, "rate_wait_s": 0.0,
+                      "tokens_in": 0, "tokens_out": 0}
+
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    # ------------------------------------------
+    # Event loop and client
+    # ------------------------------------------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _get_client(self):
+        # Created on the gateway loop: the pool and semaphore belong to it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = self._client = None
+
+    # ------------------------------------------
+    # Requests
+    # ------------------------------------------
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        # Full jitter: spreads out clients that were throttled together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _read_stream(self, response, on_delta):
+        """Server-sent events -> the non-streaming response shape; on_delta gets each text delta"""
+        parts, usage, model, finish_reason = [], None, None, None
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model", model)
+                # Groq reports usage on the last chunk under x_groq, OpenAI-style servers at the top level
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+                    finish_reason = choice.get("finish_reason") or finish_reason
+        except httpx.TransportError as e:
+            # Deltas were already handed out, so the request is not retried
+            raise LLMError(f"stream interrupted: {type(e).__name__}: {e}")
+        finally:
+            await response.aclose()
+        return {
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)},
+                         "finish_reason": finish_reason}],
+            "usage": usage or {},
+        }
+
+    async def _chat(self, payload, on_delta=None):
+        client = self._get_client()
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in payload["messages"])
+        reserved = prompt_tokens + payload.get("max_tokens", 1024)
+
+        async with self._semaphore:
+            if self.tpm:
+                self.stats["rate_wait_s"] += await self.tpm.acquire(reserved)
+
+            for attempt in range(self.max_retries + 1):
+                # Every attempt is a request against Groq's RPM limit, retries included
+                if self.rpm:
+                    self.stats["rate_wait_s"] += await self.rpm.acquire(1)
+                response = None
+                try:
+                    if on_delta is None:
+                        response = await client.post(CHAT_PATH, json=payload)
+                    else:
+                        response = await client.send(client.build_request("POST", CHAT_PATH, json=payload),
+                                                     stream=True)
+                        if response.status_code != 200:
+                            await response.aread()
+                            await response.aclose()
+                except httpx.TransportError as e:
+                    error = LLMError(f"{type(e).__name__}: {e}")
+                else:
+                    if response.status_code == 200:
+                        break
+                    error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+                    if response.status_code not in RETRY_STATUSES:
+                        self.stats["errors"] += 1
+                        raise error
+                if attempt == self.max_retries:
+                    self.stats["errors"] += 1
+                    raise error
+                self.stats["retries"] += 1
+                metrics.incr("llm_retries", status=response.status_code if response is not None else "transport")
+                await asyncio.sleep(self._retry_delay(attempt, response))
+
+            # Still holding the semaphore: a stream occupies its slot until the last chunk
+            data = response.json() if on_delta is None else await self._read_stream(response, on_delta)
+        usage = data.get("usage") or {}
+        used = usage.get("total_tokens", reserved)
+        if self.tpm:
+            self.tpm.adjust(used - reserved)
+        self.stats["requests"] += 1
+        self.stats["tokens_in"] += usage.get("prompt_tokens", 0)
+        self.stats["tokens_out"] += usage.get("completion_tokens", 0)
+        metrics.record_llm_usage(data.get("model") or payload["model"], usage.get("prompt_tokens", 0),
+                                 usage.get("completion_tokens", 0))
+        return data
+
+    def _payload(self, messages, model=None, max_tokens=1024, **params):
+        return {"model": model or self.model, "messages": messages, "max_tokens": max_tokens,
+                **{key: value for key, value in params.items() if value is not None}}
+
+    def chat(self, messages, model=None, max_tokens=1024, **params):
+        """Blocking chat completion; returns the response JSON"""
+        payload = self._payload(messages, model, max_tokens, **params)
+        with metrics.span("llm.chat", model=payload["model"]):
+            return self._submit(self._chat(payload)).result()
+
+    async def achat(self, messages, model=None, max_tokens=1024, **params):
+        """Async chat completion, usable from any event loop"""
+        payload = self._payload(messages, model, max_tokens, **params)
+        with metrics.span("llm.chat", model=payload["model"]):
+            return await asyncio.wrap_future(self._submit(self._chat(payload)))
+
+    def chat_stream(self, messages, on_delta, model=None, max_tokens=1024, **params):
+        """
+        Blocking streamed chat completion: on_delta(text) is called with each
+        piece of the reply as it arrives (on the gateway thread, so keep it
+        cheap); returns the full response JSON like chat()
+        """
+        payload = self._payload(messages, model, max_tokens, stream=True, **params)
+        with metrics.span("llm.chat", model=payload["model"], stream=True):
+            return self._submit(self._chat(payload, on_delta)).result()
+
+    def complete(self, prompt, **kwargs):
+        """One user message in, reply text out"""
+        return self.chat([{"role": "user", "content": prompt}], **kwargs)["choices"][0]["message"]["content"]
+
+    async def acomplete(self, prompt, **kwargs):
+        data = await self.achat([{"role": "user", "content": prompt}], **kwargs)
+        return data["choices"][0]["message"]["content"]
+
+    # ------------------------------------------
+    # LangChain
+    # ------------------------------------------
+
+    def invoke_prompt(self, prompt_value, **kwargs):
+        """Run a LangChain prompt value (or plain string) and return the reply text"""
+        return self.chat(to_messages(prompt_value), **kwargs)["choices"][0]["message"]["content"]
+
+    async def ainvoke_prompt(self, prompt_value, **kwargs):
+        return (await self.achat(to_messages(prompt_value), **kwargs))["choices"][0]["message"]["content"]
+
+    def as_runnable(self, **kwargs):
+        """A LangChain runnable standing in for ChatGroq: prompt | runnable | parser"""
+        from langchain_core.runnables import RunnableLambda
+
+        async def ainvoke(prompt_value):
+            return await self.ainvoke_prompt(prompt_value, **kwargs)
+
+        return RunnableLambda(lambda prompt_value: self.invoke_prompt(prompt_value, **kwargs), afunc=ainvoke)
+
+
+def to_messages(prompt_value):
+    """LangChain prompt value / plain string -> OpenAI-style messages"""
+    if isinstance(prompt_value, str):
+        return [{"role": "user", "content": prompt_value}]
+    roles = {"human": "user", "ai": "assistant", "system": "system"}
+    return [{"role": roles.get(m.type, m.type), "content": m.content} for m in prompt_value.to_messages()]
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def get_gateway():
+    """Process-wide gateway configured from the environment"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(
+                rpm=_env_int("LLM_RPM", DEFAULT_RPM),
+                tpm=_env_int("LLM_TPM", DEFAULT_TPM),
+                max_concurrency=_env_int("LLM_MAX_CONCURRENCY", 8),
+            )
+        return _gateway
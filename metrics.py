@@ -0,0 +1,364 @@
+"""
+Lightweight tracing and metrics for the RAG / CV gap pipelines
+
+Records:
+- spans: named, nested timings (transcript fetch, chunking, embedding, Chroma add/query, LLM, search)
+- counters: e.g. LLM tokens in/out, requests
+- observations: e.g. batch sizes
+- collectors: callables polled at export time (cache hit counts that are already kept elsewhere)
+
+Disabled by default. When disabled, span() returns a shared no-op object and
+incr()/observe() return immediately, so instrumented code pays one function call.
+
+Enable with environment variables (exports are written at exit):
+    PIPELINE_METRICS=1 METRICS_TRACE_FILE=trace.json METRICS_PROM_FILE=metrics.prom python app.py
+or from code:
+    metrics.enable(trace_file="trace.json")
+
+The trace file uses the Chrome trace event format (open in chrome://tracing or
+https://ui.perfetto.dev); the Prometheus file is the text exposition format.
+
+Usage:
+    with metrics.span("chroma.query", n_results=4) as s:
+        results = collection.query(...)
+        s.set(hits=len(results["ids"][0]))
+    metrics.observe("embedding_batch_size", len(documents))
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from functools import lru_cache, wraps
+
+PREFIX = "pipeline"
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384)
+MAX_TRACE_EVENTS = 100_000
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_origin_ns = time.perf_counter_ns()
+
+_counters = {}      # (name, labels) -> value
+_histograms = {}    # (name, labels) -> Histogram
+_trace_events = []
+_collectors = []
+_exports = {"trace_file": None, "prom_file": None}
+
+
+# ==========================================
+# Recording
+# ==========================================
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start_ns", "parent")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+
+    def set(self, **attrs):
+        """Attach attributes known only once the work is done (hit counts, tokens, ...)"""
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        seconds = (end_ns - self.start_ns) / 1e9
+        key = (f"{PREFIX}_span_duration_seconds", _labels({"span": self.name}))
+        with _lock:
+            _histogram(key, DURATION_BUCKETS).add(seconds)
+            if exc_type is not None:
+                _add_counter((f"{PREFIX}_span_errors_total", _labels({"span": self.name})), 1)
+            if len(_trace_events) < MAX_TRACE_EVENTS:
+                args = dict(self.attrs)
+                if self.parent:
+                    args["parent"] = self.parent
+                _trace_events.append({
+                    "name": self.name,
+                    "ph": "X",
+                    "ts": (self.start_ns - _origin_ns) / 1000,
+                    "dur": (end_ns - self.start_ns) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                })
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _histogram(key, buckets):
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = Histogram(buckets)
+    return histogram
+
+
+def _add_counter(key, value):
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def span(name, **attrs):
+    """Context manager timing one unit of work"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator: run the function inside a span (named after the function by default)"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def incr(name, value=1, **labels):
+    """Add value to the counter <prefix>_<name>_total{labels}"""
+    if not _enabled:
+        return
+    with _lock:
+        _add_counter((f"{PREFIX}_{name}_total", _labels(labels)), value)
+
+
+def observe(name, value, **labels):
+    """Record a size-like value (batch size, document count) in a histogram"""
+    if not _enabled:
+        return
+    with _lock:
+        _histogram((f"{PREFIX}_{name}", _labels(labels)), SIZE_BUCKETS).add(value)
+
+
+def record_llm_usage(model, input_tokens, output_tokens):
+    """Count one LLM call and its tokens"""
+    if not _enabled:
+        return
+    with _lock:
+        _add_counter((f"{PREFIX}_llm_requests_total", _labels({"model": model})), 1)
+        _add_counter((f"{PREFIX}_llm_tokens_total", _labels({"model": model, "direction": "in"})), input_tokens or 0)
+        _add_counter((f"{PREFIX}_llm_tokens_total", _labels({"model": model, "direction": "out"})), output_tokens or 0)
+
+
+def record_groq_completion(completion):
+    """Token usage from a raw Groq chat completion"""
+    if not _enabled:
+        return
+    usage = getattr(completion, "usage", None)
+    record_llm_usage(getattr(completion, "model", "unknown"),
+                     getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+
+
+def langchain_callbacks():
+    """Callbacks for a LangChain invoke(config={"callbacks": ...}); empty when disabled"""
+    if not _enabled:
+        return []
+    return [_langchain_handler()]
+
+
+@lru_cache(maxsize=None)
+def _langchain_handler():
+    # Imported lazily so this module does not depend on LangChain
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class MetricsCallbackHandler(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            llm_output = response.llm_output or {}
+            usage = llm_output.get("token_usage") or {}
+            input_tokens, output_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+            if input_tokens is None:
+                # Fall back to the message's usage metadata
+                for generations in response.generations:
+                    for generation in generations:
+                        meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                        input_tokens = (input_tokens or 0) + meta.get("input_tokens", 0)
+                        output_tokens = (output_tokens or 0) + meta.get("output_tokens", 0)
+            record_llm_usage(llm_output.get("model_name", "unknown"), input_tokens, output_tokens)
+
+    return MetricsCallbackHandler()
+
+
+def register_collector(fn):
+    """fn() -> iterable of (name, labels dict, value, kind) read at export time; kind is 'counter' or 'gauge'"""
+    with _lock:
+        _collectors.append(fn)
+
+
+# ==========================================
+# Control
+# ==========================================
+
+def enable(trace_file=None, prom_file=None):
+    """Start recording; exports are written to the given files at exit (see dump())"""
+    global _enabled
+    _enabled = True
+    _exports["trace_file"] = trace_file or _exports["trace_file"]
+    _exports["prom_file"] = prom_file or _exports["prom_file"]
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Drop everything recorded so far (collectors stay registered)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _trace_events.clear()
+
+
+# ==========================================
+# Export
+# ==========================================
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def prometheus_text():
+    """Everything recorded so far in the Prometheus text exposition format"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in _histograms.items()}
+        collectors = list(_collectors)
+
+    gauges = {}
+    for collect in collectors:
+        for name, labels, value, kind in collect():
+            target = counters if kind == "counter" else gauges
+            suffix = "_total" if kind == "counter" else ""
+            target[(f"{PREFIX}_{name}{suffix}", _labels(labels))] = value
+
+    lines = []
+    for kind, series in (("counter", counters), ("gauge", gauges)):
+        seen = set()
+        for (name, labels), value in sorted(series.items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    seen = set()
+    for (name, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def trace_events():
+    with _lock:
+        return list(_trace_events)
+
+
+def summary():
+    """{span name: {count, total_s, mean_ms}} for quick printing"""
+    with _lock:
+        items = [(dict(labels)["span"], h.count, h.sum) for (name, labels), h in _histograms.items()
+                 if name == f"{PREFIX}_span_duration_seconds"]
+    return {
+        span_name: {"count": count, "total_s": round(total, 4), "mean_ms": round(total / count * 1000, 2)}
+        for span_name, count, total in sorted(items)
+    }
+
+
+def write_trace(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+
+
+def write_prometheus(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+
+
+def dump():
+    """Write the configured export files (no-op when disabled or none configured)"""
+    if not _enabled:
+        return
+    if _exports["trace_file"]:
+        write_trace(_exports["trace_file"])
+        print(f"📈 Trace written to {_exports['trace_file']}")
+    if _exports["prom_file"]:
+        write_prometheus(_exports["prom_file"])
+        print(f"📈 Metrics written to {_exports['prom_file']}")
+
+
+atexit.register(dump)
+
+if os.getenv("PIPELINE_METRICS", "").lower() in ("1", "true", "yes"):
+    enable(trace_file=os.getenv("METRICS_TRACE_FILE", "trace.json"), prom_file=os.getenv("METRICS_PROM_FILE"))
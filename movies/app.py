@@ -1,11 +1,17 @@
 import streamlit as st
-import pandas as pd
-import chromadb
-from chromadb.utils import embedding_functions
 from PIL import Image
 import requests
 from io import BytesIO
 import os
+import sys
+from pathlib import Path
+
+# Add repo root to path for the shared similarity and metrics helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import metrics
+from similarity import search
+from movies_index import load_movies, build_movies_collection
 
 # Set page config
 st.set_page_config(
@@ -24,39 +30,8 @@ st.markdown("Search for movies based on your description and find the best match
 @st.cache_resource
 def load_movies_db():
     """Load and initialize the movies database"""
-    # Read CSV
-    df = pd.read_csv("movies-1000.csv")
-    
-    # Create raw data
-    raw_data = []
-    for index, row in df.iterrows():
-        raw_data.append({
-            'title': row['title'],
-            'overview': row['overview'] if pd.notna(row['overview']) else '',
-            'poster_url': row.get('poster_url', '') if 'poster_url' in row.index else ''
-        })
-    
-    # Initialize ChromaDB
-    client = chromadb.Client()
-    
-    embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
-    )
-    
-    collection = client.create_collection(
-        name='movies',
-        embedding_function=embedding_fn
-    )
-    
-    # Add documents
-    collection.add(
-        documents=[c['overview'] for c in raw_data],
-        metadatas=[{
-            'title': c['title'],
-            'poster_url': c.get('poster_url', '')
-        } for c in raw_data],
-        ids=[f"movie_{i}" for i in range(len(raw_data))]
-    )
+    raw_data = load_movies("movies-1000.csv")
+    collection = build_movies_collection(raw_data)
     
     return collection, raw_data
 
@@ -97,6 +72,14 @@ with col2:
         max_value=5,
         value=3
     )
+    min_match = st.slider(
+        "Minimum match (%)",
+        min_value=0,
+        max_value=100,
+        value=30,
+        step=5,
+        help="Results below this similarity are dropped"
+    )
 
 # ==========================================
 # Search and Display Results
@@ -106,24 +89,26 @@ if user_query:
     st.markdown("---")
     
     # Search
-    with st.spinner("🔎 Searching for movies..."):
-        results = collection.query(
-            query_texts=[user_query],
-            n_results=num_results
+    # Hits under the minimum score are cut off before any card is rendered
+    with st.spinner("🔎 Searching for movies..."), metrics.span("chroma.query", n_results=num_results) as query_span:
+        hits = search(
+            collection,
+            user_query,
+            n_results=num_results,
+            min_score=min_match / 100
         )
+        query_span.set(hits=len(hits))
     
     # Display results
-    st.subheader(f"📽️ Top {num_results} Matches")
+    st.subheader(f"📽️ Top {len(hits)} Matches")
     
-    if results['documents'][0]:
+    if hits:
         # Create columns for results
-        cols = st.columns(min(num_results, 3))
+        cols = st.columns(min(len(hits), 3))
         
-        for idx, (doc, meta, distance) in enumerate(zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
-        )):
+        for idx, hit in enumerate(hits):
+            doc = hit['document']
+            meta = hit['metadata']
             col = cols[idx % len(cols)]
             
             with col:
@@ -146,8 +131,8 @@ if user_query:
                 # Movie details
                 st.markdown(f"**Title:** {meta['title']}")
                 
-                # Similarity score (inverted - lower distance = higher match)
-                match_percentage = max(0, (1 - distance) * 100)
+                # Similarity score normalized for the collection's distance space
+                match_percentage = hit['score'] * 100
                 st.markdown(f"**Match Score:** {match_percentage:.1f}%")
                 
                 # Overview
@@ -156,7 +141,7 @@ if user_query:
                 
                 st.markdown("</div>", unsafe_allow_html=True)
     else:
-        st.error("❌ No movies found. Try a different description!")
+        st.error("❌ No movies found above the minimum match. Try a different description or lower the threshold!")
 
 else:
     # Show welcome message
@@ -175,6 +160,12 @@ else:
     - "Science fiction with robots"
     """)
 
+# Pipeline metrics (run with PIPELINE_METRICS=1)
+if metrics.is_enabled():
+    with st.expander("📈 Pipeline metrics"):
+        st.json(metrics.summary())
+        st.code(metrics.prometheus_text(), language="text")
+
 # ==========================================
 # Footer
 # ==========================================
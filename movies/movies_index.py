@@ -0,0 +1,64 @@
+"""
+Build the movies Chroma collection (used by app.py and the benchmarks)
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import chromadb
+from chromadb.utils import embedding_functions
+
+# Repo root holds the shared metrics and vector_index modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import metrics
+from vector_index import create_collection
+
+MOVIES_CSV = Path(__file__).parent / "movies-1000.csv"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def load_movies(csv_path=MOVIES_CSV):
+    """Read the CSV into [{'title', 'overview', 'poster_url'}, ...]"""
+    with metrics.span("movies.load_csv"):
+        df = pd.read_csv(csv_path)
+
+    raw_data = []
+    for index, row in df.iterrows():
+        raw_data.append({
+            'title': row['title'],
+            'overview': row['overview'] if pd.notna(row['overview']) else '',
+            'poster_url': row.get('poster_url', '') if 'poster_url' in row.index else ''
+        })
+    return raw_data
+
+
+def build_movies_collection(raw_data, client=None, name="movies", embedding_fn=None):
+    """Embed every overview and add it to a new collection"""
+    client = client or chromadb.Client()
+    embedding_fn = embedding_fn or embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=EMBEDDING_MODEL
+    )
+
+    # Explicit cosine space: movies/app.py reads scores as cosine similarity
+    collection = create_collection(client, name, embedding_function=embedding_fn)
+
+    # Embed up front so embedding and Chroma insert time are measured separately
+    documents = [c['overview'] for c in raw_data]
+    metrics.observe("embedding_batch_size", len(documents), model=EMBEDDING_MODEL)
+    with metrics.span("embedding", batch_size=len(documents)):
+        embeddings = embedding_fn(documents)
+
+    # Add documents
+    with metrics.span("chroma.add", batch_size=len(documents)):
+        collection.add(
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=[{
+                'title': c['title'],
+                'poster_url': c.get('poster_url', '')
+            } for c in raw_data],
+            ids=[f"movie_{i}" for i in range(len(raw_data))]
+        )
+
+    return collection
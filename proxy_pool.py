@@ -0,0 +1,266 @@
+"""
+Rotating proxy pool for bulk transcript fetching
+
+- picks a proxy per request: round-robin, or least in-flight requests
+- tracks per-proxy success rate and latency
+- quarantines a proxy that YouTube blocks or that can't be reached; the
+  cooldown doubles on every consecutive strike (30s, 60s, 120s, ... up to
+  15 min). After the cooldown the proxy gets one trial request: success
+  restores it, another strike re-quarantines it
+- keeps one connection-pooled requests.Session per proxy, shared by all callers
+
+Proxies come from PROXY_POOL (comma-separated URLs), defaulting to the local
+Docker/Python proxy at http://127.0.0.1:8888:
+    export PROXY_POOL=http://10.0.0.2:3128,http://10.0.0.3:3128
+
+Usage:
+    pool = ProxyPool.from_env()
+    transcript = pool.call(lambda proxy: fetch(video_id, proxy))
+    pool.print_stats()
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_PROXY = "http://127.0.0.1:8888"
+BASE_COOLDOWN = 30.0
+MAX_COOLDOWN = 15 * 60.0
+LATENCY_WINDOW = 100
+
+
+class NoHealthyProxy(Exception):
+    """Every proxy in the pool is quarantined"""
+
+
+def is_blocked_error(error) -> bool:
+    """YouTube refused the request because of the IP (RequestBlocked / IpBlocked / HTTP 429)"""
+    if any(cls.__name__ in ("RequestBlocked", "IpBlocked") for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return "blocking" in str(error).lower()
+
+
+def is_proxy_down_error(error) -> bool:
+    """The proxy itself failed (refused / dropped the connection, connect timeout), anywhere in the cause chain"""
+    while error is not None:
+        if isinstance(error, (requests.exceptions.ProxyError, requests.exceptions.ConnectionError,
+                              requests.exceptions.ConnectTimeout)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class Proxy:
+    """One upstream proxy and its health counters (guarded by the pool lock)"""
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.blocks = 0
+        self.strikes = 0  # consecutive blocks / connection failures, drives the cooldown
+        self.quarantined_until = 0.0
+        self.trial = False  # a post-cooldown trial request is in flight
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def requests(self):
+        return self.successes + self.failures + self.blocks
+
+    @property
+    def success_rate(self):
+        return self.successes / self.requests if self.requests else None
+
+    def available(self, now):
+        return now >= self.quarantined_until and not self.trial
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "requests": self.requests,
+            "success_rate": round(self.success_rate, 3) if self.success_rate is not None else None,
+            "blocks": self.blocks,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            "quarantined_for_s": round(self.quarantined_until - now, 1) if self.quarantined_until > now else 0,
+        }
+
+    def __repr__(self):
+        return f"Proxy({self.url!r})"
+
+
+class ProxyPool:
+    def __init__(self, urls, strategy="least_load", base_cooldown=BASE_COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, connections_per_proxy=16, verbose=True):
+        if not urls:
+            raise ValueError("ProxyPool needs at least one proxy URL")
+        if strategy not in ("round_robin", "least_load"):
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self.proxies = [Proxy(url) for url in urls]
+        self.strategy = strategy
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.connections_per_proxy = connections_per_proxy
+        self.verbose = verbose
+        self._rotation = itertools.cycle(range(len(self.proxies)))
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        urls = [u.strip() for u in os.getenv("PROXY_POOL", DEFAULT_PROXY).split(",") if u.strip()]
+        return cls(urls, **kwargs)
+
+    # ==========================================
+    # Selection
+    # ==========================================
+
+    def acquire(self) -> Proxy:
+        """Reserve a proxy for one request; raises NoHealthyProxy if all are cooling down"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [p for p in self.proxies if p.available(now)]
+            if not candidates:
+                raise NoHealthyProxy(f"all {len(self.proxies)} proxies quarantined, next retry in {self.next_available_in():.0f}s")
+
+            if self.strategy == "round_robin":
+                for _ in range(len(self.proxies)):
+                    proxy = self.proxies[next(self._rotation)]
+                    if proxy in candidates:
+                        break
+            else:
+                proxy = min(candidates, key=lambda p: (p.in_flight, -(p.success_rate or 0)))
+
+            # Back from quarantine: allow a single trial request until it reports back
+            if proxy.strikes:
+                proxy.trial = True
+            proxy.in_flight += 1
+            return proxy
+
+    def release(self, proxy, latency, ok=True, blocked=False, down=False):
+        """Record the outcome of a request made through proxy (down: the proxy itself failed)"""
+        with self._lock:
+            proxy.in_flight -= 1
+            proxy.trial = False
+            if blocked or down:
+                if blocked:
+                    proxy.blocks += 1
+                else:
+                    proxy.failures += 1
+                cooldown = min(self.base_cooldown * 2 ** proxy.strikes, self.max_cooldown)
+                proxy.strikes += 1
+                proxy.quarantined_until = time.monotonic() + cooldown
+                if self.verbose:
+                    reason = "blocked" if blocked else "unreachable"
+                    print(f"🚫 Proxy {proxy.url} {reason}, quarantined for {cooldown:.0f}s")
+            elif ok:
+                proxy.successes += 1
+                proxy.strikes = 0
+                proxy.latencies.append(latency)
+            else:
+                proxy.failures += 1
+
+    def next_available_in(self) -> float:
+        now = time.monotonic()
+        return max(0.0, min(p.quarantined_until for p in self.proxies) - now)
+
+    # ==========================================
+    # Requests
+    # ==========================================
+
+    def session(self, proxy) -> requests.Session:
+        """Shared keep-alive session routed through proxy"""
+        with self._lock:
+            session = self._sessions.get(proxy.url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.connections_per_proxy)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.proxies = {"http": proxy.url, "https": proxy.url}
+                self._sessions[proxy.url] = session
+            return session
+
+    def call(self, fn, max_attempts=None, is_blocked=is_blocked_error, is_down=is_proxy_down_error, wait=False):
+        """
+        Run fn(proxy), moving to another proxy when one is blocked or unreachable
+
+        Other errors are recorded against the proxy and re-raised. With wait=True,
+        sleeps until a proxy leaves quarantine instead of raising NoHealthyProxy.
+        """
+        attempts = max_attempts or len(self.proxies)
+        last_error = None
+        for _ in range(attempts):
+            proxy = None
+            while proxy is None:
+                try:
+                    proxy = self.acquire()
+                except NoHealthyProxy:
+                    if not wait:
+                        if last_error is not None:
+                            raise last_error
+                        raise
+                    # A trial request may still be in flight, so poll at least every 50 ms
+                    time.sleep(max(self.next_available_in(), 0.05))
+
+            start = time.perf_counter()
+            try:
+                result = fn(proxy)
+            except Exception as e:
+                blocked = is_blocked(e)
+                down = not blocked and is_down(e)
+                self.release(proxy, time.perf_counter() - start, ok=False, blocked=blocked, down=down)
+                if not (blocked or down):
+                    raise
+                last_error = e
+                continue
+            self.release(proxy, time.perf_counter() - start)
+            return result
+        raise last_error
+
+    def check(self, url, timeout=5.0):
+        """Active health check: GET url through every proxy and record the outcome"""
+        results = {}
+        for proxy in self.proxies:
+            with self._lock:
+                proxy.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = self.session(proxy).get(url, timeout=timeout)
+                blocked, down = response.status_code == 429, False
+                ok = response.ok
+            except requests.RequestException as e:
+                blocked, down, ok = False, is_proxy_down_error(e), False
+            self.release(proxy, time.perf_counter() - start, ok=ok, blocked=blocked, down=down)
+            results[proxy.url] = "blocked" if blocked else "ok" if ok else "down" if down else "error"
+        return results
+
+    def stats(self):
+        with self._lock:
+            return [p.stats() for p in self.proxies]
+
+    def print_stats(self):
+        print("\n📊 Proxy pool:")
+        for s in self.stats():
+            rate = f"{s['success_rate']:.0%}" if s["success_rate"] is not None else "-"
+            state = f"quarantined {s['quarantined_for_s']:.0f}s" if s["quarantined_for_s"] else "healthy"
+            print(f"   {s['url']}: {s['requests']} requests, {rate} ok, {s['blocks']} blocked, "
+                  f"p50 {s['p50_ms']} ms ({state})")
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
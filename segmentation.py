@@ -0,0 +1,146 @@
+"""
+Semantic transcript segmentation: merge segments into topic-aligned chunks
+
+Fixed windows (chunking.chunk_transcript) glue together a 2-second fragment
+and a 17-second monologue alike and cut mid-topic. Here consecutive segments
+are merged until a chunk reaches a token budget, and cuts are placed on the
+strongest nearby boundary:
+- pause:  silence between two segments (next start - previous end)
+- topic:  1 - cosine similarity of adjacent segment embeddings
+
+Both signals for a whole block of segments come from one batched embedding
+call and a few numpy operations. Input is consumed in blocks and chunks are
+yielded as soon as they close, so a 10-hour transcript never needs to be held
+(or embedded) at once.
+
+Chunks have the same fields as chunk_transcript(): text, start, end,
+duration, segment_indices.
+"""
+import numpy as np
+
+DEFAULT_TARGET_TOKENS = 80
+DEFAULT_MIN_TOKENS = 40
+DEFAULT_MAX_TOKENS = 128  # all-MiniLM-L6-v2 truncates at 256 word pieces
+DEFAULT_PAUSE_GAP = 2.0  # seconds of silence that count as a full boundary
+DEFAULT_BOUNDARY = 0.5  # boundary strength that ends a chunk once it has min_tokens
+BLOCK_SIZE = 256
+
+
+def count_tokens(text):
+    # Rough: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+def boundary_strengths(segments, embeddings=None, pause_gap=DEFAULT_PAUSE_GAP, pause_weight=0.5):
+    """
+    Strength (0-1) of the boundary after each segment, in one vectorized pass
+
+    The last value has no following segment and is 0. Without embeddings only
+    pauses are used.
+    """
+    starts = np.fromiter((s["start"] for s in segments), dtype=np.float64, count=len(segments))
+    ends = starts + np.fromiter((s["duration"] for s in segments), dtype=np.float64, count=len(segments))
+    strengths = np.zeros(len(segments))
+    if len(segments) < 2:
+        return strengths
+
+    pauses = np.clip((starts[1:] - ends[:-1]) / pause_gap, 0.0, 1.0)
+    if embeddings is None:
+        strengths[:-1] = pauses
+        return strengths
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    topic = np.clip(1.0 - np.einsum("ij,ij->i", vectors[:-1], vectors[1:]), 0.0, 1.0)
+    strengths[:-1] = pause_weight * pauses + (1.0 - pause_weight) * topic
+    return strengths
+
+
+def _make_chunk(segments, first_index):
+    end = segments[-1]["start"] + segments[-1]["duration"]
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "start": segments[0]["start"],
+        "end": end,
+        "duration": end - segments[0]["start"],
+        "segment_indices": list(range(first_index, first_index + len(segments))),
+    }
+
+
+def cut_threshold(tokens, target_tokens, min_tokens, max_tokens, boundary):
+    """
+    Boundary strength needed to end a chunk of `tokens` tokens: never below
+    min_tokens, `boundary` up to target_tokens, then falling linearly to 0 at
+    max_tokens so chunks cluster around the target but still end on the
+    strongest boundary available
+    """
+    if tokens < min_tokens:
+        return float("inf")
+    if tokens <= target_tokens:
+        return boundary
+    return boundary * max(0.0, (max_tokens - tokens) / max(max_tokens - target_tokens, 1))
+
+
+def _blocks(segments, block_size):
+    block = []
+    for segment in segments:
+        block.append(segment)
+        if len(block) == block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def iter_segments(segments, embedding_fn=None, target_tokens=DEFAULT_TARGET_TOKENS, min_tokens=DEFAULT_MIN_TOKENS,
+                  max_tokens=DEFAULT_MAX_TOKENS, pause_gap=DEFAULT_PAUSE_GAP, boundary=DEFAULT_BOUNDARY,
+                  block_size=BLOCK_SIZE, embeddings=None):
+    """
+    Stream chunks from an iterable of {'text', 'start', 'duration'} segments
+
+    A chunk closes after a segment when adding the next one would exceed
+    max_tokens, or when the boundary after it reaches cut_threshold().
+    Segments are embedded block_size at a time (one embedding_fn call each),
+    unless their embeddings are passed in (row i belongs to segment i).
+    """
+    current, current_tokens, first_index = [], 0, 0
+    # The last segment of a block is decided once the next block gives its boundary
+    carry_segment, carry_vector = None, None
+    offset = 0
+
+    for block in _blocks(segments, block_size):
+        if embeddings is not None:
+            vectors = np.asarray(embeddings[offset:offset + len(block)], dtype=np.float32)
+        elif embedding_fn is not None:
+            vectors = np.asarray(embedding_fn([s["text"] for s in block]), dtype=np.float32)
+        else:
+            vectors = None
+        offset += len(block)
+        window = block if carry_segment is None else [carry_segment] + block
+        window_vectors = vectors
+        if vectors is not None and carry_vector is not None:
+            window_vectors = np.vstack([carry_vector[None, :], vectors])
+        strengths = boundary_strengths(window, window_vectors, pause_gap=pause_gap)
+        tokens = [count_tokens(s["text"]) for s in window]
+
+        for i in range(len(window) - 1):
+            current.append(window[i])
+            current_tokens += tokens[i]
+            needed = cut_threshold(current_tokens, target_tokens, min_tokens, max_tokens, boundary)
+            if current_tokens + tokens[i + 1] > max_tokens or strengths[i] >= needed:
+                yield _make_chunk(current, first_index)
+                first_index += len(current)
+                current, current_tokens = [], 0
+
+        carry_segment = window[-1]
+        carry_vector = vectors[-1] if vectors is not None else None
+
+    if carry_segment is not None:
+        current.append(carry_segment)
+    if current:
+        yield _make_chunk(current, first_index)
+
+
+def segment_transcript(segments, embedding_fn=None, **kwargs):
+    """List version of iter_segments (same keyword arguments)"""
+    return list(iter_segments(segments, embedding_fn=embedding_fn, **kwargs))
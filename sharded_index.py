@@ -0,0 +1,294 @@
+"""
+Sharded transcript index: chunks partitioned by video ID over N Chroma collections
+
+- Placement: rendezvous (highest random weight) hashing of the video ID, so
+  every chunk of a video lives on one shard and adding a shard only moves
+  the ~1/(N+1) of videos that now hash to it (no full rebuild)
+- Queries: the query is embedded once, sent to every shard in parallel on a
+  thread pool, and the per-shard top-k lists (already sorted by distance) are
+  merged with a heap
+- Results have the same shape as collection.query(), so similarity.py's
+  iter_scored_results / search helpers work unchanged
+
+Shards are collections named <name>_shard_<i> on one client, or with
+persist_dir one PersistentClient directory per shard (smaller graphs to build
+and load, and shards can be moved independently).
+
+Sharding is for index size, not single-query latency: each shard adds
+Chroma's per-query overhead, so with few cores a query over 16 shards is
+slower than over one (see GROQ_SETUP.md).
+
+Usage:
+    index = ShardedIndex("youtube", n_shards=4, embedding_function=embedding_fn)
+    index.add(ids, documents, metadatas)          # metadatas need a 'video_id'
+    results = index.query(query_texts=["How to install Ubuntu?"], n_results=3)
+    index.add_shard()
+"""
+import hashlib
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import chromadb
+from chromadb.errors import InternalError
+
+from vector_index import create_collection
+
+SHARD_KEY = "video_id"
+# Chunks read / added / deleted per step when rebalancing (Chroma caps a batch at ~5461 rows,
+# and it bounds the memory a move needs)
+MOVE_BATCH_SIZE = 5000
+
+
+def shard_weight(shard_name, key):
+    """Rendezvous hashing weight: the shard with the highest weight owns the key"""
+    digest = hashlib.blake2b(f"{shard_name}\x00{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def owner(shard_names, key):
+    return max(shard_names, key=lambda name: shard_weight(name, key))
+
+
+class ShardedIndex:
+    """N collections queried as one (see module docstring)"""
+
+    def __init__(self, name="youtube", n_shards=4, client=None, persist_dir=None, embedding_function=None,
+                 max_workers=None, **index_params):
+        self.name = name
+        self.client = client
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.embedding_function = embedding_function
+        self.index_params = index_params
+        self.shards = {}  # shard name -> collection; replaced, never mutated, once queries can run
+        self._videos = {}  # shard name -> video IDs on it (read from the shard once, then kept up to date)
+        self._lock = threading.Lock()
+        self._resize_lock = threading.Lock()  # one add_shard at a time; delete_video waits for it
+        # Queries in flight per epoch: add_shard waits for older ones before deleting moved chunks
+        self._epoch = 0
+        self._queries = {}
+        self._queries_done = threading.Condition(self._lock)
+        if self.persist_dir is None and self.client is None:
+            self.client = chromadb.Client()
+
+        existing = self._existing_shards()
+        for shard_name in existing or [self._shard_name(i) for i in range(n_shards)]:
+            self.shards[shard_name] = self._open(shard_name)
+            if not existing:
+                self._videos[shard_name] = set()
+        self._max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=self._pool_size(), thread_name_prefix="shard")
+
+    # ------------------------------------------
+    # Shards
+    # ------------------------------------------
+
+    def _shard_name(self, i):
+        return f"{self.name}_shard_{i:03d}"
+
+    def _existing_shards(self):
+        """Shards left by an earlier run (on the client, or under persist_dir)"""
+        if self.persist_dir is not None:
+            if not self.persist_dir.exists():
+                return []
+            return sorted(p.name for p in self.persist_dir.iterdir() if p.name.startswith(f"{self.name}_shard_"))
+        names = [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+        return sorted(n for n in names if n.startswith(f"{self.name}_shard_"))
+
+    def _open(self, shard_name):
+        client = self.client
+        if self.persist_dir is not None:
+            client = chromadb.PersistentClient(path=str(self.persist_dir / shard_name))
+        # No embedding function on the shards: the index embeds once for all of them
+        return create_collection(client, shard_name, get_or_create=True, **self.index_params)
+
+    def _pool_size(self):
+        return self._max_workers or max(len(self.shards), os.cpu_count() or 1)
+
+    def _videos_on(self, shard_name):
+        """Video IDs stored on a shard; only the first call reads the shard's metadata"""
+        with self._lock:
+            videos = self._videos.get(shard_name)
+        if videos is None:
+            existing = self.shards[shard_name].get(include=["metadatas"])
+            videos = {meta[SHARD_KEY] for meta in existing["metadatas"]}
+            with self._lock:
+                videos = self._videos.setdefault(shard_name, videos)
+        return videos
+
+    def add_shard(self):
+        """
+        Add one shard and move over only the videos that now hash to it
+
+        Safe while queries and adds run. The shard is registered first, so
+        new chunks of the moving videos go straight to it. Videos are looked
+        up in the per-shard registry instead of rescanning every shard's
+        metadata, and copied in pages of MOVE_BATCH_SIZE, so memory stays
+        bounded. The old copies are deleted only once every query that
+        started before the copy finished is done; until then queries return
+        a chunk found on two shards once, and count() includes it twice.
+        Returns the number of chunks moved.
+        """
+        with self._resize_lock:
+            new_name = self._shard_name(len(self.shards))
+            new_shard = self._open(new_name)
+            with self._lock:
+                self._videos[new_name] = set()
+                old_shards = self.shards
+                self.shards = {**old_shards, new_name: new_shard}
+                # Every shard needs its own worker or the extra shards' queries wait in line.
+                # The old pool is not shut down: queries already mapping on it finish there,
+                # and its threads exit once it is garbage collected.
+                if self._pool_size() > self.pool._max_workers:
+                    self.pool = ThreadPoolExecutor(max_workers=self._pool_size(), thread_name_prefix="shard")
+            names = list(self.shards)
+
+            copied = {}  # shard name -> (movers, chunk ids copied off it)
+            for shard_name, collection in old_shards.items():
+                videos = self._videos_on(shard_name)
+                with self._lock:
+                    movers = [video_id for video_id in videos if owner(names, video_id) == new_name]
+                if not movers:
+                    continue
+                ids = []
+                while True:
+                    page = collection.get(where={SHARD_KEY: {"$in": movers}}, limit=MOVE_BATCH_SIZE,
+                                          offset=len(ids), include=["embeddings", "documents", "metadatas"])
+                    if not page["ids"]:
+                        break
+                    new_shard.add(ids=page["ids"], embeddings=page["embeddings"],
+                                  documents=page["documents"], metadatas=page["metadatas"])
+                    with self._lock:
+                        self._videos[new_name].update(meta[SHARD_KEY] for meta in page["metadatas"])
+                    ids += page["ids"]
+                copied[shard_name] = (movers, ids)
+
+            # A query that read the new shard before a page was copied may still be
+            # about to read the old one: let those finish before deleting
+            with self._lock:
+                self._epoch += 1
+                cutoff = self._epoch
+                self._queries_done.wait_for(lambda: all(epoch >= cutoff for epoch in self._queries))
+            for shard_name, (movers, ids) in copied.items():
+                for i in range(0, len(ids), MOVE_BATCH_SIZE):
+                    old_shards[shard_name].delete(ids=ids[i:i + MOVE_BATCH_SIZE])
+                with self._lock:
+                    self._videos[shard_name].difference_update(movers)
+            return sum(len(ids) for _, ids in copied.values())
+
+    # ------------------------------------------
+    # Writes
+    # ------------------------------------------
+
+    def _embed(self, texts):
+        if self.embedding_function is None:
+            raise ValueError("No embedding_function: pass embeddings / query_embeddings instead")
+        return self.embedding_function(texts)
+
+    def add(self, ids, metadatas, documents=None, embeddings=None):
+        """Add chunks; each metadata dict must carry the video_id used for placement"""
+        if embeddings is None:
+            embeddings = self._embed(documents)
+        shards = self.shards
+        names = list(shards)
+
+        batches = {}
+        for i, meta in enumerate(metadatas):
+            batches.setdefault(owner(names, meta[SHARD_KEY]), []).append(i)
+
+        def add_batch(item):
+            shard_name, rows = item
+            shards[shard_name].add(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+                documents=[documents[i] for i in rows] if documents is not None else None,
+            )
+            with self._lock:
+                # Registries not read yet will see these rows when they are
+                videos = self._videos.get(shard_name)
+                if videos is not None:
+                    videos.update(metadatas[i][SHARD_KEY] for i in rows)
+        list(self.pool.map(add_batch, batches.items()))
+
+    def delete_video(self, video_id):
+        # Waits for a running add_shard, which could otherwise copy the video back
+        with self._resize_lock:
+            shard_name = owner(list(self.shards), video_id)
+            self.shards[shard_name].delete(where={SHARD_KEY: video_id})
+            with self._lock:
+                self._videos.get(shard_name, set()).discard(video_id)
+
+    # ------------------------------------------
+    # Reads
+    # ------------------------------------------
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=3, where=None,
+              include=("documents", "metadatas", "distances")):
+        """Scatter to every shard, gather the global top n_results per query"""
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        include = list(include)
+        shard_include = include if "distances" in include else include + ["distances"]
+
+        def query_shard(collection):
+            # Chroma returns fewer hits (or none) when a shard holds fewer than n_results
+            kwargs = {"query_embeddings": query_embeddings, "include": shard_include, "n_results": n_results}
+            if where:
+                kwargs["where"] = where
+            try:
+                return collection.query(**kwargs)
+            except InternalError:
+                # Chroma can fail a query that races a delete on the same collection
+                # ("Error finding id"); by the retry the delete has finished
+                return collection.query(**kwargs)
+
+        with self._lock:
+            epoch = self._epoch
+            self._queries[epoch] = self._queries.get(epoch, 0) + 1
+        try:
+            partials = list(self.pool.map(query_shard, list(self.shards.values())))
+        finally:
+            with self._lock:
+                self._queries[epoch] -= 1
+                if not self._queries[epoch]:
+                    del self._queries[epoch]
+                    self._queries_done.notify_all()
+
+        merged = {"ids": []}
+        for field in include:
+            merged[field] = []
+        for q in range(len(query_embeddings)):
+            # Each shard's hits are sorted by distance: a k-way heap merge keeps that order
+            streams = [
+                zip(part["distances"][q], part["ids"][q],
+                    *((part[field][q] for field in include if field != "distances")))
+                for part in partials
+            ]
+            # A chunk being moved by add_shard can come back from two shards: keep it once
+            top, seen = [], set()
+            for hit in heapq.merge(*streams, key=lambda hit: hit[0]):
+                if len(top) == n_results:
+                    break
+                if hit[1] not in seen:
+                    seen.add(hit[1])
+                    top.append(hit)
+            merged["ids"].append([hit[1] for hit in top])
+            other = [field for field in include if field != "distances"]
+            for j, field in enumerate(other):
+                merged[field].append([hit[2 + j] for hit in top])
+            if "distances" in include:
+                merged["distances"].append([hit[0] for hit in top])
+        return merged
+
+    def count(self):
+        return sum(collection.count() for collection in self.shards.values())
+
+    def stats(self):
+        """Chunks per shard"""
+        return {shard_name: collection.count() for shard_name, collection in self.shards.items()}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,212 @@
+"""
+Similarity helpers shared by the YouTube RAG scripts and the movies app.
+
+Chroma returns raw distances whose meaning depends on the collection's
+distance space ("l2", "cosine" or "ip"). These helpers turn them into a
+normalized 0-1 similarity score and let a search stop as soon as results
+drop below a minimum score.
+
+Calibrate a threshold from labelled pairs:
+    python similarity.py labels.jsonl --space l2
+"""
+import argparse
+import json
+import sys
+
+# Default cut-offs on the normalized score (cosine similarity).
+# They match the old 0.5 / 0.7 squared-L2 distance cut-offs used in app.py
+# for unit-length MiniLM embeddings: cos = 1 - d / 2.
+GOOD_MATCH_SCORE = 0.75
+WEAK_MATCH_SCORE = 0.65
+
+DISTANCE_SPACES = ("l2", "cosine", "ip")
+
+
+def get_distance_space(collection) -> str:
+    """Return the distance space ("l2", "cosine" or "ip") of a Chroma collection"""
+    configuration = getattr(collection, "configuration", None) or {}
+    if isinstance(configuration, dict):
+        for index_type in ("hnsw", "spann"):
+            index_config = configuration.get(index_type) or {}
+            space = index_config.get("space") if isinstance(index_config, dict) else None
+            if space:
+                return space
+
+    metadata = getattr(collection, "metadata", None) or {}
+    return metadata.get("hnsw:space", "l2")
+
+
+def distance_to_similarity(distance: float, space: str = "l2") -> float:
+    """
+    Convert a Chroma distance into a similarity score between 0 and 1
+
+    Assumes unit-length embeddings (all-MiniLM-L6-v2 output is normalized):
+    - l2:     Chroma reports the squared L2 distance, so cos = 1 - d / 2
+    - cosine: d = 1 - cos
+    - ip:     d = 1 - dot product
+    """
+    if space == "l2":
+        score = 1.0 - distance / 2.0
+    elif space in ("cosine", "ip"):
+        score = 1.0 - distance
+    else:
+        raise ValueError(f"Unknown distance space: {space}")
+    return min(1.0, max(0.0, score))
+
+
+def similarity_to_distance(score: float, space: str = "l2") -> float:
+    """Inverse of distance_to_similarity (useful to turn a score cut-off into a distance cut-off)"""
+    if space == "l2":
+        return (1.0 - score) * 2.0
+    if space in ("cosine", "ip"):
+        return 1.0 - score
+    raise ValueError(f"Unknown distance space: {space}")
+
+
+def iter_scored_results(results, space: str = "l2", min_score: float = 0.0, query_index: int = 0):
+    """
+    Yield hits of a Chroma query result as dicts with a normalized 'score'
+
+    Chroma returns hits sorted by ascending distance, so the first hit under
+    min_score ends the iteration: nothing after it is ever built or rendered.
+    """
+    ids = results['ids'][query_index]
+    documents = (results.get('documents') or [[]] * (query_index + 1))[query_index] or [None] * len(ids)
+    metadatas = (results.get('metadatas') or [[]] * (query_index + 1))[query_index] or [{}] * len(ids)
+    distances = results['distances'][query_index]
+
+    for rank, (hit_id, doc, meta, distance) in enumerate(zip(ids, documents, metadatas, distances)):
+        score = distance_to_similarity(distance, space)
+        if score < min_score:
+            break
+        yield {
+            'rank': rank,
+            'id': hit_id,
+            'document': doc,
+            'metadata': meta or {},
+            'distance': distance,
+            'score': score,
+        }
+
+
+def search(collection, query: str, n_results: int = 3, min_score: float = 0.0, where=None):
+    """
+    Query a collection and return hits with normalized scores
+
+    Only hits with score >= min_score are returned (at most n_results).
+    """
+    space = get_distance_space(collection)
+    query_kwargs = {
+        "query_texts": [query],
+        "n_results": n_results,
+        "include": ["documents", "metadatas", "distances"],
+    }
+    if where:
+        query_kwargs["where"] = where
+    results = collection.query(**query_kwargs)
+    return list(iter_scored_results(results, space=space, min_score=min_score))
+
+
+def match_label(score: float) -> str:
+    """Emoji label for a normalized score"""
+    if score >= GOOD_MATCH_SCORE:
+        return '✅'
+    if score >= WEAK_MATCH_SCORE:
+        return '⚠️'
+    return '❌'
+
+
+# ============================================
+# THRESHOLD CALIBRATION
+# ============================================
+
+def calibrate_threshold(scored_pairs, target_precision=None):
+    """
+    Fit a minimum-score threshold from labelled (score, relevant) pairs
+
+    Without target_precision the threshold maximizing F1 is returned.
+    With target_precision the lowest threshold reaching it is returned
+    (keeps as much recall as possible), or None if it can't be reached.
+
+    Returns a dict with threshold, precision, recall and f1.
+    """
+    pairs = sorted(((float(s), bool(r)) for s, r in scored_pairs), key=lambda p: p[0], reverse=True)
+    total_relevant = sum(1 for _, relevant in pairs if relevant)
+    if not pairs or total_relevant == 0:
+        return None
+
+    best = None
+    true_pos = 0
+    for i, (score, relevant) in enumerate(pairs):
+        true_pos += relevant
+        # Only evaluate a cut at the last pair of a run of equal scores
+        if i + 1 < len(pairs) and pairs[i + 1][0] == score:
+            continue
+
+        kept = i + 1
+        precision = true_pos / kept
+        recall = true_pos / total_relevant
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        candidate = {'threshold': score, 'precision': precision, 'recall': recall, 'f1': f1}
+
+        if target_precision is not None:
+            if precision >= target_precision:
+                best = candidate
+        elif best is None or f1 > best['f1']:
+            best = candidate
+
+    return best
+
+
+def _score_labelled_records(records, space):
+    """Turn labelled records into (score, relevant) pairs, embedding query/document text if needed"""
+    pairs = []
+    to_embed = []
+    for record in records:
+        relevant = bool(record['relevant'])
+        if 'score' in record:
+            pairs.append((float(record['score']), relevant))
+        elif 'distance' in record:
+            pairs.append((distance_to_similarity(float(record['distance']), space), relevant))
+        else:
+            to_embed.append(record)
+
+    if to_embed:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+        queries = model.encode([r['query'] for r in to_embed], normalize_embeddings=True)
+        documents = model.encode([r['document'] for r in to_embed], normalize_embeddings=True)
+        for record, q, d in zip(to_embed, queries, documents):
+            pairs.append((max(0.0, float(q @ d)), bool(record['relevant'])))
+
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit a minimum similarity score from labelled query/result pairs")
+    parser.add_argument("labels", help="JSONL file: {query, document | distance | score, relevant}")
+    parser.add_argument("--space", default="l2", choices=DISTANCE_SPACES, help="distance space of 'distance' values")
+    parser.add_argument("--target-precision", type=float, default=None, help="lowest threshold reaching this precision")
+    args = parser.parse_args(argv)
+
+    with open(args.labels, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    pairs = _score_labelled_records(records, args.space)
+    result = calibrate_threshold(pairs, target_precision=args.target_precision)
+    if result is None:
+        print("❌ Could not fit a threshold (no relevant pairs, or target precision unreachable)")
+        return 1
+
+    print(f"✅ Calibrated on {len(pairs)} pairs")
+    print(f"   min_score:  {result['threshold']:.4f}")
+    print(f"   distance:   {similarity_to_distance(result['threshold'], args.space):.4f} ({args.space})")
+    print(f"   precision:  {result['precision']:.3f}")
+    print(f"   recall:     {result['recall']:.3f}")
+    print(f"   f1:         {result['f1']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
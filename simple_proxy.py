@@ -2,51 +2,237 @@
 """
 Simple HTTP/HTTPS proxy server to bypass YouTube IP blocking
 Run this in the background: python simple_proxy.py
+
+Plain HTTP GETs are streamed through in bounded chunks over reused upstream
+connections, and can be served from an on-disk cache:
+    python simple_proxy.py --cache-dir .proxy_cache
 """
+import argparse
+import http.client
 import http.server
-import socketserver
-import urllib.request
-import urllib.error
 import sys
 import socket
+import threading
+from urllib.parse import urlsplit
+
+from http_cache import HttpCache, is_cacheable
+
+CHUNK_SIZE = 64 * 1024
+
+# Headers that only apply to one hop. Transfer-Encoding is included because
+# http.client already de-chunks the upstream body; we re-frame it ourselves.
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-connection", "proxy-authenticate",
+    "proxy-authorization", "te", "trailer", "transfer-encoding", "upgrade",
+}
+# Headers send_response() adds itself; forwarding the upstream ones would send them twice
+SET_BY_PROXY = {"server", "date"}
+
+# Upstream connections, reused per handler thread
+_upstream = threading.local()
+
+
+def end_to_end_headers(headers):
+    """Drop hop-by-hop headers (including any listed in the Connection header) and Server / Date"""
+    headers = list(headers)
+    drop = HOP_BY_HOP | SET_BY_PROXY
+    for key, value in headers:
+        if key.lower() in ("connection", "proxy-connection"):
+            drop.update(token.strip().lower() for token in value.split(","))
+    return [(k, v) for k, v in headers if k.lower() not in drop]
+
+
+def get_upstream_connection(scheme, host, port, fresh=False):
+    """Keep-alive connection to (scheme, host, port) for the current thread"""
+    pool = getattr(_upstream, "connections", None)
+    if pool is None:
+        pool = _upstream.connections = {}
+    key = (scheme, host, port)
+    conn = pool.get(key)
+    if conn is None or fresh:
+        if conn is not None:
+            conn.close()
+        conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = pool[key] = conn_class(host, port, timeout=10)
+    return conn
+
 
 class ProxyHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive and receive chunked bodies
+    protocol_version = "HTTP/1.1"
+    cache = None
+
     def do_GET(self):
         """Handle HTTP GET requests"""
+        url = urlsplit(self.path)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            self.send_error(400, "Bad Request: expected an absolute URL")
+            return
+
+        # Responses that vary on anything but Accept-Encoding are never cached (see stream_response)
+        cache_key = f"{self.path} {self.headers.get('Accept-Encoding', '')}"
+        entry = self.cache.lookup(cache_key) if self.cache else None
+        # A client revalidating its own copy keeps its validators and gets a 304 when it is current
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        client_conditional = bool(if_none_match or if_modified_since)
+        if entry is not None and entry.is_fresh():
+            self.cache.count("hits")
+            if client_conditional and entry.not_modified_for(if_none_match, if_modified_since):
+                self.send_not_modified(entry)
+            else:
+                self.send_cached(entry, "HIT")
+            return
+
+        headers = dict(end_to_end_headers(self.headers.items()))
+        headers["Host"] = url.netloc
+        headers.setdefault("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+        if entry is not None and not client_conditional:
+            headers.update(entry.validators())
+
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+
         try:
-            req = urllib.request.Request(self.path)
-            req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)')
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                self.send_response(response.status)
-                
-                for header, value in response.headers.items():
-                    self.send_header(header, value)
-                self.end_headers()
-                self.wfile.write(response.read())
+            conn, response = self.fetch_upstream(url, path, headers)
         except Exception as e:
             self.send_error(502, f"Bad Gateway: {e}")
-    
+            return
+
+        try:
+            if response.status == 304 and entry is not None and not client_conditional:
+                response.read()
+                self.cache.refresh(entry, response.getheaders())
+                self.cache.count("revalidated")
+                self.send_cached(entry, "REVALIDATED")
+            else:
+                # Includes a 304 answering the client's own validators, passed through as is
+                if self.cache:
+                    self.cache.count("misses")
+                self.stream_response(response, cache_key)
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            # Marks the response consumed so the connection can send the next request
+            response.close()
+        if response.will_close:
+            conn.close()
+
+    def fetch_upstream(self, url, path, headers):
+        """Send the request on a reused connection, retrying once on a fresh one if it went stale"""
+        port = url.port or (443 if url.scheme == "https" else 80)
+        for attempt in range(2):
+            conn = get_upstream_connection(url.scheme, url.hostname, port, fresh=attempt > 0)
+            try:
+                conn.request("GET", path, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.ImproperConnectionState,
+                    ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt:
+                    raise
+
+    def stream_response(self, response, cache_key):
+        """Copy the upstream response to the client in CHUNK_SIZE pieces (memory stays flat)"""
+        headers = end_to_end_headers(response.getheaders())
+        # 1xx / 204 / 304 and HEAD responses never have a body, so they get no framing either
+        no_body = self.command == "HEAD" or response.status in (204, 304) or response.status < 200
+        # A 304 or HEAD Content-Length describes the full response; 1xx / 204 must not have one
+        length = None if response.status == 204 or response.status < 200 else response.getheader("Content-Length")
+        chunked = not no_body and length is None and self.request_version == "HTTP/1.1"
+
+        self.send_response(response.status, response.reason)
+        for key, value in headers:
+            if key.lower() != "content-length":
+                self.send_header(key, value)
+        if length is not None:
+            self.send_header("Content-Length", length)
+        elif chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        elif not no_body:
+            # HTTP/1.0 client and unknown length: the body ends when the connection does
+            self.close_connection = True
+        if self.cache:
+            self.send_header("X-Cache", "MISS")
+        self.end_headers()
+
+        writer = None
+        vary = (response.getheader("Vary") or "").strip().lower()
+        authorized = "Authorization" in self.headers
+        if self.cache and vary in ("", "accept-encoding") and is_cacheable("GET", response.status, headers,
+                                                                           authorized):
+            writer = self.cache.writer(cache_key, response.status, [h for h in headers if h[0].lower() != "content-length"])
+
+        if no_body:
+            return
+        try:
+            while True:
+                data = response.read1(CHUNK_SIZE)
+                if not data:
+                    break
+                if chunked:
+                    self.wfile.write(b"%x\r\n" % len(data))
+                    self.wfile.write(data)
+                    self.wfile.write(b"\r\n")
+                else:
+                    self.wfile.write(data)
+                if writer:
+                    writer.write(data)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except Exception:
+            if writer:
+                writer.abort()
+            self.close_connection = True
+            raise
+        if writer:
+            writer.commit()
+
+    def send_cached(self, entry, label):
+        """Serve a cached response from disk"""
+        self.send_response(entry.status)
+        # Entries stored before Server / Date were dropped still carry them
+        for key, value in end_to_end_headers(entry.headers):
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(entry.size))
+        self.send_header("X-Cache", label)
+        self.end_headers()
+        for chunk in entry.iter_body(CHUNK_SIZE):
+            self.wfile.write(chunk)
+
+    def send_not_modified(self, entry):
+        """304 for a client whose copy matches the cached entry"""
+        self.send_response(304)
+        for key, value in entry.headers:
+            if key.lower() in ("cache-control", "expires", "etag", "last-modified", "vary"):
+                self.send_header(key, value)
+        self.send_header("X-Cache", "HIT")
+        self.end_headers()
+
     def do_CONNECT(self):
         """Handle HTTPS CONNECT tunneling"""
         try:
             # Parse host and port
             host, port = self.path.split(':')
             port = int(port)
-            
+
             # Create connection to target server
             sock = socket.create_connection((host, port), timeout=10)
-            
+
             # Send 200 Connection established
             self.send_response(200)
             self.end_headers()
-            
+
             # Tunnel data between client and server
             self.tunnel_to_server(sock)
-            
+
         except Exception as e:
             self.send_error(502, f"Bad Gateway: {e}")
-    
+        finally:
+            self.close_connection = True
+
     def tunnel_to_server(self, sock):
         """Tunnel data between client and remote server"""
         try:
@@ -56,7 +242,7 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
                 if not data:
                     break
                 sock.sendall(data)
-                
+
                 # Read from server
                 try:
                     data = sock.recv(4096)
@@ -67,19 +253,39 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
                     continue
         finally:
             sock.close()
-    
+
     def log_message(self, format, *args):
         print(f"[PROXY] {format % args}")
 
+
+def make_server(host, port, cache=None):
+    """Threaded server: keep-alive clients must not block each other"""
+    handler = type("CachingProxyHandler", (ProxyHandler,), {"cache": cache}) if cache else ProxyHandler
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
 if __name__ == '__main__':
-    port = 8888
-    server = http.server.HTTPServer(('0.0.0.0', port), ProxyHandler)
+    parser = argparse.ArgumentParser(description="Simple HTTP/HTTPS proxy")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--cache-dir", default=None, help="enable the on-disk HTTP cache in this directory")
+    parser.add_argument("--cache-max-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    port = args.port
+    cache = HttpCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024) if args.cache_dir else None
+    server = make_server('0.0.0.0', port, cache)
     print(f"✅ Proxy running on http://0.0.0.0:{port}")
     print(f"   HTTP_PROXY=http://127.0.0.1:{port}")
     print(f"   HTTPS_PROXY=http://127.0.0.1:{port}")
     print("\nNote: HTTPS CONNECT tunneling is supported!")
+    if cache:
+        print(f"   HTTP cache: {args.cache_dir} (max {args.cache_max_mb} MB)")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
+        if cache:
+            print(f"\n📦 Cache: {cache.stats}")
         print("\n✋ Proxy stopped")
         sys.exit(0)
@@ -0,0 +1,125 @@
+"""
+Single-flight request coalescing
+
+Identical calls that overlap in time (a double-clicked Analyze button, two
+users pasting the same job description, the same missing skill in two
+batches) share one upstream call: the first caller for a key runs it, the
+others wait for it and get the same result, or the same exception. Nothing
+is kept once the call returns; caching finished results stays the job of
+the caches in front of / behind it.
+
+Metrics (see metrics.py), labelled with the group name:
+    singleflight_calls{role="leader"|"waiter"}   calls that ran / shared a flight
+    singleflight_fanout                          callers served per upstream call
+
+Usage:
+    analysis_flight = SingleFlight("cv_analysis")
+    result = analysis_flight.do(key, lambda: expensive_call(...))
+
+    python singleflight.py --requests 32 --delay 0.5   # N identical calls, one upstream call
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one (see module docstring)"""
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "waiters": 0}
+
+    def do(self, key, fn):
+        """Return fn(), running it only if no call with this key is already in flight"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["leaders"] += 1
+            else:
+                flight.waiters += 1
+                self.stats["waiters"] += 1
+
+        if not leader:
+            metrics.incr("singleflight_calls", group=self.name, role="waiter")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        metrics.incr("singleflight_calls", group=self.name, role="leader")
+        try:
+            flight.value = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Unregister before waking the waiters: later calls start a new flight
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            metrics.observe("singleflight_fanout", flight.waiters + 1, group=self.name)
+        return flight.value
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def get_stats(self):
+        return {"name": self.name, **self.stats, "in_flight": self.in_flight()}
+
+
+# ==========================================
+# CLI: concurrency check against a slow stub
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32, help="identical concurrent requests")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds the stub upstream call takes")
+    args = parser.parse_args()
+
+    upstream_calls = []
+    start_barrier = threading.Barrier(args.requests)
+
+    def slow_upstream():
+        upstream_calls.append(threading.get_ident())
+        time.sleep(args.delay)
+        return {"missing_skills": ["docker", "typescript"]}
+
+    flight = SingleFlight("demo")
+
+    def request(_):
+        start_barrier.wait()  # everyone asks at the same moment
+        return flight.do("same-jd-same-resume", slow_upstream)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.requests) as pool:
+        results = list(pool.map(request, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    identical = all(r is results[0] for r in results)
+    print(f"🔁 {args.requests} identical requests -> {len(upstream_calls)} upstream call(s) in {elapsed:.2f}s")
+    print(f"   {flight.get_stats()}, all callers got the same result: {identical}")
+    if len(upstream_calls) != 1 or not identical:
+        raise SystemExit("❌ requests were not coalesced")
+    print("✅ coalesced")
+
+
+if __name__ == "__main__":
+    main()
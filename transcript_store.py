@@ -0,0 +1,267 @@
+"""
+Columnar, memory-mapped transcript store
+
+Transcripts from to_raw_data() are lists of dicts (~200+ bytes of Python
+objects per segment) that vanish when the process exits. This store keeps
+every video's segments on disk in flat columns:
+
+    starts.f32       float32 start of every segment
+    durations.f32    float32 duration of every segment
+    text_ends.u64    end offset of every segment's text in text.bin
+    text.bin         all texts, UTF-8, each followed by "\\n"
+    videos.json      video id -> [first segment, end segment)
+
+Columns are opened with np.memmap, so slicing a video, a time window or a
+run of segments reads straight from the page cache without copying; the
+text of a run of segments is one contiguous slice of text.bin (one decode).
+Segment texts are stored on one line (inner newlines become spaces).
+
+Single writer; videos are appended and never rewritten. videos.json is
+replaced only after all columns are written; rows past its last end (an
+append that crashed part-way) are truncated when the store is opened.
+
+Usage:
+    store = TranscriptStore(".transcripts")
+    if video_id not in store:
+        store.add_video(video_id, fetched_transcript.to_raw_data())
+    raw_data = store.segments(video_id)
+
+    python transcript_store.py stats .transcripts
+    python transcript_store.py bench --segments 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+COLUMNS = {
+    "starts": ("starts.f32", np.float32),
+    "durations": ("durations.f32", np.float32),
+    "text_ends": ("text_ends.u64", np.uint64),
+}
+
+
+class TranscriptStore:
+    """Append-only columnar store of transcript segments (see module docstring)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._videos_file = self.path / "videos.json"
+        self.videos = {}
+        if self._videos_file.exists():
+            with open(self._videos_file, encoding="utf-8") as f:
+                self.videos = {video_id: tuple(span) for video_id, span in json.load(f).items()}
+        self._maps = None
+        self._truncate_to_committed()
+
+    # ------------------------------------------
+    # Columns
+    # ------------------------------------------
+
+    def _column(self, name):
+        filename, dtype = COLUMNS[name]
+        path = self.path / filename
+        if not path.exists() or path.stat().st_size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def _committed_end(self):
+        """Segments covered by videos.json; anything after them is a partly written append"""
+        return max((end for _, end in self.videos.values()), default=0)
+
+    def _truncate_to_committed(self):
+        """Cut every column back to the last end in videos.json (undoes an append that crashed)"""
+        end = self._committed_end()
+        ends = self._column("text_ends")
+        text_bytes = int(ends[end - 1]) if end else 0
+        del ends  # unmap before truncating
+        sizes = {filename: end * np.dtype(dtype).itemsize for filename, dtype in COLUMNS.values()}
+        sizes["text.bin"] = text_bytes
+        for filename, size in sizes.items():
+            path = self.path / filename
+            if path.exists() and path.stat().st_size > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _open(self):
+        """(Re)map the columns; done lazily after every append"""
+        if self._maps is None:
+            blob_path = self.path / "text.bin"
+            blob = np.empty(0, dtype=np.uint8)
+            if blob_path.exists() and blob_path.stat().st_size:
+                blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+            self._maps = {name: self._column(name) for name in COLUMNS}
+            self._maps["text"] = blob
+        return self._maps
+
+    @property
+    def starts(self):
+        return self._open()["starts"]
+
+    @property
+    def durations(self):
+        return self._open()["durations"]
+
+    def __len__(self):
+        return len(self.videos)
+
+    def __contains__(self, video_id):
+        return video_id in self.videos
+
+    @property
+    def segment_count(self):
+        return len(self._open()["starts"])
+
+    # ------------------------------------------
+    # Writes
+    # ------------------------------------------
+
+    def add_video(self, video_id, segments):
+        """Append a video's [{'text', 'start', 'duration'}, ...]; returns its (first, end) segment range"""
+        if video_id in self.videos:
+            raise ValueError(f"Video {video_id} is already stored")
+        # Offsets come from the committed rows (videos.json), never from the current file sizes
+        first = self._committed_end()
+        texts = [(s["text"].replace("\n", " ") + "\n").encode("utf-8") for s in segments]
+        blob_size = int(self._open()["text_ends"][first - 1]) if first else 0
+        text_ends = blob_size + np.cumsum([len(t) for t in texts], dtype=np.uint64)
+
+        columns = {
+            "starts": np.array([s["start"] for s in segments], dtype=np.float32),
+            "durations": np.array([s["duration"] for s in segments], dtype=np.float32),
+            "text_ends": text_ends.astype(np.uint64),
+        }
+        self._maps = None  # drop the maps before the files grow
+        # A failed append earlier in this process may have left a tail: drop it first
+        self._truncate_to_committed()
+        with open(self.path / "text.bin", "ab") as f:
+            f.write(b"".join(texts))
+        for name, values in columns.items():
+            with open(self.path / COLUMNS[name][0], "ab") as f:
+                f.write(values.tobytes())
+
+        self.videos[video_id] = (first, first + len(segments))
+        tmp = self._videos_file.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({video_id: list(span) for video_id, span in self.videos.items()}, f)
+        os.replace(tmp, self._videos_file)  # committed: rows past the last end are dropped on open
+        return self.videos[video_id]
+
+    # ------------------------------------------
+    # Reads
+    # ------------------------------------------
+
+    def video_range(self, video_id):
+        """(first, end) global segment indices of a video"""
+        return self.videos[video_id]
+
+    def _text_span(self, first, end):
+        ends = self._open()["text_ends"]
+        return (int(ends[first - 1]) if first > 0 else 0), int(ends[end - 1])
+
+    def text(self, index):
+        a, b = self._text_span(index, index + 1)
+        return bytes(self._open()["text"][a:b - 1]).decode("utf-8")
+
+    def joined_text(self, first, end):
+        """Texts of segments [first, end) joined by spaces, decoded from one blob slice"""
+        if end <= first:
+            return ""
+        a, b = self._text_span(first, end)
+        return bytes(self._open()["text"][a:b - 1]).decode("utf-8").replace("\n", " ")
+
+    def iter_segments(self, video_id):
+        """Yield a video's segments as {'text', 'start', 'duration'} dicts, one at a time"""
+        first, end = self.videos[video_id]
+        maps = self._open()
+        blob, ends = maps["text"], maps["text_ends"]
+        offset = int(ends[first - 1]) if first > 0 else 0
+        for i in range(first, end):
+            stop = int(ends[i])
+            yield {
+                "text": bytes(blob[offset:stop - 1]).decode("utf-8"),
+                "start": float(maps["starts"][i]),
+                "duration": float(maps["durations"][i]),
+            }
+            offset = stop
+
+    def segments(self, video_id):
+        """A video's segments in to_raw_data() form (for chunking / segmentation)"""
+        return list(self.iter_segments(video_id))
+
+    def nbytes(self):
+        """Bytes on disk (and mapped) for all columns"""
+        files = [filename for filename, _ in COLUMNS.values()] + ["text.bin", "videos.json"]
+        return sum((self.path / name).stat().st_size for name in files if (self.path / name).exists())
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def _dict_bytes(segments):
+    """Python heap used by a list of segment dicts (tracemalloc, built from scratch)"""
+    tracemalloc.start()
+    # Fresh objects (float(x) would hand back the same float), so everything is counted
+    copy = [{"text": "".join(s["text"]), "start": s["start"] + 0.0, "duration": s["duration"] + 0.0}
+            for s in segments]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copy
+    return size
+
+
+def bench(n_segments, path):
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+    from bench_pipeline import synthetic_segments
+
+    segments = synthetic_segments(n_segments)
+    dict_bytes = _dict_bytes(segments)
+
+    store = TranscriptStore(path)
+    start = time.perf_counter()
+    for v in range(0, n_segments, 1000):
+        store.add_video(f"video_{v // 1000}", segments[v:v + 1000])
+    write_s = time.perf_counter() - start
+
+    video_ids = list(store.videos)
+    start = time.perf_counter()
+    for video_id in video_ids[:100]:
+        first, end = store.video_range(video_id)
+        store.joined_text(first + 10, first + 20)
+    read_ms = (time.perf_counter() - start) / min(100, len(video_ids)) * 1000
+
+    per_million = 1_000_000 / n_segments
+    print(f"📦 {n_segments} segments in {len(store)} videos (written in {write_s:.2f}s)")
+    print(f"   list of dicts: {dict_bytes * per_million / 1e6:8.1f} MB per million segments (Python heap)")
+    print(f"   columnar:      {store.nbytes() * per_million / 1e6:8.1f} MB per million segments (on disk, mmapped)")
+    print(f"   10-segment text read: {read_ms:.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="videos, segments and size of a store")
+    stats.add_argument("path")
+    bench_parser = commands.add_parser("bench", help="memory per million segments: dicts vs columns")
+    bench_parser.add_argument("--segments", type=int, default=1_000_000)
+    bench_parser.add_argument("--path", default=".transcripts-bench")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        store = TranscriptStore(args.path)
+        print(f"📦 {args.path}: {len(store)} videos, {store.segment_count} segments, {store.nbytes() / 1e6:.1f} MB")
+    else:
+        if Path(args.path).exists() and any(Path(args.path).iterdir()):
+            raise SystemExit(f"{args.path} is not empty; pick a fresh --path")
+        bench(args.segments, args.path)
+
+
+if __name__ == "__main__":
+    main()
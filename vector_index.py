@@ -0,0 +1,299 @@
+"""
+Chroma HNSW collections with explicit index parameters, plus an auto-tuner
+
+Every collection in the apps is created through create_collection(), which
+sets the distance space and the HNSW knobs instead of relying on Chroma's
+defaults:
+- space:           "cosine" (default), "l2" or "ip"; similarity.py converts
+                   distances for whichever space is used
+- M:               graph degree; more links = better recall, more memory
+- ef_construction: candidate list size while building; slower build, better graph
+- ef_search:       candidate list size per query; the recall / latency knob
+                   (set at creation: Chroma does not apply a modified value
+                   to an index that is already loaded)
+
+Tuned values can be saved to JSON and picked up by every app via
+VECTOR_INDEX_PARAMS=path/to/params.json.
+
+Auto-tune: sweep M x ef_construction x ef_search on held-out queries, measure
+build time, index memory, QPS and recall@k against exact search, and pick the
+cheapest setting that reaches the target recall:
+    python vector_index.py --dataset eval_sets/movies.json --target-recall 0.95 --save index_params.json
+    python vector_index.py --synthetic 20000 --queries 200 --k 10
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+DISTANCE_SPACES = ("cosine", "l2", "ip")
+
+DEFAULT_INDEX_PARAMS = {
+    "space": "cosine",
+    "M": 16,
+    "ef_construction": 100,
+    "ef_search": 100,
+}
+
+DEFAULT_SWEEP = {
+    "M": (8, 16, 32),
+    "ef_construction": (64, 128, 256),
+    "ef_search": (10, 20, 40, 80, 160),
+}
+
+
+# ==========================================
+# Collections
+# ==========================================
+
+def index_params(**overrides):
+    """Defaults, then the VECTOR_INDEX_PARAMS file (if set), then explicit overrides"""
+    params = dict(DEFAULT_INDEX_PARAMS)
+    path = os.getenv("VECTOR_INDEX_PARAMS")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        params.update({key: saved[key] for key in DEFAULT_INDEX_PARAMS if key in saved})
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    if params["space"] not in DISTANCE_SPACES:
+        raise ValueError(f"Unknown distance space: {params['space']}")
+    return params
+
+
+def create_collection(client, name, embedding_function=None, space=None, M=None, ef_construction=None,
+                      ef_search=None, metadata=None, get_or_create=False):
+    """Create a Chroma collection with an explicit distance space and HNSW parameters"""
+    params = index_params(space=space, M=M, ef_construction=ef_construction, ef_search=ef_search)
+    collection_metadata = {
+        "hnsw:space": params["space"],
+        "hnsw:M": params["M"],
+        "hnsw:construction_ef": params["ef_construction"],
+        "hnsw:search_ef": params["ef_search"],
+        **(metadata or {}),
+    }
+    kwargs = {"name": name, "metadata": collection_metadata}
+    if embedding_function is not None:
+        kwargs["embedding_function"] = embedding_function
+    if get_or_create:
+        return client.get_or_create_collection(**kwargs)
+    return client.create_collection(**kwargs)
+
+
+def get_index_params(collection):
+    """space / M / ef_construction / ef_search of an existing collection"""
+    configuration = getattr(collection, "configuration", None) or {}
+    hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+    if hnsw:
+        return {
+            "space": hnsw.get("space"),
+            "M": hnsw.get("max_neighbors"),
+            "ef_construction": hnsw.get("ef_construction"),
+            "ef_search": hnsw.get("ef_search"),
+        }
+    metadata = getattr(collection, "metadata", None) or {}
+    return {
+        "space": metadata.get("hnsw:space", "l2"),
+        "M": metadata.get("hnsw:M"),
+        "ef_construction": metadata.get("hnsw:construction_ef"),
+        "ef_search": metadata.get("hnsw:search_ef"),
+    }
+
+
+def estimate_index_bytes(n, dim, M):
+    """
+    HNSW memory estimate (hnswlib layout): float32 vectors, a label, 2*M level-0
+    links per element, and M links on the 1/(M-1) expected upper levels
+    """
+    level0 = dim * 4 + 8 + (2 * M * 4 + 4)
+    upper = (M * 4 + 4) / max(M - 1, 1)
+    return int(n * (level0 + upper))
+
+
+# ==========================================
+# Auto-tuning
+# ==========================================
+
+def exact_neighbors(corpus, queries, k, space):
+    """Ground-truth top-k ids for each query, in the collection's distance space"""
+    corpus = np.asarray(corpus, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if space == "cosine":
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ corpus.T
+    if space == "l2":
+        # Smallest ||c - q||^2 = largest 2 q.c - ||c||^2
+        scores = 2 * scores - (corpus ** 2).sum(axis=1)
+    top = np.argpartition(-scores, min(k, corpus.shape[0] - 1), axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def _build(client, embeddings, space, M, ef_construction, ef_search):
+    collection = create_collection(
+        client, f"tune_{uuid.uuid4().hex[:12]}", space=space, M=M,
+        ef_construction=ef_construction, ef_search=ef_search
+    )
+    max_batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+    start = time.perf_counter()
+    for i in range(0, len(embeddings), max_batch):
+        batch = embeddings[i:i + max_batch]
+        collection.add(ids=[str(j) for j in range(i, i + len(batch))], embeddings=batch)
+    return collection, time.perf_counter() - start
+
+
+def _measure(collection, queries, truth, k):
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found = {int(i) for i in results["ids"][0]}
+        recalls.append(len(found & expected) / len(expected))
+    latencies.sort()
+    return {
+        "recall": round(sum(recalls) / len(recalls), 4),
+        "qps": round(len(latencies) / sum(latencies), 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+    }
+
+
+def autotune(embeddings, queries, target_recall=0.95, k=10, space="cosine", sweep=None, prefer="qps",
+             client=None, on_result=None):
+    """
+    Sweep HNSW parameters and pick the cheapest setting reaching target_recall
+
+    Every setting gets its own index: ef_search only takes effect at creation.
+    "Cheapest" is the highest QPS (prefer="qps") or the smallest index
+    (prefer="memory"), ties broken by the other. Returns (best or None, results).
+    """
+    import chromadb
+
+    client = client or chromadb.Client()
+    sweep = {**DEFAULT_SWEEP, **(sweep or {})}
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(embeddings))
+    truth = exact_neighbors(embeddings, queries, k, space)
+
+    results = []
+    for M, ef_construction, ef_search in itertools.product(sweep["M"], sweep["ef_construction"], sweep["ef_search"]):
+        collection, build_s = _build(client, embeddings, space, M, ef_construction, ef_search)
+        row = {
+            "space": space,
+            "M": M,
+            "ef_construction": ef_construction,
+            "ef_search": ef_search,
+            "build_s": round(build_s, 3),
+            "index_mb": round(estimate_index_bytes(len(embeddings), embeddings.shape[1], M) / 1e6, 2),
+            **_measure(collection, queries, truth, k),
+        }
+        client.delete_collection(collection.name)
+        results.append(row)
+        if on_result:
+            on_result(row)
+
+    passing = [r for r in results if r["recall"] >= target_recall]
+    if not passing:
+        return None, results
+    if prefer == "memory":
+        best = min(passing, key=lambda r: (r["index_mb"], -r["qps"]))
+    else:
+        best = min(passing, key=lambda r: (-r["qps"], r["index_mb"]))
+    return best, results
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def _dataset_vectors(path, model_name):
+    """Index texts and held-out query vectors from an evaluation set"""
+    from evaluation import build_items, get_embedding_fn, load_dataset
+
+    dataset = load_dataset(path)
+    texts, _ = build_items(dataset, chunk_size=3, overlap=1)
+    embedding_fn = get_embedding_fn(model_name)
+    embeddings = np.asarray(embedding_fn(texts), dtype=np.float32)
+    queries = np.asarray(embedding_fn([q["query"] for q in dataset["queries"]]), dtype=np.float32)
+    return embeddings, queries
+
+
+def _synthetic_vectors(n, n_queries, dim, seed=0):
+    """Clustered unit vectors; queries are held out from the same distribution"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, (n + n_queries) // 100), dim)).astype(np.float32)
+    points = centers[rng.integers(0, len(centers), n + n_queries)]
+    points += 0.5 * rng.standard_normal(points.shape).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points[:n], points[n:]
+
+
+def _ints(value):
+    return tuple(int(v) for v in value.split(",") if v)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="evaluation set (eval_sets/*.json): its texts and queries")
+    source.add_argument("--synthetic", type=int, metavar="N", help="N random clustered vectors")
+    parser.add_argument("--queries", type=int, default=200, help="held-out queries for --synthetic")
+    parser.add_argument("--dim", type=int, default=384, help="vector size for --synthetic")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="embedding model for --dataset")
+    parser.add_argument("--space", default="cosine", choices=DISTANCE_SPACES)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--prefer", default="qps", choices=("qps", "memory"), help="what 'cheapest' means")
+    parser.add_argument("--M", type=_ints, default=DEFAULT_SWEEP["M"])
+    parser.add_argument("--ef-construction", type=_ints, default=DEFAULT_SWEEP["ef_construction"])
+    parser.add_argument("--ef-search", type=_ints, default=DEFAULT_SWEEP["ef_search"])
+    parser.add_argument("--json", metavar="PATH", help="write every measured setting here")
+    parser.add_argument("--save", metavar="PATH", help="write the chosen parameters (for VECTOR_INDEX_PARAMS)")
+    args = parser.parse_args()
+
+    if args.dataset:
+        embeddings, queries = _dataset_vectors(args.dataset, args.model)
+    else:
+        embeddings, queries = _synthetic_vectors(args.synthetic, args.queries, args.dim)
+    print(f"🔧 Tuning HNSW on {len(embeddings)} vectors, {len(queries)} held-out queries, "
+          f"recall@{args.k} target {args.target_recall}")
+    print(f"   {'M':>3} {'ef_c':>5} {'ef_s':>5} | {'recall':>6} {'QPS':>8} {'p95 ms':>7} "
+          f"{'build s':>8} {'index MB':>9}")
+
+    def show(row):
+        mark = "✅" if row["recall"] >= args.target_recall else "  "
+        print(f"{mark} {row['M']:>3} {row['ef_construction']:>5} {row['ef_search']:>5} | {row['recall']:>6.3f} "
+              f"{row['qps']:>8.0f} {row['p95_ms']:>7.2f} {row['build_s']:>8.2f} {row['index_mb']:>9.2f}")
+
+    best, results = autotune(
+        embeddings, queries, target_recall=args.target_recall, k=args.k, space=args.space,
+        sweep={"M": args.M, "ef_construction": args.ef_construction, "ef_search": args.ef_search},
+        prefer=args.prefer, on_result=show,
+    )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"best": best, "results": results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+    if best is None:
+        print(f"\n❌ No setting reached recall {args.target_recall}; widen the sweep (larger ef_search / M)")
+        return 1
+
+    print(f"\n🏆 space={best['space']} M={best['M']} ef_construction={best['ef_construction']} "
+          f"ef_search={best['ef_search']}: recall {best['recall']:.3f}, {best['qps']:.0f} QPS, "
+          f"~{best['index_mb']} MB")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({key: best[key] for key in DEFAULT_INDEX_PARAMS}, f, indent=2)
+        print(f"💾 Parameters saved to {args.save} (use VECTOR_INDEX_PARAMS={args.save})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())